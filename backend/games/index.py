@@ -1,322 +1,493 @@
 import json
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-
-def verify_admin(token: str, dsn: str) -> bool:
-    '''Проверка прав администратора'''
-    if not token:
-        return False
-    
-    with psycopg2.connect(dsn) as conn:
+from datetime import datetime
+from psycopg2.extras import RealDictCursor, execute_values
+from db import get_connection
+from compression import compressed
+from metrics import instrumented
+from core import HttpError, Request, Router, decode_cursor, encode_cursor, not_modified, parse_limit, respond, respond_cacheable
+from auth import require_admin
+from idempotency import claim_key, save_response
+from rating import lock_ratings, rate_games, replay_all, save_ratings
+from versions import bump_versions, compute_etag, is_not_modified, request_variant
+
+MAX_PAGE_SIZE = 200
+DEFAULT_PAGE_SIZE = 100
+MAX_BULK_GAMES = 100
+GAME_STATUSES = ('active', 'completed', 'cancelled')
+
+def parse_game_filters(query_params: dict) -> dict:
+    '''Фильтры списка игр: статус и диапазон дат создания'''
+    filters = {}
+    status = query_params.get('status')
+    if status:
+        if status not in GAME_STATUSES:
+            raise HttpError(400, 'Неверный статус игры')
+        filters['status'] = status
+    for key in ('from', 'to'):
+        value = query_params.get(key)
+        if value:
+            try:
+                filters[key] = datetime.fromisoformat(value)
+            except ValueError:
+                raise HttpError(400, 'Неверный формат даты')
+    return filters
+
+def fetch_games(cur, filters: dict, limit, after) -> tuple:
+    '''Страница игр с командами и составами: составы собираются одним проходом только для игр страницы'''
+    conditions = []
+    params = []
+
+    if 'status' in filters:
+        conditions.append('g.status = %s')
+        params.append(filters['status'])
+    if 'from' in filters:
+        conditions.append('g.created_at >= %s')
+        params.append(filters['from'])
+    if 'to' in filters:
+        conditions.append('g.created_at < %s')
+        params.append(filters['to'])
+    if after:
+        conditions.append('(g.created_at, g.id) < (%s, %s)')
+        params.extend(after)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    limit_clause = ''
+    if limit is not None:
+        limit_clause = 'LIMIT %s'
+        params.append(limit + 1)
+
+    cur.execute(
+        f"""
+        WITH page AS (
+            SELECT g.id, g.name, g.status, g.winner_team_id, g.created_at
+            FROM t_p28902192_strikbal_rating_app.games g
+            {where}
+            ORDER BY g.created_at DESC, g.id DESC
+            {limit_clause}
+        ),
+        page_teams AS (
+            SELECT t.id, t.game_id, t.name, t.color
+            FROM page
+            JOIN t_p28902192_strikbal_rating_app.teams t ON t.game_id = page.id
+        ),
+        rosters AS (
+            SELECT tp.team_id,
+                   json_agg(
+                       json_build_object('id', p.id, 'name', u.name, 'points', p.points)
+                       ORDER BY tp.id
+                   ) as players
+            FROM page_teams pt
+            JOIN t_p28902192_strikbal_rating_app.team_players tp ON tp.team_id = pt.id
+            JOIN t_p28902192_strikbal_rating_app.players p ON tp.player_id = p.id
+            JOIN t_p28902192_strikbal_rating_app.users u ON p.user_id = u.id
+            GROUP BY tp.team_id
+        ),
+        game_teams AS (
+            SELECT pt.game_id,
+                   json_agg(
+                       json_build_object(
+                           'id', pt.id,
+                           'name', pt.name,
+                           'color', pt.color,
+                           'players', COALESCE(r.players, '[]'::json)
+                       )
+                       ORDER BY pt.id
+                   ) as teams
+            FROM page_teams pt
+            LEFT JOIN rosters r ON r.team_id = pt.id
+            GROUP BY pt.game_id
+        )
+        SELECT page.id, page.name, page.status,
+               (page.status = 'completed') as finished,
+               page.winner_team_id, page.created_at,
+               gt.teams
+        FROM page
+        LEFT JOIN game_teams gt ON gt.game_id = page.id
+        ORDER BY page.created_at DESC, page.id DESC
+        """,
+        params
+    )
+    games = [dict(game) for game in cur.fetchall()]
+
+    next_cursor = None
+    if limit is not None and len(games) > limit:
+        games = games[:limit]
+        last = games[-1]
+        next_cursor = encode_cursor([last['created_at'].isoformat(), last['id']])
+    return games, next_cursor
+
+def normalize_game(game) -> dict:
+    '''Проверка и нормализация описания игры из тела запроса'''
+    if not isinstance(game, dict):
+        raise HttpError(400, 'Неверный формат данных')
+    name = str(game.get('name') or '').strip()
+    if not name:
+        raise HttpError(400, 'Укажите название игры')
+
+    teams = []
+    for team in game.get('teams') or []:
+        if not isinstance(team, dict) or not team.get('name') or not team.get('color'):
+            raise HttpError(400, 'Укажите название и цвет каждой команды')
+        try:
+            players = [int(player_id) for player_id in team.get('players') or []]
+        except (TypeError, ValueError):
+            raise HttpError(400, 'Неверный ID игрока')
+        teams.append({'name': str(team['name']), 'color': str(team['color']), 'players': players})
+    return {'name': name, 'teams': teams}
+
+def check_players_exist(cur, games: list) -> None:
+    '''HttpError 400 со списком ID игроков из составов, которых нет в базе'''
+    player_ids = sorted({pid for game in games for team in game['teams'] for pid in team['players']})
+    if not player_ids:
+        return
+    cur.execute(
+        """
+        SELECT COALESCE(array_agg(i.id ORDER BY i.id), '{}') as missing
+        FROM unnest(%s::int[]) as i(id)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM t_p28902192_strikbal_rating_app.players p WHERE p.id = i.id
+        )
+        """,
+        (player_ids,)
+    )
+    missing = cur.fetchone()['missing']
+    if missing:
+        raise HttpError(400, 'Игроки не найдены: ' + ', '.join(str(pid) for pid in missing))
+
+def create_games(cur, games: list) -> list:
+    '''Создание игр, команд и составов одним запросом независимо от их количества'''
+    cur.execute(
+        """
+        WITH input AS (
+            SELECT i.ord, i.value as game,
+                   nextval(pg_get_serial_sequence('t_p28902192_strikbal_rating_app.games', 'id')) as game_id
+            FROM json_array_elements(%s::json) WITH ORDINALITY as i(value, ord)
+        ),
+        team_input AS (
+            SELECT input.game_id, t.value as team,
+                   nextval(pg_get_serial_sequence('t_p28902192_strikbal_rating_app.teams', 'id')) as team_id
+            FROM input
+            CROSS JOIN json_array_elements(input.game->'teams') WITH ORDINALITY as t(value, ord)
+            ORDER BY input.ord, t.ord
+        ),
+        new_games AS (
+            INSERT INTO t_p28902192_strikbal_rating_app.games (id, name, status)
+            SELECT game_id, game->>'name', 'active' FROM input
+            RETURNING id, name, status, created_at
+        ),
+        new_teams AS (
+            INSERT INTO t_p28902192_strikbal_rating_app.teams (id, game_id, name, color)
+            SELECT team_id, game_id, team->>'name', team->>'color' FROM team_input
+        ),
+        new_team_players AS (
+            INSERT INTO t_p28902192_strikbal_rating_app.team_players (team_id, player_id)
+            SELECT team_input.team_id, player_id::int
+            FROM team_input
+            CROSS JOIN json_array_elements_text(team_input.team->'players') as player_id
+        )
+        SELECT g.id, g.name, g.status, g.created_at
+        FROM new_games g
+        JOIN input ON input.game_id = g.id
+        ORDER BY input.ord
+        """,
+        (json.dumps(games),)
+    )
+    return [dict(game) for game in cur.fetchall()]
+
+def finalize_games(cur, results: list) -> list:
+    '''Завершение игр пакетом: проверка всех игр, расчёт очков и запись одним запросом на таблицу'''
+    outcomes = []
+    requests = []
+    seen = set()
+    for item in results:
+        try:
+            game_id = int(item.get('gameId'))
+            winner_team_id = int(item.get('winnerTeamId'))
+        except (AttributeError, TypeError, ValueError):
+            outcomes.append({'gameId': item.get('gameId') if isinstance(item, dict) else None,
+                             'error': 'Укажите ID игры и команды-победителя'})
+            continue
+        outcome = {'gameId': game_id}
+        outcomes.append(outcome)
+        if game_id in seen:
+            outcome['error'] = 'Игра повторяется в пакете'
+            continue
+        seen.add(game_id)
+        requests.append((outcome, game_id, winner_team_id))
+
+    if not requests:
+        return outcomes
+
+    lock_ratings(cur)
+
+    # Блокировка игр упорядочивает параллельные завершения одной игры:
+    # второй запрос увидит статус completed и ничего не начислит
+    cur.execute(
+        """
+        SELECT id, status, winner_team_id FROM t_p28902192_strikbal_rating_app.games
+        WHERE id = ANY(%s)
+        ORDER BY id
+        FOR UPDATE
+        """,
+        ([game_id for _, game_id, _ in requests],)
+    )
+    games = {row['id']: row for row in cur.fetchall()}
+
+    pending = []
+    for outcome, game_id, winner_team_id in requests:
+        game = games.get(game_id)
+        if not game:
+            outcome['error'] = 'Игра не найдена'
+        elif game['status'] == 'completed':
+            outcome.update({'winnerTeamId': game['winner_team_id'], 'status': 'completed', 'alreadyCompleted': True})
+        elif game['status'] != 'active':
+            outcome['error'] = 'Игра отменена'
+        else:
+            pending.append((outcome, game_id, winner_team_id))
+    requests = pending
+
+    if not requests:
+        return outcomes
+
+    cur.execute(
+        """
+        SELECT t.game_id, t.id as team_id,
+               COALESCE(array_agg(tp.player_id ORDER BY tp.id) FILTER (WHERE tp.player_id IS NOT NULL), '{}') as players
+        FROM t_p28902192_strikbal_rating_app.teams t
+        LEFT JOIN t_p28902192_strikbal_rating_app.team_players tp ON tp.team_id = t.id
+        WHERE t.game_id = ANY(%s)
+        GROUP BY t.game_id, t.id
+        """,
+        ([game_id for _, game_id, _ in requests],)
+    )
+    teams_by_game = {}
+    for row in cur.fetchall():
+        teams_by_game.setdefault(row['game_id'], {})[row['team_id']] = row['players']
+
+    valid = []
+    for outcome, game_id, winner_team_id in requests:
+        teams = teams_by_game.get(game_id, {})
+        if len(teams) != 2:
+            outcome['error'] = 'В игре должно быть 2 команды'
+        elif winner_team_id not in teams:
+            outcome['error'] = 'Команда-победитель не участвует в игре'
+        else:
+            loser_team_id = [team_id for team_id in teams if team_id != winner_team_id][0]
+            valid.append((outcome, game_id, winner_team_id, teams[winner_team_id], teams[loser_team_id]))
+
+    if not valid:
+        return outcomes
+
+    # Игры пакета получают одно время завершения, а пересчёт рейтинга упорядочивает
+    # их по ID: в том же порядке они применяются и здесь
+    valid.sort(key=lambda item: item[1])
+
+    player_ids = sorted({pid for *_, winners, losers in valid for pid in winners + losers})
+    cur.execute(
+        """
+        SELECT id, points, rating FROM t_p28902192_strikbal_rating_app.players
+        WHERE id = ANY(%s)
+        ORDER BY id
+        FOR UPDATE
+        """,
+        (player_ids,)
+    )
+    locked = cur.fetchall()
+    points = {row['id']: row['points'] for row in locked}
+    events = []
+
+    # Игры применяются по порядку, чтобы ограничение очков снизу нулём
+    # срабатывало так же, как при завершении игр по одной
+    for outcome, game_id, winner_team_id, winners, losers in valid:
+        points_per_winner = len(losers) * 100
+        points_per_loser = -100
+        for player_id in set(winners):
+            if player_id in points:
+                points[player_id] += points_per_winner
+                events.append((player_id, 'game_win', points_per_winner, 1, 0, points[player_id], game_id))
+        for player_id in set(losers):
+            if player_id in points:
+                before = points[player_id]
+                points[player_id] = max(before + points_per_loser, 0)
+                events.append((player_id, 'game_loss', points[player_id] - before, 0, 1, points[player_id], game_id))
+        outcome.update({
+            'winnerTeamId': winner_team_id,
+            'pointsPerWinner': points_per_winner,
+            'pointsPerLoser': points_per_loser,
+            'status': 'completed'
+        })
+
+    # Очки, победы и поражения игроков обновляет триггер журнала
+    if events:
+        execute_values(
+            cur,
+            """
+            INSERT INTO t_p28902192_strikbal_rating_app.point_events
+            (player_id, reason, delta, wins_delta, losses_delta, points_after, game_id)
+            VALUES %s
+            """,
+            events,
+            page_size=len(events)
+        )
+
+    ratings = rate_games({row['id']: row['rating'] for row in locked},
+                         [(winners, losers) for *_, winners, losers in valid])
+    save_ratings(cur, {pid: rating for pid, rating in ratings.items() if pid in points})
+
+    # Время завершения берётся после блокировки игроков (а не начала транзакции, как NOW()):
+    # игры с общими игроками получают его в том же порядке, в каком применяются.
+    # Подзапрос вычисляется один раз, поэтому у всех игр пакета время одинаковое
+    execute_values(
+        cur,
+        """
+        UPDATE t_p28902192_strikbal_rating_app.games g
+        SET status = 'completed', winner_team_id = v.winner_team_id,
+            completed_at = (SELECT clock_timestamp())
+        FROM (VALUES %s) as v(id, winner_team_id)
+        WHERE g.id = v.id
+        """,
+        [(game_id, winner_team_id) for _, game_id, winner_team_id, _, _ in valid],
+        page_size=len(valid)
+    )
+    return outcomes
+
+router = Router(allow_headers='Content-Type, Authorization, X-Authorization, If-None-Match, Idempotency-Key, X-Read-After-Write')
+
+@router.route('GET', auth=True)
+def get_games(req: Request) -> dict:
+    '''Список игр с фильтрами и keyset-пагинацией; без limit - первая страница из DEFAULT_PAGE_SIZE игр'''
+    filters = parse_game_filters(req.query)
+    limit = parse_limit(req.query.get('limit'), MAX_PAGE_SIZE) or DEFAULT_PAGE_SIZE
+    after = None
+    if req.query.get('after'):
+        after = decode_cursor(req.query['after'], (datetime.fromisoformat, int))
+
+    with get_connection(replica=req.use_replica) as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            etag = compute_etag(cur, ('games', 'players'), request_variant(req.query))
+            if is_not_modified(req.headers, etag):
+                return not_modified(etag)
+
+            games, next_cursor = fetch_games(cur, filters, limit, after)
+
+    return respond_cacheable({'games': games, 'nextCursor': next_cursor}, etag)
+
+@router.route('POST', auth=True)
+def post_games(req: Request) -> dict:
+    '''Создание игры или пакета игр {"games": [...]}'''
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            require_admin(cur, req.token)
+
+            is_bulk = 'games' in req.body
+            games = req.body['games'] if is_bulk else [req.body]
+            if not isinstance(games, list) or not games or len(games) > MAX_BULK_GAMES:
+                raise HttpError(400, f'Передайте от 1 до {MAX_BULK_GAMES} игр')
+            games = [normalize_game(game) for game in games]
+            check_players_exist(cur, games)
+
+            created = create_games(cur, games)
+            bump_versions(cur, 'games')
+
+    return respond(201, {'games': created} if is_bulk else {'game': created[0]})
+
+@router.route('PUT', auth=True)
+def put_games(req: Request) -> dict:
+    '''Завершение игры или пакета игр {"results": [...]} с начислением очков.
+
+    Повтор с тем же заголовком Idempotency-Key возвращает сохранённый ответ;
+    уже завершённые игры повторно не начисляются.
+    '''
+    is_batch = 'results' in req.body
+    if is_batch:
+        results = req.body['results']
+        if not isinstance(results, list) or not results or len(results) > MAX_BULK_GAMES:
+            raise HttpError(400, f'Передайте от 1 до {MAX_BULK_GAMES} результатов')
+    else:
+        if not req.body.get('gameId') or not req.body.get('winnerTeamId'):
+            raise HttpError(400, 'Укажите ID игры и команды-победителя')
+        results = [req.body]
+
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            session = require_admin(cur, req.token)
+            replay = claim_key(cur, session['user_id'], req)
+            if replay:
+                return replay
+
+            outcomes = finalize_games(cur, results)
+            if any(outcome.get('status') == 'completed' and not outcome.get('alreadyCompleted')
+                   for outcome in outcomes):
+                bump_versions(cur, 'games', 'players')
+
+            if is_batch:
+                payload = {'results': outcomes}
+            elif 'error' in outcomes[0]:
+                raise HttpError(400, outcomes[0]['error'])
+            elif outcomes[0].get('alreadyCompleted'):
+                payload = {'message': 'Игра уже завершена', 'alreadyCompleted': True}
+            else:
+                payload = {'message': 'Игра завершена, очки начислены'}
+            save_response(cur, session['user_id'], req, 200, payload)
+
+    return respond(200, payload)
+
+@router.route('POST', action='replay_ratings', auth=True)
+def post_replay_ratings(req: Request) -> dict:
+    '''Полный пересчёт рейтинга Эло по истории всех завершённых игр'''
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            require_admin(cur, req.token)
+        with conn.cursor() as cur:
+            stats = replay_all(cur)
+            bump_versions(cur, 'players')
+
+    return respond(200, stats)
+
+@router.route('DELETE', auth=True)
+def delete_game(req: Request) -> dict:
+    '''Удаление игры вместе с командами и составами'''
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            require_admin(cur, req.token)
+
+            game_id = req.query.get('gameId')
+            if not game_id:
+                raise HttpError(400, 'Укажите ID игры')
+
             cur.execute(
                 """
-                SELECT u.is_admin 
-                FROM t_p28902192_strikbal_rating_app.sessions s
-                JOIN t_p28902192_strikbal_rating_app.users u ON s.user_id = u.id
-                WHERE s.token = %s AND s.expires_at > NOW()
+                DELETE FROM t_p28902192_strikbal_rating_app.team_players
+                WHERE team_id IN (
+                    SELECT id FROM t_p28902192_strikbal_rating_app.teams
+                    WHERE game_id = %s
+                )
                 """,
-                (token,)
+                (game_id,)
             )
-            result = cur.fetchone()
-            return result['is_admin'] if result else False
 
+            cur.execute(
+                """
+                DELETE FROM t_p28902192_strikbal_rating_app.teams
+                WHERE game_id = %s
+                """,
+                (game_id,)
+            )
+
+            cur.execute(
+                """
+                DELETE FROM t_p28902192_strikbal_rating_app.games
+                WHERE id = %s
+                """,
+                (game_id,)
+            )
+
+            bump_versions(cur, 'games')
+
+    return respond(200, {'message': 'Игра удалена'})
+
+@instrumented
+@compressed
 def handler(event: dict, context) -> dict:
     '''API для управления играми (создание, получение, завершение, удаление)'''
-    method = event.get('httpMethod', 'GET')
-
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-
-    try:
-        headers = event.get('headers', {})
-        query_params = event.get('queryStringParameters', {}) or {}
-        
-        auth_header = headers.get('x-authorization', headers.get('X-Authorization', ''))
-        if not auth_header:
-            auth_header = headers.get('authorization', headers.get('Authorization', ''))
-        token = auth_header.replace('Bearer ', '').strip() if auth_header else ''
-        
-        if not token:
-            token = query_params.get('token', '')
-        
-        if not token:
-            return {
-                'statusCode': 401,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Требуется авторизация'}),
-                'isBase64Encoded': False
-            }
-        
-        dsn = os.environ['DATABASE_URL']
-        is_admin = verify_admin(token, dsn)
-        
-        if method != 'GET' and not is_admin:
-            return {
-                'statusCode': 403,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Требуются права администратора'}),
-                'isBase64Encoded': False
-            }
-
-        with psycopg2.connect(dsn) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                
-                if method == 'GET':
-                    cur.execute(
-                        """
-                        SELECT g.id, g.name, g.status, 
-                               (g.status = 'completed') as finished,
-                               g.winner_team_id, g.created_at,
-                               json_agg(
-                                   json_build_object(
-                                       'id', t.id,
-                                       'name', t.name,
-                                       'color', t.color,
-                                       'players', COALESCE(
-                                           (SELECT json_agg(
-                                               json_build_object(
-                                                   'id', p.id,
-                                                   'name', u.name,
-                                                   'points', p.points
-                                               )
-                                           )
-                                           FROM t_p28902192_strikbal_rating_app.team_players tp
-                                           JOIN t_p28902192_strikbal_rating_app.players p ON tp.player_id = p.id
-                                           JOIN t_p28902192_strikbal_rating_app.users u ON p.user_id = u.id
-                                           WHERE tp.team_id = t.id),
-                                           '[]'::json
-                                       )
-                                   )
-                               ) FILTER (WHERE t.id IS NOT NULL) as teams
-                        FROM t_p28902192_strikbal_rating_app.games g
-                        LEFT JOIN t_p28902192_strikbal_rating_app.teams t ON g.id = t.game_id
-                        GROUP BY g.id
-                        ORDER BY g.created_at DESC
-                        """
-                    )
-                    games = cur.fetchall()
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'games': [dict(game) for game in games]}, default=str),
-                        'isBase64Encoded': False
-                    }
-
-                elif method == 'POST':
-                    body = json.loads(event.get('body', '{}'))
-                    name = body.get('name', '').strip()
-                    teams = body.get('teams', [])
-
-                    if not name:
-                        return {
-                            'statusCode': 400,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Укажите название игры'}),
-                            'isBase64Encoded': False
-                        }
-
-                    cur.execute(
-                        """
-                        INSERT INTO t_p28902192_strikbal_rating_app.games (name, status)
-                        VALUES (%s, %s)
-                        RETURNING id, name, status, created_at
-                        """,
-                        (name, 'active')
-                    )
-                    game = cur.fetchone()
-
-                    for team in teams:
-                        cur.execute(
-                            """
-                            INSERT INTO t_p28902192_strikbal_rating_app.teams (game_id, name, color)
-                            VALUES (%s, %s, %s)
-                            RETURNING id
-                            """,
-                            (game['id'], team['name'], team['color'])
-                        )
-                        team_record = cur.fetchone()
-
-                        for player_id in team.get('players', []):
-                            cur.execute(
-                                """
-                                INSERT INTO t_p28902192_strikbal_rating_app.team_players (team_id, player_id)
-                                VALUES (%s, %s)
-                                """,
-                                (team_record['id'], player_id)
-                            )
-
-                    conn.commit()
-
-                    return {
-                        'statusCode': 201,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'game': dict(game)}, default=str),
-                        'isBase64Encoded': False
-                    }
-
-                elif method == 'PUT':
-                    body = json.loads(event.get('body', '{}'))
-                    game_id = body.get('gameId')
-                    winner_team_id = body.get('winnerTeamId')
-
-                    if not game_id or not winner_team_id:
-                        return {
-                            'statusCode': 400,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Укажите ID игры и команды-победителя'}),
-                            'isBase64Encoded': False
-                        }
-
-                    cur.execute(
-                        """
-                        SELECT t.id FROM t_p28902192_strikbal_rating_app.teams t
-                        WHERE t.game_id = %s
-                        """,
-                        (game_id,)
-                    )
-                    teams = cur.fetchall()
-
-                    if len(teams) != 2:
-                        return {
-                            'statusCode': 400,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'В игре должно быть 2 команды'}),
-                            'isBase64Encoded': False
-                        }
-
-                    loser_team_id = [t['id'] for t in teams if t['id'] != winner_team_id][0]
-
-                    cur.execute(
-                        """
-                        SELECT COUNT(*) as count FROM t_p28902192_strikbal_rating_app.team_players
-                        WHERE team_id = %s
-                        """,
-                        (loser_team_id,)
-                    )
-                    loser_count = cur.fetchone()['count']
-
-                    points_per_winner = loser_count * 100
-                    points_per_loser = -100
-
-                    cur.execute(
-                        """
-                        UPDATE t_p28902192_strikbal_rating_app.players
-                        SET points = points + %s, wins = wins + 1
-                        WHERE id IN (
-                            SELECT player_id FROM t_p28902192_strikbal_rating_app.team_players
-                            WHERE team_id = %s
-                        )
-                        """,
-                        (points_per_winner, winner_team_id)
-                    )
-
-                    cur.execute(
-                        """
-                        UPDATE t_p28902192_strikbal_rating_app.players
-                        SET points = GREATEST(points + %s, 0), losses = losses + 1
-                        WHERE id IN (
-                            SELECT player_id FROM t_p28902192_strikbal_rating_app.team_players
-                            WHERE team_id = %s
-                        )
-                        """,
-                        (points_per_loser, loser_team_id)
-                    )
-
-                    cur.execute(
-                        """
-                        UPDATE t_p28902192_strikbal_rating_app.games
-                        SET status = 'completed', winner_team_id = %s
-                        WHERE id = %s
-                        """,
-                        (winner_team_id, game_id)
-                    )
-
-                    conn.commit()
-
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'message': 'Игра завершена, очки начислены'}),
-                        'isBase64Encoded': False
-                    }
-
-                elif method == 'DELETE':
-                    query_params = event.get('queryStringParameters', {}) or {}
-                    game_id = query_params.get('gameId')
-
-                    if not game_id:
-                        return {
-                            'statusCode': 400,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Укажите ID игры'}),
-                            'isBase64Encoded': False
-                        }
-
-                    cur.execute(
-                        """
-                        DELETE FROM t_p28902192_strikbal_rating_app.team_players
-                        WHERE team_id IN (
-                            SELECT id FROM t_p28902192_strikbal_rating_app.teams
-                            WHERE game_id = %s
-                        )
-                        """,
-                        (game_id,)
-                    )
-
-                    cur.execute(
-                        """
-                        DELETE FROM t_p28902192_strikbal_rating_app.teams
-                        WHERE game_id = %s
-                        """,
-                        (game_id,)
-                    )
-
-                    cur.execute(
-                        """
-                        DELETE FROM t_p28902192_strikbal_rating_app.games
-                        WHERE id = %s
-                        """,
-                        (game_id,)
-                    )
-
-                    conn.commit()
-
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'message': 'Игра удалена'}),
-                        'isBase64Encoded': False
-                    }
-
-                return {
-                    'statusCode': 405,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Метод не разрешен'}),
-                    'isBase64Encoded': False
-                }
-
-    except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Неверный формат данных'}),
-            'isBase64Encoded': False
-        }
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Ошибка сервера: {str(e)}'}),
-            'isBase64Encoded': False
-        }
\ No newline at end of file
+    return router.dispatch(event, context)
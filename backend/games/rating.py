@@ -0,0 +1,183 @@
+import os
+import time
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+INITIAL_RATING = 1500.0
+K_FACTOR = float(os.environ.get('ELO_K_FACTOR', '32'))
+ELO_SCALE = 400.0
+# Ключ блокировки рейтинга: завершения игр берут её разделяемой (друг другу не мешают),
+# полный пересчёт - эксклюзивной, чтобы не перезаписать рейтинг параллельно завершённых игр
+RATING_LOCK = 't_p28902192_strikbal_rating_app.players.rating'
+
+
+def schedule_levels(entry_game: np.ndarray, entry_player: np.ndarray, n_players: int) -> np.ndarray:
+    '''Уровень каждой игры: 1 + максимальный уровень предыдущих игр её участников.
+
+    Игры одного уровня не имеют общих игроков, поэтому их можно пересчитать
+    одним векторным шагом, не нарушая хронологию для каждого игрока.
+    Записи должны быть отсортированы по номеру игры.
+    '''
+    starts = np.flatnonzero(np.r_[True, entry_game[1:] != entry_game[:-1]])
+    ends = np.r_[starts[1:], len(entry_game)]
+    last = np.full(n_players, -1, dtype=np.int64)
+    levels = np.empty(len(starts), dtype=np.int64)
+    for game, (start, end) in enumerate(zip(starts, ends)):
+        members = entry_player[start:end]
+        level = last[members].max() + 1
+        last[members] = level
+        levels[game] = level
+    return levels
+
+
+def replay(entry_game: np.ndarray, entry_side: np.ndarray, entry_player: np.ndarray,
+           ratings: np.ndarray) -> np.ndarray:
+    '''Командный Эло по играм в хронологическом порядке.
+
+    entry_* - по записи на участника игры: номер игры (0..G-1, по времени),
+    сторона (0 - победители, 1 - проигравшие), индекс игрока в ratings.
+    Рейтинг команды - среднее рейтингов участников; каждый участник получает
+    изменение своей команды. ratings изменяется на месте и возвращается.
+    '''
+    if not len(entry_game):
+        return ratings
+
+    game_seq = np.cumsum(np.r_[True, entry_game[1:] != entry_game[:-1]]) - 1
+    levels = schedule_levels(entry_game, entry_player, len(ratings))
+    entry_level = levels[game_seq]
+    order = np.argsort(entry_level, kind='stable')
+    bounds = np.flatnonzero(np.diff(entry_level[order])) + 1
+
+    for idx in np.split(order, bounds):
+        side = entry_side[idx]
+        players = entry_player[idx]
+        # Внутри уровня записи идут в порядке игр (сортировка устойчивая)
+        games = entry_game[idx]
+        local = np.cumsum(np.r_[True, games[1:] != games[:-1]]) - 1
+        teams = local * 2 + side
+        n_teams = (local[-1] + 1) * 2
+
+        sums = np.bincount(teams, weights=ratings[players], minlength=n_teams)
+        counts = np.bincount(teams, minlength=n_teams)
+        means = sums / np.maximum(counts, 1)
+
+        expected_win = 1.0 / (1.0 + 10.0 ** ((means[1::2] - means[0::2]) / ELO_SCALE))
+        delta = K_FACTOR * (1.0 - expected_win)
+        np.add.at(ratings, players, np.where(side == 0, delta[local], -delta[local]))
+    return ratings
+
+
+def drop_one_sided_games(entry_game: np.ndarray, entry_side: np.ndarray, entry_player: np.ndarray) -> tuple:
+    '''Игры без победителей или без проигравших в рейтинге не участвуют'''
+    if not len(entry_game):
+        return entry_game, entry_side, entry_player
+    n_games = entry_game.max() + 1
+    sides = np.bincount(entry_game * 2 + entry_side, minlength=n_games * 2).reshape(-1, 2)
+    keep = (sides > 0).all(axis=1)[entry_game]
+    return entry_game[keep], entry_side[keep], entry_player[keep]
+
+
+def rate_games(ratings: dict, games: list) -> dict:
+    '''Инкрементальный пересчёт для только что завершённых игр.
+
+    ratings - {player_id: рейтинг}, games - [(победители, проигравшие)] по порядку.
+    Возвращает новые рейтинги участников.
+    '''
+    player_ids = sorted({pid for winners, losers in games for pid in (*winners, *losers)})
+    index = {pid: i for i, pid in enumerate(player_ids)}
+    entries = [
+        (game, side, index[pid])
+        for game, teams in enumerate(games)
+        for side, members in enumerate(teams)
+        for pid in set(members)
+    ]
+    if not entries:
+        return {}
+
+    arrays = np.array(entries, dtype=np.int64).T
+    values = np.array([ratings.get(pid, INITIAL_RATING) for pid in player_ids], dtype=np.float64)
+    replay(*drop_one_sided_games(*arrays), values)
+    return {pid: float(values[i]) for pid, i in index.items()}
+
+
+def load_history(cur) -> tuple:
+    '''Все завершённые игры одним запросом в порядке завершения: массивы записей участников и ID игроков'''
+    cur.execute(
+        """
+        SELECT g.id, CASE WHEN t.id = g.winner_team_id THEN 0 ELSE 1 END, tp.player_id
+        FROM t_p28902192_strikbal_rating_app.games g
+        JOIN t_p28902192_strikbal_rating_app.teams t ON t.game_id = g.id
+        JOIN t_p28902192_strikbal_rating_app.team_players tp ON tp.team_id = t.id
+        WHERE g.status = 'completed' AND g.winner_team_id IS NOT NULL
+        ORDER BY g.completed_at, g.id
+        """
+    )
+    rows = np.array(cur.fetchall(), dtype=np.int64).reshape(-1, 3)
+    game_ids, sides, raw_players = rows[:, 0], rows[:, 1], rows[:, 2]
+
+    entry_game = np.cumsum(np.r_[True, game_ids[1:] != game_ids[:-1]]) - 1 if len(rows) else game_ids
+    player_ids, entry_player = np.unique(raw_players, return_inverse=True)
+    return entry_game, sides, entry_player.reshape(-1), player_ids
+
+
+def lock_ratings(cur, exclusive: bool = False) -> None:
+    '''Блокировка рейтинга до конца транзакции (см. RATING_LOCK)'''
+    if exclusive:
+        cur.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (RATING_LOCK,))
+    else:
+        cur.execute('SELECT pg_advisory_xact_lock_shared(hashtext(%s))', (RATING_LOCK,))
+
+
+def save_ratings(cur, ratings: dict) -> None:
+    '''Запись рейтингов участников одним UPDATE'''
+    if not ratings:
+        return
+    execute_values(
+        cur,
+        """
+        UPDATE t_p28902192_strikbal_rating_app.players p
+        SET rating = v.rating
+        FROM (VALUES %s) as v(id, rating)
+        WHERE p.id = v.id
+        """,
+        list(ratings.items()),
+        page_size=len(ratings)
+    )
+
+
+def replay_all(cur) -> dict:
+    '''Полный пересчёт рейтинга всех игроков по истории игр (cur - обычный курсор)'''
+    started = time.perf_counter()
+    # История читается после блокировки: в неё попадают все завершения, зафиксированные
+    # до пересчёта, а новые ждут его фиксации
+    lock_ratings(cur, exclusive=True)
+    entry_game, sides, entry_player, player_ids = load_history(cur)
+    loaded = time.perf_counter()
+
+    ratings = np.full(len(player_ids), INITIAL_RATING)
+    replay(*drop_one_sided_games(entry_game, sides, entry_player), ratings)
+    computed = time.perf_counter()
+
+    # Игроки без завершённых игр получают начальный рейтинг в том же UPDATE
+    execute_values(
+        cur,
+        f"""
+        UPDATE t_p28902192_strikbal_rating_app.players p
+        SET rating = COALESCE(v.rating, {INITIAL_RATING})
+        FROM t_p28902192_strikbal_rating_app.players q
+        LEFT JOIN (VALUES %s) as v(id, rating) ON v.id = q.id
+        WHERE p.id = q.id AND p.rating IS DISTINCT FROM COALESCE(v.rating, {INITIAL_RATING})
+        """,
+        [(int(pid), float(r)) for pid, r in zip(player_ids, ratings)] or [(0, INITIAL_RATING)],
+        page_size=max(len(player_ids), 1)
+    )
+
+    return {
+        'games': int(entry_game[-1]) + 1 if len(entry_game) else 0,
+        'entries': len(entry_game),
+        'players': len(player_ids),
+        'loadSeconds': round(loaded - started, 3),
+        'replaySeconds': round(computed - loaded, 3),
+        'totalSeconds': round(time.perf_counter() - started, 3)
+    }
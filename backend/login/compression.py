@@ -0,0 +1,90 @@
+import base64
+import functools
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from metrics import phase
+
+MIN_COMPRESS_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def parse_accept_encoding(value: str) -> dict:
+    '''Accept-Encoding -> {кодировка: q}'''
+    encodings = {}
+    for part in value.split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(accept_encoding: str):
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    options = [('br', accepted.get('br', wildcard))] if brotli else []
+    options.append(('gzip', accepted.get('gzip', wildcard)))
+    best, q = max(options, key=lambda option: option[1])
+    return best if q > 0 else None
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(event: dict, response: dict) -> dict:
+    '''Сжатие тела ответа по Accept-Encoding; тело кодируется в base64, как требует платформа'''
+    body = response.get('body')
+    if not body or response.get('isBase64Encoded') or not isinstance(body, str):
+        return response
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+
+    # Ответ зависит от Accept-Encoding, даже если клиент получает его без сжатия:
+    # иначе общий кэш отдаст несжатое тело клиенту со сжатием и наоборот
+    response_headers = dict(response.get('headers') or {})
+    response_headers['Vary'] = 'Accept-Encoding'
+    response = {**response, 'headers': response_headers}
+
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    accept_encoding = headers.get('accept-encoding') or ''
+    encoding = choose_encoding(accept_encoding) if accept_encoding else None
+    if not encoding:
+        return response
+
+    raw = body.encode()
+    with phase('compress'):
+        compressed = compress_body(raw, encoding)
+    if len(compressed) >= len(raw):
+        return response
+
+    response_headers['Content-Encoding'] = encoding
+    return {
+        **response,
+        'body': base64.b64encode(compressed).decode(),
+        'isBase64Encoded': True
+    }
+
+
+def compressed(handler):
+    '''Декоратор обработчика функции: сжимает крупные ответы'''
+    @functools.wraps(handler)
+    def wrapper(event: dict, context) -> dict:
+        return compress_response(event, handler(event, context))
+    return wrapper
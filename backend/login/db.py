@@ -0,0 +1,127 @@
+import os
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+
+from metrics import InstrumentedConnection, phase
+
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', '4'))
+CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '10000'))
+HEALTHCHECK_IDLE_SECONDS = float(os.environ.get('DB_HEALTHCHECK_IDLE_SECONDS', '30'))
+REPLICA_RETRY_SECONDS = float(os.environ.get('DB_REPLICA_RETRY_SECONDS', '30'))
+
+# Пулы живут на уровне модуля и переживают тёплые вызовы функции
+_pools: dict = {}
+_last_used: dict = {}
+_timeouts: dict = {}
+_replica_down_until = 0.0
+
+
+def _get_pool(dsn: str) -> pool.ThreadedConnectionPool:
+    '''Ленивое создание пула соединений для DSN'''
+    conn_pool = _pools.get(dsn)
+    if conn_pool is None or conn_pool.closed:
+        conn_pool = pool.ThreadedConnectionPool(
+            POOL_MIN,
+            POOL_MAX,
+            dsn=dsn,
+            connection_factory=InstrumentedConnection,
+            connect_timeout=CONNECT_TIMEOUT,
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+            keepalives_count=3
+        )
+        _pools[dsn] = conn_pool
+    return conn_pool
+
+
+def _forget(conn) -> None:
+    _last_used.pop(id(conn), None)
+    _timeouts.pop(id(conn), None)
+
+
+def _discard(conn_pool: pool.ThreadedConnectionPool, conn) -> None:
+    '''Закрытие сломанного соединения с освобождением слота в пуле'''
+    _forget(conn)
+    try:
+        conn_pool.putconn(conn, close=True)
+    except pool.PoolError:
+        pass
+
+
+def _is_healthy(conn) -> bool:
+    '''Проверка соединения перед выдачей: пинг только после долгого простоя'''
+    if conn.closed:
+        return False
+    last_used = _last_used.get(id(conn))
+    if last_used is not None and time.monotonic() - last_used < HEALTHCHECK_IDLE_SECONDS:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout(conn_pool: pool.ThreadedConnectionPool, statement_timeout_ms: int):
+    for _ in range(POOL_MAX + 1):
+        conn = conn_pool.getconn()
+        if _is_healthy(conn):
+            break
+        _discard(conn_pool, conn)
+    else:
+        raise psycopg2.OperationalError('Не удалось получить соединение с базой данных')
+
+    if _timeouts.get(id(conn)) != statement_timeout_ms:
+        with conn.cursor() as cur:
+            cur.execute('SET statement_timeout = %s', (statement_timeout_ms,))
+        conn.commit()
+        _timeouts[id(conn)] = statement_timeout_ms
+    return conn
+
+
+def _acquire(replica: bool, statement_timeout_ms: int) -> tuple:
+    '''Пул и соединение; если реплика недоступна, чтение уходит на основную базу,
+    и реплика не используется следующие REPLICA_RETRY_SECONDS'''
+    global _replica_down_until
+    read_dsn = os.environ.get('DATABASE_READ_URL') if replica else None
+    if read_dsn and time.monotonic() >= _replica_down_until:
+        try:
+            conn_pool = _get_pool(read_dsn)
+            return conn_pool, _checkout(conn_pool, statement_timeout_ms)
+        except psycopg2.OperationalError:
+            _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+    conn_pool = _get_pool(os.environ['DATABASE_URL'])
+    return conn_pool, _checkout(conn_pool, statement_timeout_ms)
+
+
+@contextmanager
+def get_connection(statement_timeout_ms: int = STATEMENT_TIMEOUT_MS, replica: bool = False):
+    '''Соединение из пула: commit при успехе, rollback при ошибке, возврат в пул.
+
+    replica=True - соединение с репликой DATABASE_READ_URL, если она задана; только для чтения.
+    '''
+    with phase('pool'):
+        conn_pool, conn = _acquire(replica, statement_timeout_ms)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass
+        raise
+    finally:
+        if conn.closed:
+            _discard(conn_pool, conn)
+        else:
+            _last_used[id(conn)] = time.monotonic()
+            conn_pool.putconn(conn)
@@ -1,124 +1,195 @@
-import json
-import os
 import hashlib
+import os
 import secrets
+import time
 from datetime import datetime, timedelta
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from db import get_connection
+from compression import compressed
+from metrics import instrumented
+from core import HttpError, Request, Router, respond
 
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
+SESSION_TTL = timedelta(days=30)
+MAX_DEVICE_ID_LENGTH = 100
+MAX_SESSIONS_PER_USER = int(os.environ.get('MAX_SESSIONS_PER_USER', '10'))
+SWEEP_BATCH_SIZE = int(os.environ.get('SESSION_SWEEP_BATCH', '500'))
+SWEEP_INTERVAL_SECONDS = float(os.environ.get('SESSION_SWEEP_INTERVAL_SECONDS', '300'))
+REVOCATION_RETENTION_SECONDS = 3600
+
+_last_sweep = 0.0
+
 def generate_token() -> str:
     return secrets.token_urlsafe(32)
 
-def handler(event: dict, context) -> dict:
-    '''API для авторизации пользователей'''
-    method = event.get('httpMethod', 'GET')
-
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+def parse_device_id(value) -> str:
+    '''Идентификатор устройства клиента (необязательный)'''
+    if value is None:
+        return ''
+    if not isinstance(value, str) or len(value) > MAX_DEVICE_ID_LENGTH:
+        raise HttpError(400, 'Неверный идентификатор устройства')
+    return value.strip()
 
-    if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Метод не разрешен'}),
-            'isBase64Encoded': False
-        }
+def open_session(cur, user_id: int, device_id: str) -> str:
+    '''Новый токен; для известного устройства сессия ротируется в той же строке'''
+    token = generate_token()
+    expires_at = datetime.utcnow() + SESSION_TTL
 
-    try:
-        body = json.loads(event.get('body', '{}'))
-        email = body.get('email', '').strip().lower()
-        password = body.get('password', '').strip()
-
-        if not email or not password:
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Введите email и пароль'}),
-                'isBase64Encoded': False
-            }
+    if device_id:
+        cur.execute(
+            """
+            INSERT INTO t_p28902192_strikbal_rating_app.sessions
+            (user_id, token, expires_at, device_id)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (user_id, device_id) WHERE device_id IS NOT NULL
+            DO UPDATE SET token = EXCLUDED.token, expires_at = EXCLUDED.expires_at, created_at = NOW()
+            """,
+            (user_id, token, expires_at, device_id)
+        )
+        return token
 
-        password_hash = hash_password(password)
-        dsn = os.environ['DATABASE_URL']
+    cur.execute(
+        """
+        INSERT INTO t_p28902192_strikbal_rating_app.sessions 
+        (user_id, token, expires_at)
+        VALUES (%s, %s, %s)
+        """,
+        (user_id, token, expires_at)
+    )
+    # Без идентификатора устройства число таких сессий пользователя ограничено:
+    # самые старые вытесняются, сессии устройств не затрагиваются
+    cur.execute(
+        """
+        DELETE FROM t_p28902192_strikbal_rating_app.sessions
+        WHERE id IN (
+            SELECT id FROM t_p28902192_strikbal_rating_app.sessions
+            WHERE user_id = %s AND device_id IS NULL
+            ORDER BY expires_at DESC
+            OFFSET %s
+        )
+        """,
+        (user_id, MAX_SESSIONS_PER_USER)
+    )
+    return token
 
-        with psycopg2.connect(dsn) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(
-                    """
-                    SELECT u.id, u.email, u.name, u.avatar, u.is_admin, p.id as player_id, p.points, p.wins, p.losses
-                    FROM t_p28902192_strikbal_rating_app.users u
-                    LEFT JOIN t_p28902192_strikbal_rating_app.players p ON u.id = p.user_id
-                    WHERE u.email = %s AND u.password_hash = %s
-                    """,
-                    (email, password_hash)
-                )
-                user = cur.fetchone()
+def sweep_expired_sessions(cur) -> int:
+    '''Удаление пачки истёкших сессий; не чаще раза в SWEEP_INTERVAL_SECONDS на экземпляр'''
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep < SWEEP_INTERVAL_SECONDS:
+        return 0
+    _last_sweep = now
+
+    cur.execute(
+        """
+        DELETE FROM t_p28902192_strikbal_rating_app.sessions
+        WHERE id = ANY(ARRAY(
+            SELECT id FROM t_p28902192_strikbal_rating_app.sessions
+            WHERE expires_at <= NOW()
+            ORDER BY expires_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ))
+        """,
+        (SWEEP_BATCH_SIZE,)
+    )
+    swept = cur.rowcount
+
+    # Журнал отзыва нужен кэшам токенов только на время их TTL
+    cur.execute(
+        """
+        DELETE FROM t_p28902192_strikbal_rating_app.revoked_sessions
+        WHERE id = ANY(ARRAY(
+            SELECT id FROM t_p28902192_strikbal_rating_app.revoked_sessions
+            WHERE revoked_at <= NOW() - make_interval(secs => %s)
+            ORDER BY id
+            LIMIT %s
+        ))
+        """,
+        (REVOCATION_RETENTION_SECONDS, SWEEP_BATCH_SIZE)
+    )
+    return swept
+
+router = Router(allow_headers='Content-Type, Authorization, X-Authorization')
 
-                if not user:
-                    return {
-                        'statusCode': 401,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Неверный email или пароль'}),
-                        'isBase64Encoded': False
-                    }
+@router.route('POST')
+def post_login(req: Request) -> dict:
+    '''Вход по email и паролю: создание или ротация сессии устройства'''
+    email = req.body.get('email', '').strip().lower()
+    password = req.body.get('password', '').strip()
+    device_id = parse_device_id(req.body.get('deviceId'))
 
-                token = generate_token()
-                expires_at = datetime.utcnow() + timedelta(days=30)
+    if not email or not password:
+        raise HttpError(400, 'Введите email и пароль')
 
+    password_hash = hash_password(password)
+
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT u.id, u.email, u.name, u.avatar, u.is_admin, p.id as player_id, p.points, p.wins, p.losses
+                FROM t_p28902192_strikbal_rating_app.users u
+                LEFT JOIN t_p28902192_strikbal_rating_app.players p ON u.id = p.user_id
+                WHERE u.email = %s AND u.password_hash = %s
+                """,
+                (email, password_hash)
+            )
+            user = cur.fetchone()
+
+            if not user:
+                raise HttpError(401, 'Неверный email или пароль')
+
+            token = open_session(cur, user['id'], device_id)
+            sweep_expired_sessions(cur)
+
+    return respond(200, {
+        'token': token,
+        'user': {
+            'id': user['id'],
+            'email': user['email'],
+            'name': user['name'],
+            'avatar': user['avatar'],
+            'isAdmin': user['is_admin'],
+            'player': {
+                'id': user['player_id'],
+                'points': user['points'],
+                'wins': user['wins'],
+                'losses': user['losses']
+            }
+        }
+    })
+
+@router.route('POST', action='logout', auth=True)
+def post_logout(req: Request) -> dict:
+    '''Выход: удаление текущей сессии или всех сессий пользователя (all=true)'''
+    logout_all = bool(req.body.get('all'))
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            if logout_all:
                 cur.execute(
                     """
-                    INSERT INTO t_p28902192_strikbal_rating_app.sessions 
-                    (user_id, token, expires_at)
-                    VALUES (%s, %s, %s)
+                    DELETE FROM t_p28902192_strikbal_rating_app.sessions
+                    WHERE user_id = (
+                        SELECT user_id FROM t_p28902192_strikbal_rating_app.sessions
+                        WHERE token = %s
+                    )
                     """,
-                    (user['id'], token, expires_at)
+                    (req.token,)
                 )
-                conn.commit()
-
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'token': token,
-                        'user': {
-                            'id': user['id'],
-                            'email': user['email'],
-                            'name': user['name'],
-                            'avatar': user['avatar'],
-                            'isAdmin': user['is_admin'],
-                            'player': {
-                                'id': user['player_id'],
-                                'points': user['points'],
-                                'wins': user['wins'],
-                                'losses': user['losses']
-                            }
-                        }
-                    }),
-                    'isBase64Encoded': False
-                }
-
-    except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Неверный формат данных'}),
-            'isBase64Encoded': False
-        }
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Ошибка сервера: {str(e)}'}),
-            'isBase64Encoded': False
-        }
+            else:
+                cur.execute(
+                    "DELETE FROM t_p28902192_strikbal_rating_app.sessions WHERE token = %s",
+                    (req.token,)
+                )
+
+    return respond(200, {'message': 'Вы вышли из аккаунта'})
+
+@instrumented
+@compressed
+def handler(event: dict, context) -> dict:
+    '''API для авторизации пользователей'''
+    return router.dispatch(event, context)
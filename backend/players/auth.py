@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from core import HttpError
+from metrics import phase
+
+CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', '2048'))
+CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', '60'))
+NEGATIVE_TTL_SECONDS = float(os.environ.get('AUTH_NEGATIVE_TTL_SECONDS', '5'))
+# Журнал отзыва сессий читается не чаще раза в это время (и перед каждой записью)
+REVOCATION_POLL_SECONDS = float(os.environ.get('AUTH_REVOCATION_POLL_SECONDS', '1'))
+REVOCATION_BATCH = 1000
+# id журнала выдаются до фиксации, поэтому строка с меньшим id может появиться позже:
+# пропуск в id перечитывается, пока не появится строка или не пройдёт это время
+# (пропуски от откатившихся транзакций не заполняются никогда)
+REVOCATION_GAP_SECONDS = float(os.environ.get('AUTH_REVOCATION_GAP_SECONDS', '60'))
+
+
+class SessionCache:
+    '''LRU-кэш с TTL для сессий: токен -> данные пользователя или None'''
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> tuple:
+        with self._lock:
+            item = self._items.get(token)
+            if item is None:
+                return False, None
+            session, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._items[token]
+                return False, None
+            self._items.move_to_end(token)
+            return True, session
+
+    def put(self, token: str, session: Optional[dict], ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._items[token] = (session, time.monotonic() + ttl)
+            self._items.move_to_end(token)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._items.pop(token, None)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            stale = [t for t, (s, _) in self._items.items() if s and s['user_id'] == user_id]
+            for token in stale:
+                del self._items[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_cache = SessionCache(CACHE_SIZE)
+_revocations_lock = threading.Lock()
+_last_revocation_id: Optional[int] = None
+_max_revocation_id = 0
+_revocation_gaps: dict = {}
+_last_revocation_poll = 0.0
+
+
+def resolve_session(cur, token: str, fresh: bool = False) -> Optional[dict]:
+    '''Пользователь по токену сессии (курсор должен быть RealDictCursor).
+
+    fresh=True - журнал отзыва сессий читается перед проверкой обязательно
+    (маршруты записи), иначе не чаще раза в REVOCATION_POLL_SECONDS.
+    '''
+    if not token:
+        return None
+    with phase('auth'):
+        poll_revocations(cur, force=fresh)
+        return _resolve_session(cur, token)
+
+
+def poll_revocations(cur, force: bool = False) -> None:
+    '''Сброс из кэша сессий, отозванных в других функциях (выход, ротация, смена прав)
+
+    _last_revocation_id - id, до которого журнал прочитан без пропусков;
+    _max_revocation_id - наибольший обработанный id;
+    _revocation_gaps - ещё не появившиеся id между ними и время, когда их заметили.
+    '''
+    global _last_revocation_id, _max_revocation_id, _last_revocation_poll
+    now = time.monotonic()
+    if not force and now - _last_revocation_poll < REVOCATION_POLL_SECONDS:
+        return
+    with _revocations_lock:
+        _last_revocation_poll = now
+        if _last_revocation_id is None:
+            # До первого чтения журнала кэш пуст: достаточно запомнить конец журнала
+            _cache.clear()
+            cur.execute("SELECT COALESCE(MAX(id), 0) as id FROM t_p28902192_strikbal_rating_app.revoked_sessions")
+            _last_revocation_id = _max_revocation_id = cur.fetchone()['id']
+            return
+        cur.execute(
+            """
+            SELECT id, token, user_id FROM t_p28902192_strikbal_rating_app.revoked_sessions
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+            """,
+            (_last_revocation_id, REVOCATION_BATCH)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return
+        if len(rows) == REVOCATION_BATCH:
+            # Отстали слишком сильно: проще начать с пустого кэша
+            _cache.clear()
+            _revocation_gaps.clear()
+            _last_revocation_id = _max_revocation_id = rows[-1]['id']
+            return
+
+        seen = {row['id'] for row in rows}
+        for row in rows:
+            # Строки выше пропуска перечитываются, пока пропуск не закроется: сброс повторно не нужен
+            if row['id'] in _revocation_gaps or row['id'] > _max_revocation_id:
+                if row['token']:
+                    invalidate_token(row['token'])
+                if row['user_id']:
+                    invalidate_user(row['user_id'])
+            _revocation_gaps.pop(row['id'], None)
+
+        for gap in range(_max_revocation_id + 1, rows[-1]['id']):
+            if gap not in seen:
+                _revocation_gaps[gap] = now
+        _max_revocation_id = max(_max_revocation_id, rows[-1]['id'])
+        for gap, noticed in list(_revocation_gaps.items()):
+            if now - noticed > REVOCATION_GAP_SECONDS:
+                del _revocation_gaps[gap]
+
+        _last_revocation_id = min(_revocation_gaps) - 1 if _revocation_gaps else _max_revocation_id
+
+
+def _resolve_session(cur, token: str) -> Optional[dict]:
+    hit, session = _cache.get(token)
+    if hit:
+        return session
+
+    cur.execute(
+        """
+        SELECT u.id as user_id, u.name, u.is_admin, p.id as player_id,
+               EXTRACT(EPOCH FROM (s.expires_at - NOW())) as ttl
+        FROM t_p28902192_strikbal_rating_app.sessions s
+        JOIN t_p28902192_strikbal_rating_app.users u ON s.user_id = u.id
+        LEFT JOIN t_p28902192_strikbal_rating_app.players p ON p.user_id = u.id
+        WHERE s.token = %s AND s.expires_at > NOW()
+        LIMIT 1
+        """,
+        (token,)
+    )
+    row = cur.fetchone()
+
+    if not row:
+        _cache.put(token, None, NEGATIVE_TTL_SECONDS)
+        return None
+
+    session = {
+        'user_id': row['user_id'],
+        'name': row['name'],
+        'is_admin': bool(row['is_admin']),
+        'player_id': row['player_id']
+    }
+    _cache.put(token, session, min(CACHE_TTL_SECONDS, float(row['ttl'])))
+    return session
+
+
+def verify_admin(cur, token: str) -> bool:
+    '''Проверка прав администратора по токену'''
+    session = resolve_session(cur, token)
+    return bool(session and session['is_admin'])
+
+
+def require_admin(cur, token: str) -> dict:
+    '''Сессия администратора или HttpError 403; отозванная сессия не проходит и из кэша'''
+    session = resolve_session(cur, token, fresh=True)
+    if not session or not session['is_admin']:
+        raise HttpError(403, 'Требуются права администратора')
+    return session
+
+
+def invalidate_token(token: str) -> None:
+    '''Сброс кэша для токена (выход из аккаунта)'''
+    _cache.invalidate(token)
+
+
+def invalidate_user(user_id: int) -> None:
+    '''Сброс кэша всех сессий пользователя (смена прав администратора)'''
+    _cache.invalidate_user(user_id)
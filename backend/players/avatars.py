@@ -0,0 +1,125 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+
+import boto3
+from botocore.exceptions import ClientError
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+S3_ENDPOINT = os.environ.get('S3_ENDPOINT', 'https://bucket.poehali.dev')
+S3_BUCKET = 'files'
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+MAX_SOURCE_PIXELS = 40_000_000
+ALLOWED_FORMATS = ('PNG', 'JPEG', 'WEBP', 'GIF')
+VARIANT_SIZES = (64, 128, 256)
+LIST_VARIANT_SIZE = 128
+OUTPUT_FORMAT = os.environ.get('AVATAR_FORMAT', 'webp').lower()
+
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+Image.MAX_IMAGE_PIXELS = MAX_SOURCE_PIXELS
+
+_s3 = None
+
+
+class AvatarError(ValueError):
+    '''Некорректное изображение аватара'''
+
+
+def get_s3():
+    '''S3-клиент создаётся один раз и переиспользуется между вызовами'''
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client(
+            's3',
+            endpoint_url=S3_ENDPOINT,
+            aws_access_key_id=os.environ['AWS_ACCESS_KEY_ID'],
+            aws_secret_access_key=os.environ['AWS_SECRET_ACCESS_KEY']
+        )
+    return _s3
+
+
+def cdn_url(key: str) -> str:
+    return f"https://cdn.poehali.dev/projects/{os.environ['AWS_ACCESS_KEY_ID']}/bucket/{key}"
+
+
+def decode_upload(avatar_base64: str) -> bytes:
+    '''Base64 (в том числе data URL) -> байты с ограничением размера'''
+    if avatar_base64.startswith('data:'):
+        avatar_base64 = avatar_base64.split(',', 1)[-1]
+    if len(avatar_base64) > MAX_UPLOAD_BYTES * 4 // 3 + 4:
+        raise AvatarError('Файл слишком большой (максимум 5 МБ)')
+    try:
+        return base64.b64decode(avatar_base64, validate=True)
+    except (binascii.Error, ValueError):
+        raise AvatarError('Неверный формат base64')
+
+
+def open_image(data: bytes) -> Image.Image:
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.format not in ALLOWED_FORMATS:
+            raise AvatarError('Поддерживаются только PNG, JPEG, WebP и GIF')
+        image.load()
+        # Варианты сохраняются без EXIF: поворот и отражение из тега Orientation
+        # (фото с телефонов) применяются к пикселям
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise AvatarError('Не удалось прочитать изображение')
+    return image
+
+
+def render_variant(image: Image.Image, size: int) -> bytes:
+    '''Квадратная миниатюра: обрезка по центру и уменьшение'''
+    side = min(image.size)
+    left = (image.width - side) // 2
+    top = (image.height - side) // 2
+    square = image.crop((left, top, left + side, top + side))
+    square = square.convert('RGBA' if OUTPUT_FORMAT == 'webp' else 'RGB')
+    square = square.resize((size, size), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    if OUTPUT_FORMAT == 'webp':
+        square.save(buffer, 'WEBP', quality=82, method=4)
+    else:
+        square.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def variant_key(content_hash: str, size: int) -> str:
+    return f'avatars/{content_hash}/{size}.{OUTPUT_FORMAT}'
+
+
+def object_exists(key: str) -> bool:
+    try:
+        get_s3().head_object(Bucket=S3_BUCKET, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+
+def process_avatar(avatar_base64: str) -> dict:
+    '''Декодирование, миниатюры и загрузка в S3 по хэшу содержимого: {размер: URL}'''
+    data = decode_upload(avatar_base64)
+    content_hash = hashlib.sha256(data).hexdigest()[:32]
+    variants = {str(size): cdn_url(variant_key(content_hash, size)) for size in VARIANT_SIZES}
+
+    # Самый большой вариант загружается последним, поэтому его наличие
+    # означает, что этот файл уже полностью обработан
+    if object_exists(variant_key(content_hash, VARIANT_SIZES[-1])):
+        return variants
+
+    image = open_image(data)
+    for size in VARIANT_SIZES:
+        get_s3().put_object(
+            Bucket=S3_BUCKET,
+            Key=variant_key(content_hash, size),
+            Body=render_variant(image, size),
+            ContentType=CONTENT_TYPES[OUTPUT_FORMAT],
+            CacheControl='public, max-age=31536000, immutable'
+        )
+    return variants
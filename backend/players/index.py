@@ -1,454 +1,271 @@
 import json
-import os
-import base64
-import uuid
-import psycopg2
 from psycopg2.extras import RealDictCursor
-import boto3
-
-def verify_admin(token: str, dsn: str) -> bool:
-    '''Проверка прав администратора по токену'''
-    if not token:
-        return False
-    
-    with psycopg2.connect(dsn) as conn:
+from db import get_connection
+from compression import compressed
+from metrics import instrumented
+from core import HttpError, Request, Router, decode_cursor, encode_cursor, not_modified, parse_limit, respond, respond_cacheable
+from auth import require_admin, resolve_session, verify_admin
+from avatars import LIST_VARIANT_SIZE, AvatarError, process_avatar
+from versions import bump_versions, compute_etag, is_not_modified, request_variant
+from ranking import DEFAULT_NEIGHBOURS, MAX_NEIGHBOURS, get_players_around_position
+from profiles import (
+    DEFAULT_HISTORY_PAGE_SIZE, DEFAULT_TIMELINE_PAGE_SIZE, HISTORY_CURSOR_TYPES, MAX_HISTORY_PAGE_SIZE,
+    MAX_TIMELINE_PAGE_SIZE, fetch_player_games, fetch_player_tasks, fetch_point_timeline, fetch_profile
+)
+
+MAX_PAGE_SIZE = 500
+DEFAULT_PAGE_SIZE = 100
+
+LEADERBOARD_PAGE = """
+    SELECT
+        {columns},
+        l.points,
+        ROUND(l.rating)::int as rating,
+        l.wins,
+        l.losses,
+        b.rank
+    FROM ({rows}) l
+    {join}
+    JOIN t_p28902192_strikbal_rating_app.player_rank_buckets b ON b.points = l.points
+    ORDER BY l.points DESC, l.name ASC, l.user_id ASC
+"""
+
+LEADERBOARD_ROWS = """
+    SELECT * FROM t_p28902192_strikbal_rating_app.leaderboard
+    {where}
+    ORDER BY {order}
+    {limit}
+"""
+
+def fetch_leaderboard(cur, is_admin: bool, limit, after) -> tuple:
+    '''Страница рейтинга в порядке (очки DESC, имя, id) с местами и курсор следующей страницы'''
+    columns = 'l.user_id as id, l.name, u.email, l.avatar' if is_admin else 'l.user_id as id, l.name, l.avatar'
+    join = 'JOIN t_p28902192_strikbal_rating_app.users u ON u.id = l.user_id' if is_admin else ''
+    limit_clause = 'LIMIT %s' if limit is not None else ''
+    limit_params = [limit + 1] if limit is not None else []
+
+    if after:
+        points, name, user_id = after
+        # Остаток корзины курсора и корзины ниже читаются отдельными диапазонами индекса
+        rows = ' UNION ALL '.join(
+            f'({LEADERBOARD_ROWS.format(where=where, order=order, limit=limit_clause)})'
+            for where, order in (
+                ('WHERE points = %s AND (name, user_id) > (%s, %s)', 'name ASC, user_id ASC'),
+                ('WHERE points < %s', 'points DESC, name ASC, user_id ASC')
+            )
+        )
+        params = [points, name, user_id] + limit_params + [points] + limit_params
+    else:
+        rows = LEADERBOARD_ROWS.format(where='', order='points DESC, name ASC, user_id ASC', limit=limit_clause)
+        params = list(limit_params)
+
+    query = LEADERBOARD_PAGE.format(columns=columns, rows=rows, join=join)
+    if limit is not None:
+        query += ' LIMIT %s'
+        params.append(limit + 1)
+
+    cur.execute(query, params)
+    players = [dict(row) for row in cur.fetchall()]
+
+    next_cursor = None
+    if limit is not None and len(players) > limit:
+        players = players[:limit]
+        last = players[-1]
+        next_cursor = encode_cursor([last['points'], last['name'], last['id']])
+    return players, next_cursor
+
+router = Router(allow_headers='Content-Type, Authorization, X-Authorization, If-None-Match, X-Read-After-Write', max_age=86400)
+
+@router.route('POST', auth=True)
+def post_avatar(req: Request) -> dict:
+    '''Загрузка аватара текущего пользователя'''
+    avatar_base64 = req.body.get('avatar_base64', '')
+    if not avatar_base64:
+        raise HttpError(400, 'Требуется avatar_base64')
+
+    with get_connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            session = resolve_session(cur, req.token, fresh=True)
+            if not session:
+                raise HttpError(403, 'Нет доступа - токен не найден или истёк')
+
+    try:
+        variants = process_avatar(avatar_base64)
+    except AvatarError as e:
+        raise HttpError(400, str(e))
+    except Exception as e:
+        raise HttpError(500, f'Ошибка загрузки: {str(e)}')
+
+    avatar_url = variants[str(LIST_VARIANT_SIZE)]
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT u.is_admin 
-                FROM t_p28902192_strikbal_rating_app.sessions s
-                JOIN t_p28902192_strikbal_rating_app.users u ON s.user_id = u.id
-                WHERE s.token = %s AND s.expires_at > NOW()
+                UPDATE t_p28902192_strikbal_rating_app.users
+                SET avatar = %s, avatar_variants = %s, updated_at = NOW()
+                WHERE id = %s
                 """,
-                (token,)
+                (avatar_url, json.dumps(variants), session['user_id'])
             )
-            result = cur.fetchone()
-            return result['is_admin'] if result else False
+            bump_versions(cur, 'players')
 
-def handler(event: dict, context) -> dict:
-    '''API для получения списка игроков, профиля игрока и загрузки аватаров'''
-    method = event.get('httpMethod', 'GET')
-    query_params = event.get('queryStringParameters', {}) or {}
-    action = query_params.get('action', '')
-    
-    print(f"Request received: method={method}, action={action}")
-
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Authorization',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-
-    if method == 'POST':
-        try:
-            headers = event.get('headers', {})
-            print(f"Headers received: {headers}")
-            
-            auth_header = headers.get('x-authorization', headers.get('X-Authorization', ''))
-            if not auth_header:
-                auth_header = headers.get('authorization', headers.get('Authorization', ''))
-            
-            print(f"Auth header: {auth_header}")
-            token = auth_header.replace('Bearer ', '').replace('bearer ', '').strip() if auth_header else ''
-
-            if not token:
-                return {
-                    'statusCode': 401,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Требуется авторизация'}),
-                    'isBase64Encoded': False
-                }
-
-            dsn = os.environ['DATABASE_URL']
-            body = json.loads(event.get('body', '{}'))
-            avatar_base64 = body.get('avatar_base64', '')
-
-            if not avatar_base64:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Требуется avatar_base64'}),
-                    'isBase64Encoded': False
-                }
-
-            print(f"Token from request: {token[:20]}...")
-
-            with psycopg2.connect(dsn) as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        """
-                        SELECT u.id, u.name
-                        FROM t_p28902192_strikbal_rating_app.sessions s
-                        JOIN t_p28902192_strikbal_rating_app.users u ON s.user_id = u.id
-                        WHERE s.token = %s AND s.expires_at > NOW()
-                        """,
-                        (token,)
-                    )
-                    result = cur.fetchone()
-                    print(f"Database query result: {result}")
-                    
-                    if not result:
-                        return {
-                            'statusCode': 403,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Нет доступа - токен не найден или истёк'}),
-                            'isBase64Encoded': False
-                        }
-                    
-                    player_id = result['id']
-                    print(f"User found: {result['name']} (ID: {player_id})")
-
-            if avatar_base64.startswith('data:image'):
-                avatar_base64 = avatar_base64.split(',')[1]
-
-            image_data = base64.b64decode(avatar_base64)
-            file_key = f'avatars/{uuid.uuid4()}.png'
-
-            s3 = boto3.client('s3',
-                endpoint_url='https://bucket.poehali.dev',
-                aws_access_key_id=os.environ['AWS_ACCESS_KEY_ID'],
-                aws_secret_access_key=os.environ['AWS_SECRET_ACCESS_KEY']
-            )
+    return respond(200, {'avatar_url': avatar_url, 'avatar_variants': variants})
 
-            s3.put_object(
-                Bucket='files',
-                Key=file_key,
-                Body=image_data,
-                ContentType='image/png'
-            )
+@router.route('POST', action='rebuild_leaderboard', auth=True)
+def post_rebuild_leaderboard(req: Request) -> dict:
+    '''Полная пересборка рейтинга и мест из players и users (восстановление после ручных правок)'''
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            require_admin(cur, req.token)
+            cur.execute("SELECT t_p28902192_strikbal_rating_app.rebuild_leaderboard() as players")
+            players = cur.fetchone()['players']
+            bump_versions(cur, 'players')
+
+    return respond(200, {'players': players})
+
+@router.route('GET')
+def get_leaderboard(req: Request) -> dict:
+    '''Рейтинг игроков постранично; для администратора - с email и без limit целиком'''
+    limit = parse_limit(req.query.get('limit'), MAX_PAGE_SIZE)
+    after = None
+    if req.query.get('after'):
+        after = decode_cursor(req.query['after'], (int, str, int))
+    with_total = req.query.get('withTotal', '') in ('1', 'true')
+
+    with get_connection(replica=req.use_replica) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            is_admin = verify_admin(cur, req.token)
+            # Весь список нужен только формам администратора (выбор игроков в команды)
+            if limit is None and not is_admin:
+                limit = DEFAULT_PAGE_SIZE
+            if limit is None:
+                after = None
+
+            etag = compute_etag(cur, ('players',), request_variant(req.query, is_admin))
+            if is_not_modified(req.headers, etag):
+                return not_modified(etag)
+
+            players, next_cursor = fetch_leaderboard(cur, is_admin, limit, after)
+            result = {'players': players}
+
+            if limit is not None:
+                result['nextCursor'] = next_cursor
+                if with_total:
+                    cur.execute("SELECT COUNT(*) as total FROM t_p28902192_strikbal_rating_app.leaderboard")
+                    result['total'] = cur.fetchone()['total']
+
+    return respond_cacheable(result, etag)
+
+@router.route('GET', action='player')
+def get_player(req: Request) -> dict:
+    '''Публичный профиль игрока по ID пользователя'''
+    user_id = req.query.get('id')
+    if not user_id:
+        raise HttpError(400, 'Требуется ID игрока')
+    if not user_id.isdigit():
+        raise HttpError(400, 'Неверный ID игрока')
 
-            avatar_url = f"https://cdn.poehali.dev/projects/{os.environ['AWS_ACCESS_KEY_ID']}/bucket/{file_key}"
-
-            with psycopg2.connect(dsn) as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        UPDATE t_p28902192_strikbal_rating_app.users
-                        SET avatar = %s
-                        WHERE id = %s
-                        """,
-                        (avatar_url, player_id)
-                    )
-                    conn.commit()
-
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'avatar_url': avatar_url}),
-                'isBase64Encoded': False
-            }
-
-        except Exception as e:
-            return {
-                'statusCode': 500,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': f'Ошибка загрузки: {str(e)}'}),
-                'isBase64Encoded': False
-            }
-
-    if method != 'GET':
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Метод не разрешен'}),
-            'isBase64Encoded': False
-        }
+    with get_connection(replica=req.use_replica) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            profile = fetch_profile(cur, int(user_id))
+
+    if not profile:
+        raise HttpError(404, 'Игрок не найден')
+    return respond(200, profile)
 
+@router.route('GET', action='profile')
+def get_profile(req: Request) -> dict:
+    '''Профиль текущего пользователя по токену'''
     try:
-        headers = event.get('headers', {})
-        auth_header = headers.get('x-authorization', headers.get('X-Authorization', ''))
-        if not auth_header:
-            auth_header = headers.get('authorization', headers.get('Authorization', ''))
-        token = auth_header.replace('Bearer ', '').strip() if auth_header else ''
-        
-        if not token:
-            token = query_params.get('token', '')
-        
-        print(f"Token extracted: {token[:20] if token else 'EMPTY'}")
-
-        dsn = os.environ['DATABASE_URL']
-        
-        if action == 'player':
-            player_id = query_params.get('id')
-            if not player_id:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Требуется ID игрока'}),
-                    'isBase64Encoded': False
-                }
-            
-            with psycopg2.connect(dsn) as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        """
-                        SELECT u.id, u.name, u.avatar, 
-                               COALESCE(p.points, 0) as points, 
-                               COALESCE(p.wins, 0) as wins, 
-                               COALESCE(p.losses, 0) as losses,
-                               p.id as player_id
-                        FROM t_p28902192_strikbal_rating_app.users u
-                        LEFT JOIN t_p28902192_strikbal_rating_app.players p ON u.id = p.user_id
-                        WHERE u.id = %s
-                        """,
-                        (player_id,)
-                    )
-                    user_row = cur.fetchone()
-                    
-                    if not user_row:
-                        return {
-                            'statusCode': 404,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Игрок не найден'}),
-                            'isBase64Encoded': False
-                        }
-                    
-                    user_data = dict(user_row)
-                    player_db_id = user_row['player_id']
-                    
-                    if player_db_id:
-                        cur.execute(
-                            """
-                            SELECT COUNT(*) + 1 as rank
-                            FROM t_p28902192_strikbal_rating_app.players
-                            WHERE points > (SELECT points FROM t_p28902192_strikbal_rating_app.players WHERE id = %s)
-                            """,
-                            (player_db_id,)
-                        )
-                        rank_row = cur.fetchone()
-                        user_data['rank'] = rank_row['rank'] if rank_row else None
-                        
-                        cur.execute(
-                            """
-                            SELECT id, name, points, completed, created_at
-                            FROM t_p28902192_strikbal_rating_app.tasks
-                            WHERE player_id = %s AND completed = true
-                            ORDER BY created_at DESC
-                            """,
-                            (player_db_id,)
-                        )
-                        
-                        tasks = [dict(row) for row in cur.fetchall()]
-                        for task in tasks:
-                            if task.get('created_at'):
-                                task['created_at'] = task['created_at'].isoformat()
-                        user_data['completed_tasks'] = tasks
-                        
-                        cur.execute(
-                            """
-                            SELECT 
-                                g.id,
-                                g.name,
-                                g.created_at,
-                                g.winner_team_id,
-                                t.id as team_id,
-                                t.name as team_name,
-                                t.color as team_color,
-                                CASE WHEN g.winner_team_id = t.id THEN true ELSE false END as won
-                            FROM t_p28902192_strikbal_rating_app.games g
-                            JOIN t_p28902192_strikbal_rating_app.teams t ON g.id = t.game_id
-                            JOIN t_p28902192_strikbal_rating_app.team_players tp ON t.id = tp.team_id
-                            WHERE tp.player_id = %s AND g.status = 'completed'
-                            ORDER BY g.created_at DESC
-                            """,
-                            (player_db_id,)
-                        )
-                        
-                        games = [dict(row) for row in cur.fetchall()]
-                        for game in games:
-                            if game.get('created_at'):
-                                game['created_at'] = game['created_at'].isoformat()
-                        user_data['games_history'] = games
-                    else:
-                        user_data['rank'] = None
-                        user_data['completed_tasks'] = []
-                        user_data['games_history'] = []
-                    
-                    del user_data['player_id']
-                    
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps(user_data, default=str),
-                        'isBase64Encoded': False
-                    }
-        
-        if action == 'profile':
-            with psycopg2.connect(dsn) as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        """
-                        SELECT user_id 
-                        FROM t_p28902192_strikbal_rating_app.sessions 
-                        WHERE token = %s AND expires_at > NOW()
-                        """,
-                        (token,)
-                    )
-                    session_result = cur.fetchone()
-                    
-                    if not session_result:
-                        return {
-                            'statusCode': 401,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Неверный токен'}),
-                            'isBase64Encoded': False
-                        }
-                    
-                    user_id = session_result['user_id']
-                    
-                    cur.execute(
-                        """
-                        SELECT u.id, u.name, u.email, u.avatar, 
-                               COALESCE(p.points, 0) as points, 
-                               COALESCE(p.wins, 0) as wins, 
-                               COALESCE(p.losses, 0) as losses,
-                               p.id as player_id
-                        FROM t_p28902192_strikbal_rating_app.users u
-                        LEFT JOIN t_p28902192_strikbal_rating_app.players p ON u.id = p.user_id
-                        WHERE u.id = %s
-                        """,
-                        (user_id,)
-                    )
-                    user_row = cur.fetchone()
-                    
-                    if not user_row:
-                        return {
-                            'statusCode': 404,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Пользователь не найден'}),
-                            'isBase64Encoded': False
-                        }
-                    
-                    user_data = dict(user_row)
-                    player_id = user_row['player_id']
-                    
-                    if player_id:
-                        cur.execute(
-                            """
-                            SELECT COUNT(*) + 1 as rank
-                            FROM t_p28902192_strikbal_rating_app.players
-                            WHERE points > (SELECT points FROM t_p28902192_strikbal_rating_app.players WHERE id = %s)
-                            """,
-                            (player_id,)
-                        )
-                        rank_row = cur.fetchone()
-                        user_data['rank'] = rank_row['rank'] if rank_row else None
-                        
-                        cur.execute(
-                            """
-                            SELECT id, name, points, completed, created_at
-                            FROM t_p28902192_strikbal_rating_app.tasks
-                            WHERE player_id = %s AND completed = true
-                            ORDER BY created_at DESC
-                            """,
-                            (player_id,)
-                        )
-                        
-                        tasks = [dict(row) for row in cur.fetchall()]
-                        for task in tasks:
-                            if task.get('created_at'):
-                                task['created_at'] = task['created_at'].isoformat()
-                        user_data['completed_tasks'] = tasks
-                        
-                        cur.execute(
-                            """
-                            SELECT 
-                                g.id,
-                                g.name,
-                                g.created_at,
-                                g.winner_team_id,
-                                t.id as team_id,
-                                t.name as team_name,
-                                t.color as team_color,
-                                CASE WHEN g.winner_team_id = t.id THEN true ELSE false END as won
-                            FROM t_p28902192_strikbal_rating_app.games g
-                            JOIN t_p28902192_strikbal_rating_app.teams t ON g.id = t.game_id
-                            JOIN t_p28902192_strikbal_rating_app.team_players tp ON t.id = tp.team_id
-                            WHERE tp.player_id = %s AND g.status = 'completed'
-                            ORDER BY g.created_at DESC
-                            """,
-                            (player_id,)
-                        )
-                        
-                        games = [dict(row) for row in cur.fetchall()]
-                        for game in games:
-                            if game.get('created_at'):
-                                game['created_at'] = game['created_at'].isoformat()
-                        user_data['games_history'] = games
-                    else:
-                        user_data['rank'] = None
-                        user_data['completed_tasks'] = []
-                        user_data['games_history'] = []
-                    
-                    del user_data['player_id']
-                    
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps(user_data, default=str),
-                        'isBase64Encoded': False
-                    }
-        
-        is_admin = verify_admin(token, dsn) if token else False
-        
-        print(f"Is admin: {is_admin}, token present: {bool(token)}")
-
-        with psycopg2.connect(dsn) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                if is_admin:
-                    cur.execute(
-                        """
-                        SELECT 
-                            u.id, 
-                            u.name, 
-                            u.email, 
-                            u.avatar,
-                            COALESCE(p.points, 0) as points, 
-                            COALESCE(p.wins, 0) as wins, 
-                            COALESCE(p.losses, 0) as losses
-                        FROM t_p28902192_strikbal_rating_app.users u
-                        LEFT JOIN t_p28902192_strikbal_rating_app.players p ON p.user_id = u.id
-                        ORDER BY COALESCE(p.points, 0) DESC, u.name ASC
-                        """
-                    )
-                else:
-                    cur.execute(
-                        """
-                        SELECT 
-                            u.id, 
-                            u.name, 
-                            u.avatar,
-                            COALESCE(p.points, 0) as points, 
-                            COALESCE(p.wins, 0) as wins, 
-                            COALESCE(p.losses, 0) as losses
-                        FROM t_p28902192_strikbal_rating_app.users u
-                        LEFT JOIN t_p28902192_strikbal_rating_app.players p ON p.user_id = u.id
-                        ORDER BY COALESCE(p.points, 0) DESC, u.name ASC
-                        """
-                    )
-                
-                players = cur.fetchall()
-
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'players': [dict(player) for player in players]
-                    }),
-                    'isBase64Encoded': False
-                }
+        neighbours = min(max(int(req.query.get('neighbours', DEFAULT_NEIGHBOURS)), 0), MAX_NEIGHBOURS)
+    except ValueError:
+        raise HttpError(400, 'Неверный параметр neighbours')
 
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Ошибка сервера: {str(e)}'}),
-            'isBase64Encoded': False
-        }
\ No newline at end of file
+    with get_connection(replica=req.use_replica) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            session = resolve_session(cur, req.token)
+            if not session:
+                raise HttpError(401, 'Неверный токен')
+
+            profile = fetch_profile(cur, session['user_id'], private=True, neighbours=neighbours)
+
+    if not profile:
+        raise HttpError(404, 'Пользователь не найден')
+    return respond(200, profile)
+
+def parse_history_page(req: Request, default_size: int = DEFAULT_HISTORY_PAGE_SIZE,
+                       max_size: int = MAX_HISTORY_PAGE_SIZE) -> tuple:
+    '''ID пользователя, размер страницы и курсор для историй игрока'''
+    user_id = req.query.get('id')
+    if not user_id:
+        raise HttpError(400, 'Требуется ID игрока')
+    if not user_id.isdigit():
+        raise HttpError(400, 'Неверный ID игрока')
+
+    limit = parse_limit(req.query.get('limit'), max_size) or default_size
+    after = None
+    if req.query.get('after'):
+        after = decode_cursor(req.query['after'], HISTORY_CURSOR_TYPES)
+    return int(user_id), limit, after
+
+@router.route('GET', action='player_games')
+def get_player_games(req: Request) -> dict:
+    '''История завершённых игр игрока постранично'''
+    user_id, limit, after = parse_history_page(req)
+
+    with get_connection(replica=req.use_replica) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            games, next_cursor = fetch_player_games(cur, user_id, limit, after)
+
+    return respond(200, {'games': games, 'nextCursor': next_cursor})
+
+@router.route('GET', action='player_tasks')
+def get_player_tasks(req: Request) -> dict:
+    '''Выполненные задачи игрока постранично'''
+    user_id, limit, after = parse_history_page(req)
+
+    with get_connection(replica=req.use_replica) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            tasks, next_cursor = fetch_player_tasks(cur, user_id, limit, after)
+
+    return respond(200, {'tasks': tasks, 'nextCursor': next_cursor})
+
+@router.route('GET', action='timeline')
+def get_timeline(req: Request) -> dict:
+    '''Изменения очков игрока по времени для графика'''
+    user_id, limit, after = parse_history_page(req, DEFAULT_TIMELINE_PAGE_SIZE, MAX_TIMELINE_PAGE_SIZE)
+
+    with get_connection(replica=req.use_replica) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            events, next_cursor = fetch_point_timeline(cur, user_id, limit, after)
+
+    return respond(200, {'events': events, 'nextCursor': next_cursor})
+
+@router.route('GET', action='around')
+def get_around(req: Request) -> dict:
+    '''Окно рейтинга вокруг позиции N'''
+    try:
+        position = int(req.query.get('position', ''))
+    except ValueError:
+        position = 0
+
+    if position < 1:
+        raise HttpError(400, 'Укажите позицию в рейтинге')
+
+    try:
+        k = min(max(int(req.query.get('k', DEFAULT_NEIGHBOURS)), 0), MAX_NEIGHBOURS)
+    except ValueError:
+        raise HttpError(400, 'Неверный параметр k')
+
+    with get_connection(replica=req.use_replica) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            players = get_players_around_position(cur, position, k)
+
+    return respond(200, {'players': players})
+
+@instrumented
+@compressed
+def handler(event: dict, context) -> dict:
+    '''API для получения списка игроков, профиля игрока и загрузки аватаров'''
+    return router.dispatch(event, context)
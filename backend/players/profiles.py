@@ -0,0 +1,190 @@
+import os
+from datetime import datetime
+from typing import Optional
+
+from core import encode_cursor
+from ranking import NEIGHBOURS_WINDOW
+
+HISTORY_PREVIEW_SIZE = int(os.environ.get('PROFILE_HISTORY_PREVIEW', '10'))
+DEFAULT_HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+DEFAULT_TIMELINE_PAGE_SIZE = 200
+MAX_TIMELINE_PAGE_SIZE = 1000
+HISTORY_CURSOR_TYPES = (datetime.fromisoformat, int)
+
+# Завершённые игры игрока {player} в порядке (created_at DESC, id DESC); {after} - условие курсора
+PLAYER_GAMES = """
+    SELECT
+        g.id,
+        g.name,
+        g.created_at,
+        g.winner_team_id,
+        t.id as team_id,
+        t.name as team_name,
+        t.color as team_color,
+        CASE WHEN g.winner_team_id = t.id THEN true ELSE false END as won
+    FROM t_p28902192_strikbal_rating_app.team_players tp
+    JOIN t_p28902192_strikbal_rating_app.teams t ON t.id = tp.team_id
+    JOIN t_p28902192_strikbal_rating_app.games g ON g.id = t.game_id
+    WHERE tp.player_id = {player} AND g.status = 'completed' {after}
+    ORDER BY g.created_at DESC, g.id DESC
+"""
+
+# Выполненные задачи игрока {player} в порядке (created_at DESC, id DESC)
+PLAYER_TASKS = """
+    SELECT t.id, t.name, t.points, t.completed, t.created_at
+    FROM t_p28902192_strikbal_rating_app.tasks t
+    WHERE t.player_id = {player} AND t.completed = true {after}
+    ORDER BY t.created_at DESC, t.id DESC
+"""
+
+_NEIGHBOURS_COLUMN = (
+    """,
+       CASE WHEN me.player_id IS NULL OR %(neighbours)s = 0 THEN '[]'::json
+            ELSE (SELECT json_agg(json_build_object(
+                              'id', w.id, 'name', w.name, 'avatar', w.avatar,
+                              'points', w.points, 'rank', w.rank) ORDER BY w.pos)
+                  FROM ("""
+    + NEIGHBOURS_WINDOW.format(points='me.points', name='me.name', id='me.id', k='%(neighbours)s')
+    + """) w)
+       END as neighbours"""
+)
+
+
+def _profile_query(private: bool, with_neighbours: bool) -> str:
+    email = 'u.email, ' if private else ''
+    neighbours = _NEIGHBOURS_COLUMN if with_neighbours else ''
+    return f"""
+        WITH me AS (
+            SELECT u.id, u.name, {email}u.avatar,
+                   COALESCE(p.points, 0) as points,
+                   COALESCE(p.wins, 0) as wins,
+                   COALESCE(p.losses, 0) as losses,
+                   ROUND(p.rating)::int as rating,
+                   p.id as player_id
+            FROM t_p28902192_strikbal_rating_app.users u
+            LEFT JOIN t_p28902192_strikbal_rating_app.players p ON u.id = p.user_id
+            WHERE u.id = %(user_id)s
+        )
+        SELECT me.*,
+               CASE WHEN me.player_id IS NULL THEN NULL
+                    ELSE (SELECT b.rank
+                          FROM t_p28902192_strikbal_rating_app.player_rank_buckets b
+                          WHERE b.points = me.points)
+               END as rank,
+               COALESCE((
+                   SELECT json_agg(h ORDER BY h.created_at DESC, h.id DESC)
+                   FROM ({PLAYER_TASKS.format(player='me.player_id', after='')} LIMIT %(preview)s) h
+               ), '[]'::json) as completed_tasks,
+               (SELECT COUNT(*)
+                FROM t_p28902192_strikbal_rating_app.tasks
+                WHERE player_id = me.player_id AND completed = true) as completed_tasks_count,
+               COALESCE((
+                   SELECT json_agg(h ORDER BY h.created_at DESC, h.id DESC)
+                   FROM ({PLAYER_GAMES.format(player='me.player_id', after='')} LIMIT %(preview)s) h
+               ), '[]'::json) as games_history,
+               (SELECT COUNT(*)
+                FROM t_p28902192_strikbal_rating_app.team_players tp
+                JOIN t_p28902192_strikbal_rating_app.teams t ON t.id = tp.team_id
+                JOIN t_p28902192_strikbal_rating_app.games g ON g.id = t.game_id
+                WHERE tp.player_id = me.player_id AND g.status = 'completed') as games_count{neighbours}
+        FROM me
+    """
+
+
+_QUERIES = {
+    (private, with_neighbours): _profile_query(private, with_neighbours)
+    for private in (False, True)
+    for with_neighbours in (False, True)
+}
+
+
+def fetch_profile(cur, user_id: int, private: bool = False, neighbours: Optional[int] = None) -> Optional[dict]:
+    '''Профиль пользователя одним запросом: данные игрока, место, последние задачи и игры
+    со счётчиками и курсорами продолжения, окно рейтинга.
+
+    private=True добавляет email; neighbours=None не включает окно рейтинга в ответ.
+    '''
+    cur.execute(
+        _QUERIES[(private, neighbours is not None)],
+        {'user_id': user_id, 'neighbours': neighbours or 0, 'preview': HISTORY_PREVIEW_SIZE}
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+
+    profile = dict(row)
+    del profile['player_id']
+    profile['completed_tasks_cursor'] = preview_cursor(profile['completed_tasks'], profile['completed_tasks_count'])
+    profile['games_cursor'] = preview_cursor(profile['games_history'], profile['games_count'])
+    return profile
+
+
+def preview_cursor(items: list, total: int) -> Optional[str]:
+    '''Курсор продолжения истории после превью в профиле'''
+    if not items or len(items) >= total:
+        return None
+    return encode_cursor([items[-1]['created_at'], items[-1]['id']])
+
+
+def _fetch_history(cur, template: str, alias: str, user_id: int, limit: int, after) -> tuple:
+    where_after = ''
+    params = {'user_id': user_id, 'limit': limit + 1}
+    if after:
+        where_after = 'AND ({alias}.created_at, {alias}.id) < (%(after_at)s, %(after_id)s)'
+        params['after_at'], params['after_id'] = after
+
+    cur.execute(
+        template.format(
+            player='(SELECT id FROM t_p28902192_strikbal_rating_app.players WHERE user_id = %(user_id)s)',
+            after=where_after.format(alias=alias)
+        ) + ' LIMIT %(limit)s',
+        params
+    )
+    items = [dict(row) for row in cur.fetchall()]
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([last['created_at'].isoformat(), last['id']])
+    return items, next_cursor
+
+
+def fetch_player_games(cur, user_id: int, limit: int, after=None) -> tuple:
+    '''Страница завершённых игр игрока и курсор следующей страницы'''
+    return _fetch_history(cur, PLAYER_GAMES, 'g', user_id, limit, after)
+
+
+def fetch_player_tasks(cur, user_id: int, limit: int, after=None) -> tuple:
+    '''Страница выполненных задач игрока и курсор следующей страницы'''
+    return _fetch_history(cur, PLAYER_TASKS, 't', user_id, limit, after)
+
+
+def fetch_point_timeline(cur, user_id: int, limit: int, after=None) -> tuple:
+    '''Журнал очков игрока по времени (старые сначала) и курсор следующей страницы'''
+    where_after = ''
+    params = {'user_id': user_id, 'limit': limit + 1}
+    if after:
+        where_after = 'AND (e.created_at, e.id) > (%(after_at)s, %(after_id)s)'
+        params['after_at'], params['after_id'] = after
+
+    cur.execute(
+        f"""
+        SELECT e.id, e.created_at, e.reason, e.delta, e.points_after, e.game_id, e.task_id
+        FROM t_p28902192_strikbal_rating_app.point_events e
+        WHERE e.player_id = (SELECT id FROM t_p28902192_strikbal_rating_app.players WHERE user_id = %(user_id)s)
+          {where_after}
+        ORDER BY e.created_at, e.id
+        LIMIT %(limit)s
+        """,
+        params
+    )
+    events = [dict(row) for row in cur.fetchall()]
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        last = events[-1]
+        next_cursor = encode_cursor([last['created_at'].isoformat(), last['id']])
+    return events, next_cursor
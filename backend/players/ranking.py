@@ -0,0 +1,109 @@
+from typing import Optional
+
+DEFAULT_NEIGHBOURS = 2
+MAX_NEIGHBOURS = 10
+
+
+# Окно рейтинга вокруг игрока ({points}, {name}, {id}): k строк выше (pos < 0),
+# сам игрок (pos = 0) и k строк ниже (pos > 0). Подставляется как параметрами запроса,
+# так и ссылками на столбцы внешнего запроса (см. profiles.py). Соседи по своей корзине
+# очков и по остальным корзинам читаются отдельными диапазонами индекса рейтинга
+NEIGHBOURS_WINDOW = """
+    SELECT n.id, n.name, n.avatar, n.points, n.pos, b.rank
+    FROM (
+        (SELECT a.id, a.name, a.avatar, a.points,
+                -ROW_NUMBER() OVER (ORDER BY a.points ASC, a.name DESC, a.id DESC) as pos
+         FROM (
+             (SELECT l.user_id as id, l.name, l.avatar, l.points
+              FROM t_p28902192_strikbal_rating_app.leaderboard l
+              WHERE l.points = {points} AND (l.name, l.user_id) < ({name}, {id})
+              ORDER BY l.name DESC, l.user_id DESC
+              LIMIT {k})
+             UNION ALL
+             (SELECT l.user_id as id, l.name, l.avatar, l.points
+              FROM t_p28902192_strikbal_rating_app.leaderboard l
+              WHERE l.points > {points}
+              ORDER BY l.points ASC, l.name DESC, l.user_id DESC
+              LIMIT {k})
+         ) a
+         ORDER BY a.points ASC, a.name DESC, a.id DESC
+         LIMIT {k})
+        UNION ALL
+        (SELECT l.user_id as id, l.name, l.avatar, l.points, 0 as pos
+         FROM t_p28902192_strikbal_rating_app.leaderboard l
+         WHERE l.user_id = {id})
+        UNION ALL
+        (SELECT a.id, a.name, a.avatar, a.points,
+                ROW_NUMBER() OVER (ORDER BY a.points DESC, a.name ASC, a.id ASC) as pos
+         FROM (
+             (SELECT l.user_id as id, l.name, l.avatar, l.points
+              FROM t_p28902192_strikbal_rating_app.leaderboard l
+              WHERE l.points = {points} AND (l.name, l.user_id) > ({name}, {id})
+              ORDER BY l.name ASC, l.user_id ASC
+              LIMIT {k})
+             UNION ALL
+             (SELECT l.user_id as id, l.name, l.avatar, l.points
+              FROM t_p28902192_strikbal_rating_app.leaderboard l
+              WHERE l.points < {points}
+              ORDER BY l.points DESC, l.name ASC, l.user_id ASC
+              LIMIT {k})
+         ) a
+         ORDER BY a.points DESC, a.name ASC, a.id ASC
+         LIMIT {k})
+    ) n
+    JOIN t_p28902192_strikbal_rating_app.player_rank_buckets b ON b.points = n.points
+"""
+
+_NEIGHBOURS_QUERY = (
+    'SELECT w.id, w.name, w.avatar, w.points, w.rank FROM ('
+    + NEIGHBOURS_WINDOW.format(points='%(points)s', name='%(name)s', id='%(id)s', k='%(k)s')
+    + ') w ORDER BY w.pos'
+)
+
+
+def get_neighbours(cur, player: dict, k: int) -> list:
+    '''Окно рейтинга: k игроков выше, сам игрок и k игроков ниже в порядке (очки DESC, имя, id)'''
+    cur.execute(
+        _NEIGHBOURS_QUERY,
+        {'points': player['points'], 'name': player['name'], 'id': player['id'], 'k': k}
+    )
+    return [dict(row) for row in cur.fetchall()]
+
+
+def find_player_at_position(cur, position: int) -> Optional[dict]:
+    '''Игрок на позиции N в рейтинге: корзина ищется по местам корзин, смещение - внутри неё'''
+    cur.execute(
+        """
+        SELECT points, rank
+        FROM t_p28902192_strikbal_rating_app.player_rank_buckets
+        WHERE rank <= %s AND player_count > 0
+        ORDER BY rank DESC
+        LIMIT 1
+        """,
+        (position,)
+    )
+    bucket = cur.fetchone()
+    if not bucket:
+        return None
+
+    cur.execute(
+        """
+        SELECT user_id as id, name, avatar, points
+        FROM t_p28902192_strikbal_rating_app.leaderboard
+        WHERE points = %s
+        ORDER BY name ASC, user_id ASC
+        OFFSET %s
+        LIMIT 1
+        """,
+        (bucket['points'], position - bucket['rank'])
+    )
+    row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def get_players_around_position(cur, position: int, k: int) -> list:
+    '''Окно рейтинга вокруг позиции N'''
+    player = find_player_at_position(cur, position)
+    if not player:
+        return []
+    return get_neighbours(cur, player, k)
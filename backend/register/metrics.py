@@ -0,0 +1,156 @@
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import psycopg2.extensions
+
+SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '0.01'))
+SLOW_REQUEST_MS = float(os.environ.get('METRICS_SLOW_MS', '1000'))
+SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '1') != '0'
+LOGGED_QUERIES = 5
+SQL_PREVIEW_LENGTH = 120
+
+FUNCTION_NAME = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+
+_local = threading.local()
+_cold = True
+
+
+class Trace:
+    '''Замеры одного вызова: фазы, SQL-запросы с длительностью и числом строк'''
+
+    __slots__ = ('function', 'method', 'action', 'cold', 'started', 'phases', 'queries')
+
+    def __init__(self, function: str, method: str, action: str, cold: bool):
+        self.function = function
+        self.method = method
+        self.action = action
+        self.cold = cold
+        self.started = time.perf_counter()
+        self.phases: dict = {}
+        self.queries: list = []
+
+    def add_phase(self, name: str, ms: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    @property
+    def db_ms(self) -> float:
+        return sum(ms for ms, _, _ in self.queries)
+
+
+def current() -> Optional[Trace]:
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def phase(name: str):
+    '''Замер фазы вызова (auth, pool, serialize, compress); вне вызова ничего не делает'''
+    trace = current()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_phase(name, (time.perf_counter() - started) * 1000)
+
+
+def _timed_cursor(base: type) -> type:
+    class TimedCursor(base):
+        def execute(self, query, vars=None):
+            trace = current()
+            if trace is None:
+                return super().execute(query, vars)
+            started = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                trace.queries.append(((time.perf_counter() - started) * 1000, self.rowcount, query))
+    return TimedCursor
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    '''Соединение, курсоры которого записывают запросы в замеры текущего вызова'''
+
+    _cursor_classes: dict = {}
+
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        cls = self._cursor_classes.get(base)
+        if cls is None:
+            cls = self._cursor_classes[base] = _timed_cursor(base)
+        kwargs['cursor_factory'] = cls
+        return super().cursor(*args, **kwargs)
+
+
+def server_timing(trace: Trace, total_ms: float) -> str:
+    '''Значение заголовка Server-Timing: фазы, время в базе с числом запросов, общее время'''
+    parts = [f'{name};dur={ms:.1f}' for name, ms in trace.phases.items()]
+    parts.append(f'db;dur={trace.db_ms:.1f};desc="{len(trace.queries)} queries"')
+    if trace.cold:
+        parts.append('cold')
+    parts.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(parts)
+
+
+def log_line(trace: Trace, status: int, total_ms: float) -> str:
+    '''Одна JSON-строка на вызов; самые долгие запросы - с текстом SQL'''
+    slowest = sorted(trace.queries, key=lambda q: q[0], reverse=True)[:LOGGED_QUERIES]
+    return json.dumps({
+        'function': trace.function,
+        'method': trace.method,
+        'action': trace.action,
+        'status': status,
+        'cold': trace.cold,
+        'total_ms': round(total_ms, 2),
+        'db_ms': round(trace.db_ms, 2),
+        'query_count': len(trace.queries),
+        'rows': sum(max(rows, 0) for _, rows, _ in trace.queries),
+        'phases': {name: round(ms, 2) for name, ms in trace.phases.items()},
+        'slowest_queries': [
+            {'ms': round(ms, 2), 'rows': rows, 'sql': ' '.join(str(sql).split())[:SQL_PREVIEW_LENGTH]}
+            for ms, rows, sql in slowest
+        ]
+    }, ensure_ascii=False)
+
+
+def instrumented(handler):
+    '''Внешний декоратор обработчика: Server-Timing в ответе и выборочный JSON-лог вызова.
+
+    В лог попадает доля METRICS_SAMPLE_RATE вызовов, а также все медленные (от METRICS_SLOW_MS)
+    и завершившиеся ошибкой 5xx.
+    '''
+    @functools.wraps(handler)
+    def wrapper(event: dict, context) -> dict:
+        global _cold
+        trace = Trace(
+            getattr(context, 'function_name', None) or FUNCTION_NAME,
+            event.get('httpMethod', 'GET'),
+            (event.get('queryStringParameters') or {}).get('action', ''),
+            _cold
+        )
+        _cold = False
+        _local.trace = trace
+        try:
+            response = handler(event, context)
+        finally:
+            _local.trace = None
+
+        total_ms = (time.perf_counter() - trace.started) * 1000
+        status = response.get('statusCode', 200)
+        if SERVER_TIMING:
+            response['headers'] = {
+                **(response.get('headers') or {}),
+                'Server-Timing': server_timing(trace, total_ms),
+                'Timing-Allow-Origin': '*'
+            }
+        if status >= 500 or total_ms >= SLOW_REQUEST_MS or random.random() < SAMPLE_RATE:
+            print(log_line(trace, status, total_ms), flush=True)
+        return response
+    return wrapper
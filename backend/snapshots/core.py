@@ -0,0 +1,200 @@
+import base64
+import json
+import os
+import time
+from types import MappingProxyType
+from typing import Callable, Optional
+
+from metrics import phase
+
+JSON_HEADERS = MappingProxyType({
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+})
+NOT_MODIFIED_HEADERS = MappingProxyType({
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Expose-Headers': 'ETag'
+})
+CACHEABLE_HEADERS = MappingProxyType({
+    **JSON_HEADERS,
+    'Cache-Control': 'no-cache',
+    'Access-Control-Expose-Headers': 'ETag'
+})
+
+# После записи клиент в течение этого окна читает с основной базы, а не с реплики
+READ_AFTER_WRITE_HEADER = 'X-Read-After-Write'
+READ_AFTER_WRITE_SECONDS = float(os.environ.get('DB_READ_AFTER_WRITE_SECONDS', '10'))
+
+
+class HttpError(Exception):
+    '''Ошибка, которая отдаётся клиенту как {"error": message} с указанным статусом'''
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    '''Разобранное событие вызова: метод, заголовки в нижнем регистре, параметры, токен'''
+
+    __slots__ = ('event', 'method', 'headers', 'query', 'action', 'token', 'fresh', '_body')
+
+    def __init__(self, event: dict):
+        self.event = event
+        self.method = event.get('httpMethod', 'GET')
+        self.headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+        self.query = event.get('queryStringParameters') or {}
+        self.action = self.query.get('action', '')
+        self.token = extract_token(self.headers, self.query)
+        self.fresh = is_fresh(self.headers.get(READ_AFTER_WRITE_HEADER.lower(), ''))
+        self._body = None
+
+    @property
+    def use_replica(self) -> bool:
+        '''Чтение можно отдать реплике: GET без недавней записи этого клиента'''
+        return self.method == 'GET' and not self.fresh
+
+    @property
+    def body(self) -> dict:
+        if self._body is None:
+            body = json.loads(self.event.get('body') or '{}')
+            if not isinstance(body, dict):
+                raise HttpError(400, 'Неверный формат данных')
+            self._body = body
+        return self._body
+
+
+def extract_token(headers: dict, query: dict) -> str:
+    '''Токен из X-Authorization / Authorization (с префиксом Bearer или без) или из ?token='''
+    auth_header = headers.get('x-authorization') or headers.get('authorization') or ''
+    if auth_header[:7].lower() == 'bearer ':
+        auth_header = auth_header[7:]
+    return auth_header.strip() or query.get('token', '')
+
+
+def is_fresh(marker: str) -> bool:
+    '''Метка X-Read-After-Write (unix-время окончания окна) ещё действует'''
+    try:
+        return float(marker) > time.time()
+    except ValueError:
+        return False
+
+
+def mark_write(response: dict) -> dict:
+    '''Метка чтения своих записей в ответе на запись, если настроена реплика'''
+    if not os.environ.get('DATABASE_READ_URL') or response['statusCode'] >= 400:
+        return response
+    headers = response['headers']
+    exposed = headers.get('Access-Control-Expose-Headers')
+    headers[READ_AFTER_WRITE_HEADER] = str(int(time.time() + READ_AFTER_WRITE_SECONDS))
+    headers['Access-Control-Expose-Headers'] = f'{exposed}, {READ_AFTER_WRITE_HEADER}' if exposed else READ_AFTER_WRITE_HEADER
+    return response
+
+
+def respond(status: int, payload, headers: Optional[dict] = None) -> dict:
+    with phase('serialize'):
+        body = json.dumps(payload, ensure_ascii=False, default=str)
+    return {
+        'statusCode': status,
+        'headers': {**(headers or JSON_HEADERS)},
+        'body': body,
+        'isBase64Encoded': False
+    }
+
+
+def respond_cacheable(payload, etag: str) -> dict:
+    return respond(200, payload, {**CACHEABLE_HEADERS, 'ETag': etag})
+
+
+def not_modified(etag: str) -> dict:
+    return {
+        'statusCode': 304,
+        'headers': {**NOT_MODIFIED_HEADERS, 'ETag': etag},
+        'body': '',
+        'isBase64Encoded': False
+    }
+
+
+def error(status: int, message: str) -> dict:
+    return respond(status, {'error': message})
+
+
+def parse_limit(value: Optional[str], max_size: int) -> Optional[int]:
+    '''Размер страницы; None означает выдачу без пагинации'''
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise HttpError(400, 'Неверный параметр limit')
+    return min(max(int(value), 1), max_size)
+
+
+def encode_cursor(values: list) -> str:
+    '''Курсор keyset-пагинации: значения ключа сортировки последней строки'''
+    raw = json.dumps(values, ensure_ascii=False, default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, types: tuple) -> list:
+    '''Разбор курсора с приведением значений к типам ключа сортировки'''
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [cast(value) for cast, value in zip(types, values)]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HttpError(400, 'Неверный курсор')
+
+
+class Router:
+    '''Маршрутизация по методу и ?action=, CORS preflight и единый обработчик ошибок'''
+
+    def __init__(self, allow_headers: str = 'Content-Type', max_age: Optional[int] = None):
+        self.allow_headers = allow_headers
+        self.max_age = max_age
+        self.routes: dict = {}
+        self._preflight = None
+
+    def route(self, method: str, action: str = '', auth: bool = False) -> Callable:
+        '''Регистрация обработчика; auth=True требует токен (иначе 401)'''
+        def register(fn: Callable) -> Callable:
+            self.routes[(method, action)] = (fn, auth)
+            self._preflight = None
+            return fn
+        return register
+
+    def preflight(self) -> dict:
+        if self._preflight is None:
+            methods = sorted({method for method, _ in self.routes} | {'OPTIONS'})
+            headers = {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': ', '.join(methods),
+                'Access-Control-Allow-Headers': self.allow_headers
+            }
+            if self.max_age:
+                headers['Access-Control-Max-Age'] = str(self.max_age)
+            self._preflight = MappingProxyType(headers)
+        return {'statusCode': 200, 'headers': {**self._preflight}, 'body': '', 'isBase64Encoded': False}
+
+    def dispatch(self, event: dict, context) -> dict:
+        if event.get('httpMethod') == 'OPTIONS':
+            return self.preflight()
+
+        try:
+            req = Request(event)
+            route = self.routes.get((req.method, req.action)) or self.routes.get((req.method, ''))
+            if route is None:
+                return error(405, 'Метод не разрешен')
+
+            fn, auth = route
+            if auth and not req.token:
+                return error(401, 'Требуется авторизация')
+            response = fn(req)
+            return response if req.method == 'GET' else mark_write(response)
+        except HttpError as e:
+            return error(e.status, e.message)
+        except json.JSONDecodeError:
+            return error(400, 'Неверный формат данных')
+        except Exception as e:
+            return error(500, f'Ошибка сервера: {str(e)}')
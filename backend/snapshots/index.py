@@ -0,0 +1,270 @@
+import json
+import os
+from typing import Optional
+
+import boto3
+from botocore.config import Config
+from psycopg2.extras import RealDictCursor
+from db import get_connection
+from metrics import instrumented
+from core import encode_cursor, respond
+
+S3_ENDPOINT = os.environ.get('S3_ENDPOINT', 'https://bucket.poehali.dev')
+S3_BUCKET = 'files'
+SNAPSHOTS_PREFIX = 'snapshots'
+POINTER_MAX_AGE = int(os.environ.get('SNAPSHOT_POINTER_MAX_AGE', '5'))
+# Указатель переписывается и без изменений данных, чтобы клиенты отличали живые снимки от брошенных
+HEARTBEAT_SECONDS = int(os.environ.get('SNAPSHOT_HEARTBEAT_SECONDS', '120'))
+# Аренда публикации дольше любых повторов S3 (см. S3_CONFIG)
+CLAIM_SECONDS = int(os.environ.get('SNAPSHOT_CLAIM_SECONDS', '120'))
+LEADERBOARD_PAGE_SIZE = 50
+
+S3_CONFIG = Config(connect_timeout=5, read_timeout=10, retries={'max_attempts': 2})
+
+LEADERBOARD = 'leaderboard'
+ACTIVE_GAMES = 'active_games'
+
+# Документы в том же виде, что ответы GET рейтинга с limit=LEADERBOARD_PAGE_SIZE и GET игр со status=active
+_QUERIES = {
+    LEADERBOARD: """
+        SELECT
+            l.user_id as id,
+            l.name,
+            l.avatar,
+            l.points,
+            ROUND(l.rating)::int as rating,
+            l.wins,
+            l.losses,
+            b.rank
+        FROM (
+            SELECT * FROM t_p28902192_strikbal_rating_app.leaderboard
+            ORDER BY points DESC, name ASC, user_id ASC
+            LIMIT %(limit)s
+        ) l
+        JOIN t_p28902192_strikbal_rating_app.player_rank_buckets b ON b.points = l.points
+        ORDER BY l.points DESC, l.name ASC, l.user_id ASC
+    """,
+    ACTIVE_GAMES: """
+        WITH page AS (
+            SELECT g.id, g.name, g.status, g.winner_team_id, g.created_at
+            FROM t_p28902192_strikbal_rating_app.games g
+            WHERE g.status = 'active'
+        ),
+        page_teams AS (
+            SELECT t.id, t.game_id, t.name, t.color
+            FROM page
+            JOIN t_p28902192_strikbal_rating_app.teams t ON t.game_id = page.id
+        ),
+        rosters AS (
+            SELECT tp.team_id,
+                   json_agg(
+                       json_build_object('id', p.id, 'name', u.name, 'points', p.points)
+                       ORDER BY tp.id
+                   ) as players
+            FROM page_teams pt
+            JOIN t_p28902192_strikbal_rating_app.team_players tp ON tp.team_id = pt.id
+            JOIN t_p28902192_strikbal_rating_app.players p ON tp.player_id = p.id
+            JOIN t_p28902192_strikbal_rating_app.users u ON p.user_id = u.id
+            GROUP BY tp.team_id
+        ),
+        game_teams AS (
+            SELECT pt.game_id,
+                   json_agg(
+                       json_build_object(
+                           'id', pt.id,
+                           'name', pt.name,
+                           'color', pt.color,
+                           'players', COALESCE(r.players, '[]'::json)
+                       )
+                       ORDER BY pt.id
+                   ) as teams
+            FROM page_teams pt
+            LEFT JOIN rosters r ON r.team_id = pt.id
+            GROUP BY pt.game_id
+        )
+        SELECT page.id, page.name, page.status,
+               (page.status = 'completed') as finished,
+               page.winner_team_id, page.created_at,
+               gt.teams
+        FROM page
+        LEFT JOIN game_teams gt ON gt.game_id = page.id
+        ORDER BY page.created_at DESC, page.id DESC
+    """
+}
+
+# Версии данных, от которых зависит документ (в составах игр есть очки игроков)
+_SOURCES = {LEADERBOARD: ('players',), ACTIVE_GAMES: ('games', 'players')}
+
+_s3 = None
+
+
+def get_s3():
+    '''S3-клиент создаётся один раз и переиспользуется между вызовами'''
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client(
+            's3',
+            endpoint_url=S3_ENDPOINT,
+            aws_access_key_id=os.environ['AWS_ACCESS_KEY_ID'],
+            aws_secret_access_key=os.environ['AWS_SECRET_ACCESS_KEY'],
+            config=S3_CONFIG
+        )
+    return _s3
+
+
+def pointer_key(name: str) -> str:
+    return f'{SNAPSHOTS_PREFIX}/{name}.json'
+
+
+def document_key(name: str, version: str) -> str:
+    return f'{SNAPSHOTS_PREFIX}/{name}/{version}.json'
+
+
+def data_version(cur, name: str) -> str:
+    '''Версия снимка из версий данных, например games12-players40'''
+    cur.execute(
+        """
+        SELECT name, version FROM t_p28902192_strikbal_rating_app.data_versions
+        WHERE name = ANY(%s)
+        ORDER BY name
+        """,
+        (list(_SOURCES[name]),)
+    )
+    return '-'.join(f"{row['name']}{row['version']}" for row in cur.fetchall())
+
+
+def render(cur, name: str) -> bytes:
+    if name == LEADERBOARD:
+        cur.execute(_QUERIES[name], {'limit': LEADERBOARD_PAGE_SIZE + 1})
+        players = [dict(row) for row in cur.fetchall()]
+        next_cursor = None
+        if len(players) > LEADERBOARD_PAGE_SIZE:
+            players = players[:LEADERBOARD_PAGE_SIZE]
+            last = players[-1]
+            next_cursor = encode_cursor([last['points'], last['name'], last['id']])
+        payload = {'players': players, 'nextCursor': next_cursor}
+    else:
+        cur.execute(_QUERIES[name])
+        payload = {'games': [dict(row) for row in cur.fetchall()]}
+    return json.dumps(payload, ensure_ascii=False, default=str).encode()
+
+
+def claim(name: str) -> Optional[tuple]:
+    '''Аренда публикации снимка на CLAIM_SECONDS и, если данные изменились, документ.
+
+    Аренда - короткий UPDATE без блокировок на время обращений к S3: параллельный
+    вызов, не получивший аренду, просто пропускает снимок.
+    '''
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                """
+                UPDATE t_p28902192_strikbal_rating_app.published_snapshots
+                SET claimed_until = NOW() + make_interval(secs => %s)
+                WHERE name = %s AND (claimed_until IS NULL OR claimed_until <= NOW())
+                RETURNING version, previous_version, published_at, claimed_until, NOW() as now,
+                          (checked_at IS NULL OR checked_at <= NOW() - make_interval(secs => %s)) as heartbeat_due
+                """,
+                (CLAIM_SECONDS, name, HEARTBEAT_SECONDS)
+            )
+            state = cur.fetchone()
+            if not state:
+                return None
+            version = data_version(cur, name)
+            document = render(cur, name) if version != state['version'] else None
+    return state, version, document
+
+
+def release(name: str, state: dict, version: Optional[str] = None) -> None:
+    '''Снятие аренды; с version - запись опубликованной версии'''
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            if version is None:
+                cur.execute(
+                    """
+                    UPDATE t_p28902192_strikbal_rating_app.published_snapshots
+                    SET claimed_until = NULL
+                    WHERE name = %s AND claimed_until = %s
+                    """,
+                    (name, state['claimed_until'])
+                )
+                return
+            cur.execute(
+                """
+                UPDATE t_p28902192_strikbal_rating_app.published_snapshots
+                SET previous_version = CASE WHEN version = %s THEN previous_version ELSE version END,
+                    published_at = CASE WHEN version = %s THEN published_at ELSE %s END,
+                    version = %s, checked_at = %s, claimed_until = NULL
+                WHERE name = %s AND claimed_until = %s
+                """,
+                (version, version, state['now'], version, state['now'], name, state['claimed_until'])
+            )
+
+
+def publish(name: str) -> str:
+    '''Публикация снимка, если данные изменились с прошлой публикации.
+
+    Документ загружается под новым неизменяемым ключом, и только потом указатель
+    {name}.json переключается на него: клиент, прочитавший указатель, всегда получает
+    полностью записанный документ. Хранятся текущая и предыдущая версии, более старые удаляются.
+    '''
+    claimed = claim(name)
+    if not claimed:
+        return 'busy'
+    state, version, document = claimed
+    if document is None and not state['heartbeat_due']:
+        release(name, state)
+        return 'unchanged'
+
+    try:
+        key = document_key(name, version)
+        if document is not None:
+            get_s3().put_object(
+                Bucket=S3_BUCKET,
+                Key=key,
+                Body=document,
+                ContentType='application/json; charset=utf-8',
+                CacheControl='public, max-age=31536000, immutable'
+            )
+        published_at = state['now'] if document is not None else state['published_at']
+        get_s3().put_object(
+            Bucket=S3_BUCKET,
+            Key=pointer_key(name),
+            Body=json.dumps({
+                'version': version,
+                'key': key,
+                'publishedAt': published_at.isoformat(),
+                'checkedAt': state['now'].isoformat()
+            }).encode(),
+            ContentType='application/json; charset=utf-8',
+            CacheControl=f'public, max-age={POINTER_MAX_AGE}'
+        )
+    except Exception:
+        release(name, state)
+        raise
+
+    release(name, state, version)
+    if document is None:
+        return 'checked'
+    stale = state['previous_version']
+    if stale and stale != version:
+        get_s3().delete_object(Bucket=S3_BUCKET, Key=document_key(name, stale))
+    return 'published'
+
+
+@instrumented
+def handler(event: dict, context) -> dict:
+    '''Публикация снимков рейтинга и активных игр в S3; вызывается по таймеру (раз в минуту).
+
+    Запросы на запись снимки не трогают: клиенты после своей записи читают API,
+    остальные видят изменения с задержкой до следующего запуска.
+    '''
+    results = {}
+    for name in (LEADERBOARD, ACTIVE_GAMES):
+        try:
+            results[name] = publish(name)
+        except Exception as e:
+            results[name] = 'error'
+            print(json.dumps({'snapshot': name, 'error': str(e)}, ensure_ascii=False), flush=True)
+
+    return respond(500 if 'error' in results.values() else 200, results)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+from core import HttpError, Request, respond
+
+KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_TTL_HOURS', '24'))
+MAX_KEY_LENGTH = 100
+SWEEP_BATCH_SIZE = 500
+SWEEP_INTERVAL_SECONDS = 300.0
+
+_last_sweep = 0.0
+
+
+def request_fingerprint(req: Request) -> str:
+    '''Хэш запроса: один ключ нельзя использовать для разных запросов'''
+    raw = json.dumps([req.method, req.action, req.body], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def claim_key(cur, user_id: int, req: Request) -> Optional[dict]:
+    '''Регистрация Idempotency-Key в текущей транзакции.
+
+    Возвращает сохранённый ответ, если запрос с этим ключом уже выполнялся,
+    иначе None - тогда запрос выполняется и ответ сохраняется через save_response
+    в той же транзакции. Параллельный запрос с тем же ключом ждёт на уникальном
+    индексе, пока первая транзакция не завершится.
+    '''
+    key = req.headers.get('idempotency-key', '').strip()
+    if not key:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise HttpError(400, 'Слишком длинный Idempotency-Key')
+
+    sweep_expired_keys(cur)
+    fingerprint = request_fingerprint(req)
+    cur.execute(
+        """
+        INSERT INTO t_p28902192_strikbal_rating_app.idempotency_keys AS k
+        (user_id, key, request_hash, expires_at)
+        VALUES (%s, %s, %s, NOW() + make_interval(hours => %s))
+        ON CONFLICT (user_id, key) DO UPDATE
+        SET request_hash = EXCLUDED.request_hash, expires_at = EXCLUDED.expires_at,
+            status_code = NULL, response = NULL, created_at = NOW()
+        WHERE k.expires_at <= NOW()
+        RETURNING k.key
+        """,
+        (user_id, key, fingerprint, KEY_TTL_HOURS)
+    )
+    if cur.fetchone():
+        return None
+
+    cur.execute(
+        """
+        SELECT request_hash, status_code, response
+        FROM t_p28902192_strikbal_rating_app.idempotency_keys
+        WHERE user_id = %s AND key = %s
+        """,
+        (user_id, key)
+    )
+    stored = cur.fetchone()
+    if stored['request_hash'] != fingerprint:
+        raise HttpError(422, 'Idempotency-Key уже использован для другого запроса')
+
+    response = respond(stored['status_code'], stored['response'])
+    response['headers']['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def save_response(cur, user_id: int, req: Request, status: int, payload) -> None:
+    '''Сохранение ответа для повторов с тем же Idempotency-Key'''
+    key = req.headers.get('idempotency-key', '').strip()
+    if not key:
+        return
+    cur.execute(
+        """
+        UPDATE t_p28902192_strikbal_rating_app.idempotency_keys
+        SET status_code = %s, response = %s
+        WHERE user_id = %s AND key = %s
+        """,
+        (status, json.dumps(payload, ensure_ascii=False, default=str), user_id, key)
+    )
+
+
+def sweep_expired_keys(cur) -> int:
+    '''Удаление пачки истёкших ключей; не чаще раза в SWEEP_INTERVAL_SECONDS на экземпляр'''
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep < SWEEP_INTERVAL_SECONDS:
+        return 0
+    _last_sweep = now
+
+    cur.execute(
+        """
+        DELETE FROM t_p28902192_strikbal_rating_app.idempotency_keys
+        WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM t_p28902192_strikbal_rating_app.idempotency_keys
+            WHERE expires_at <= NOW()
+            ORDER BY expires_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ))
+        """,
+        (SWEEP_BATCH_SIZE,)
+    )
+    return cur.rowcount
@@ -1,238 +1,272 @@
-import json
-import os
-import psycopg2
+from datetime import datetime
 from psycopg2.extras import RealDictCursor
+from db import get_connection
+from compression import compressed
+from metrics import instrumented
+from core import HttpError, Request, Router, decode_cursor, encode_cursor, not_modified, parse_limit, respond, respond_cacheable
+from auth import require_admin, resolve_session
+from idempotency import claim_key, save_response
+from versions import bump_versions, compute_etag, is_not_modified, request_variant
 
-def verify_admin(token: str, dsn: str) -> bool:
-    '''Проверка прав администратора'''
-    if not token:
-        return False
-    
-    with psycopg2.connect(dsn) as conn:
+MAX_PAGE_SIZE = 200
+MAX_BULK_TASKS = 500
+TASK_CURSOR_TYPES = (bool, datetime.fromisoformat, int)
+
+def parse_task_filters(cur, req: Request) -> dict:
+    '''Фильтры списка задач: playerId, completed, mine (задачи владельца токена)'''
+    filters = {}
+
+    if req.query.get('mine', '') in ('1', 'true'):
+        session = resolve_session(cur, req.token)
+        if not session:
+            raise HttpError(401, 'Неверный токен')
+        if not session['player_id']:
+            raise HttpError(404, 'Игрок не найден')
+        filters['player_id'] = session['player_id']
+    elif req.query.get('playerId'):
+        if not req.query['playerId'].isdigit():
+            raise HttpError(400, 'Неверный параметр playerId')
+        filters['player_id'] = int(req.query['playerId'])
+
+    completed = req.query.get('completed')
+    if completed is not None:
+        if completed not in ('true', 'false', '1', '0'):
+            raise HttpError(400, 'Неверный параметр completed')
+        filters['completed'] = completed in ('true', '1')
+    return filters
+
+# Задачи с фильтром {where} в порядке списка: невыполненные сначала, новые сверху
+TASKS_PAGE = """
+    SELECT
+        t.id,
+        t.name,
+        t.points,
+        t.completed,
+        t.created_at,
+        u.name as player_name,
+        p.id as player_id
+    FROM t_p28902192_strikbal_rating_app.tasks t
+    JOIN t_p28902192_strikbal_rating_app.players p ON t.player_id = p.id
+    JOIN t_p28902192_strikbal_rating_app.users u ON p.user_id = u.id
+    {where}
+    ORDER BY t.completed ASC, t.created_at DESC, t.id DESC
+    {limit}
+"""
+
+def fetch_tasks(cur, filters: dict, limit, after) -> tuple:
+    '''Страница задач в порядке (невыполненные сначала, новые сверху) и курсор следующей страницы'''
+    conditions = []
+    params = []
+
+    if 'player_id' in filters:
+        conditions.append('t.player_id = %s')
+        params.append(filters['player_id'])
+    if 'completed' in filters:
+        conditions.append('t.completed = %s')
+        params.append(filters['completed'])
+
+    # Курсор задаёт границу по (created_at, id) при равном completed, чтобы она стала
+    # условием индекса; после невыполненных задач список продолжается выполненными
+    branches = [(conditions, params)]
+    if after:
+        completed, created_at, task_id = after
+        branches = [(conditions + ['t.completed = %s', '(t.created_at, t.id) < (%s, %s)'],
+                     params + [completed, created_at, task_id])]
+        if not completed and filters.get('completed', True):
+            branches.append((conditions + ['t.completed = true'], params))
+
+    limit_clause = 'LIMIT %s' if limit is not None else ''
+    queries = []
+    query_params = []
+    for branch_conditions, branch_params in branches:
+        where = f"WHERE {' AND '.join(branch_conditions)}" if branch_conditions else ''
+        queries.append(TASKS_PAGE.format(where=where, limit=limit_clause))
+        query_params.extend(branch_params + ([limit + 1] if limit is not None else []))
+
+    if len(queries) == 1:
+        cur.execute(queries[0], query_params)
+    else:
+        cur.execute(
+            f"""
+            SELECT * FROM ({' UNION ALL '.join(f'({query})' for query in queries)}) page
+            ORDER BY page.completed ASC, page.created_at DESC, page.id DESC
+            {limit_clause}
+            """,
+            query_params + ([limit + 1] if limit is not None else [])
+        )
+    tasks = [dict(task) for task in cur.fetchall()]
+
+    next_cursor = None
+    if limit is not None and len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        next_cursor = encode_cursor([last['completed'], last['created_at'].isoformat(), last['id']])
+    return tasks, next_cursor
+
+def parse_task_ids(value) -> list:
+    '''Список ID задач без повторов, в исходном порядке'''
+    if not isinstance(value, list) or not value or len(value) > MAX_BULK_TASKS:
+        raise HttpError(400, f'Передайте от 1 до {MAX_BULK_TASKS} задач')
+    try:
+        return list(dict.fromkeys(int(task_id) for task_id in value))
+    except (TypeError, ValueError):
+        raise HttpError(400, 'Неверный ID задачи')
+
+def complete_tasks(cur, task_ids: list) -> list:
+    '''Выполнение задач одним запросом; возвращает ID задач, выполненных этим запросом.
+
+    Условный UPDATE задач исключает двойное начисление при параллельных запросах:
+    вторая транзакция дождётся первой и не найдёт строку с completed = FALSE.
+    Очки игроков обновляет триггер журнала одним UPDATE на всех игроков пакета.
+    '''
+    cur.execute(
+        """
+        WITH done AS (
+            UPDATE t_p28902192_strikbal_rating_app.tasks t
+            SET completed = TRUE
+            WHERE t.id = ANY(%s) AND t.completed = FALSE
+            RETURNING t.id, t.player_id, t.points
+        ),
+        balances AS (
+            SELECT p.id, p.points
+            FROM t_p28902192_strikbal_rating_app.players p
+            WHERE p.id IN (SELECT player_id FROM done)
+            ORDER BY p.id
+            FOR UPDATE
+        ),
+        events AS (
+            INSERT INTO t_p28902192_strikbal_rating_app.point_events
+            (player_id, reason, delta, points_after, task_id)
+            SELECT d.player_id, 'task', d.points,
+                   b.points + SUM(d.points) OVER (PARTITION BY d.player_id ORDER BY d.id),
+                   d.id
+            FROM done d
+            JOIN balances b ON b.id = d.player_id
+            RETURNING task_id
+        )
+        SELECT task_id FROM events ORDER BY task_id
+        """,
+        (task_ids,)
+    )
+    return [row['task_id'] for row in cur.fetchall()]
+
+router = Router(allow_headers='Content-Type, Authorization, X-Authorization, If-None-Match, Idempotency-Key, X-Read-After-Write')
+
+@router.route('GET', auth=True)
+def get_tasks(req: Request) -> dict:
+    '''Список задач с фильтрами и keyset-пагинацией'''
+    limit = parse_limit(req.query.get('limit'), MAX_PAGE_SIZE)
+    after = None
+    if limit is not None and req.query.get('after'):
+        after = decode_cursor(req.query['after'], TASK_CURSOR_TYPES)
+
+    with get_connection(replica=req.use_replica) as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            filters = parse_task_filters(cur, req)
+
+            etag = compute_etag(cur, ('players', 'tasks'), request_variant(req.query, filters.get('player_id')))
+            if is_not_modified(req.headers, etag):
+                return not_modified(etag)
+
+            tasks, next_cursor = fetch_tasks(cur, filters, limit, after)
+
+    result = {'tasks': tasks}
+    if limit is not None:
+        result['nextCursor'] = next_cursor
+    return respond_cacheable(result, etag)
+
+@router.route('POST', auth=True)
+def post_task(req: Request) -> dict:
+    '''Создание задачи для игрока'''
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            require_admin(cur, req.token)
+
+            name = req.body.get('name', '').strip()
+            points = req.body.get('points')
+            player_id = req.body.get('playerId')
+
+            if not name or not points or not player_id:
+                raise HttpError(400, 'Заполните все поля')
+
             cur.execute(
                 """
-                SELECT u.is_admin 
-                FROM t_p28902192_strikbal_rating_app.sessions s
-                JOIN t_p28902192_strikbal_rating_app.users u ON s.user_id = u.id
-                WHERE s.token = %s AND s.expires_at > NOW()
+                INSERT INTO t_p28902192_strikbal_rating_app.tasks (name, points, player_id)
+                VALUES (%s, %s, %s)
+                RETURNING id, name, points, player_id, completed, created_at
                 """,
-                (token,)
+                (name, points, player_id)
             )
-            result = cur.fetchone()
-            return result['is_admin'] if result else False
+            task = cur.fetchone()
+            bump_versions(cur, 'tasks')
 
-def handler(event: dict, context) -> dict:
-    '''API для управления дополнительными задачами'''
-    method = event.get('httpMethod', 'GET')
-
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+    return respond(201, {'task': dict(task)})
 
-    try:
-        headers = event.get('headers', {})
-        query_params = event.get('queryStringParameters', {}) or {}
-        
-        auth_header = headers.get('x-authorization', headers.get('X-Authorization', ''))
-        if not auth_header:
-            auth_header = headers.get('authorization', headers.get('Authorization', ''))
-        token = auth_header.replace('Bearer ', '').strip() if auth_header else ''
-        
-        if not token:
-            token = query_params.get('token', '')
-        
-        if not token:
-            return {
-                'statusCode': 401,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Требуется авторизация'}),
-                'isBase64Encoded': False
-            }
-        
-        dsn = os.environ['DATABASE_URL']
-        is_admin = verify_admin(token, dsn)
-        
-        if method != 'GET' and not is_admin:
-            return {
-                'statusCode': 403,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Требуются права администратора'}),
-                'isBase64Encoded': False
-            }
-
-        with psycopg2.connect(dsn) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                
-                if method == 'GET':
-                    cur.execute(
-                        """
-                        SELECT 
-                            t.id, 
-                            t.name, 
-                            t.points, 
-                            t.completed, 
-                            t.created_at,
-                            u.name as player_name,
-                            p.id as player_id
-                        FROM t_p28902192_strikbal_rating_app.tasks t
-                        JOIN t_p28902192_strikbal_rating_app.players p ON t.player_id = p.id
-                        JOIN t_p28902192_strikbal_rating_app.users u ON p.user_id = u.id
-                        ORDER BY t.completed ASC, t.created_at DESC
-                        """
-                    )
-                    tasks = cur.fetchall()
-
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'tasks': [dict(task) for task in tasks]}, default=str),
-                        'isBase64Encoded': False
-                    }
-
-                elif method == 'POST':
-                    body = json.loads(event.get('body', '{}'))
-                    name = body.get('name', '').strip()
-                    points = body.get('points')
-                    player_id = body.get('playerId')
-
-                    if not name or not points or not player_id:
-                        return {
-                            'statusCode': 400,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Заполните все поля'}),
-                            'isBase64Encoded': False
-                        }
-
-                    cur.execute(
-                        """
-                        INSERT INTO t_p28902192_strikbal_rating_app.tasks (name, points, player_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id, name, points, player_id, completed, created_at
-                        """,
-                        (name, points, player_id)
-                    )
-                    task = cur.fetchone()
-                    conn.commit()
-
-                    return {
-                        'statusCode': 201,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'task': dict(task)}, default=str),
-                        'isBase64Encoded': False
-                    }
-
-                elif method == 'PUT':
-                    body = json.loads(event.get('body', '{}'))
-                    task_id = body.get('taskId')
-
-                    if not task_id:
-                        return {
-                            'statusCode': 400,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Укажите ID задачи'}),
-                            'isBase64Encoded': False
-                        }
-
-                    cur.execute(
-                        """
-                        SELECT points, player_id FROM t_p28902192_strikbal_rating_app.tasks
-                        WHERE id = %s AND completed = FALSE
-                        """,
-                        (task_id,)
-                    )
-                    task = cur.fetchone()
-
-                    if not task:
-                        return {
-                            'statusCode': 404,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Задача не найдена или уже выполнена'}),
-                            'isBase64Encoded': False
-                        }
-
-                    cur.execute(
-                        """
-                        UPDATE t_p28902192_strikbal_rating_app.players
-                        SET points = points + %s
-                        WHERE id = %s
-                        """,
-                        (task['points'], task['player_id'])
-                    )
-
-                    cur.execute(
-                        """
-                        UPDATE t_p28902192_strikbal_rating_app.tasks
-                        SET completed = TRUE
-                        WHERE id = %s
-                        """,
-                        (task_id,)
-                    )
-
-                    conn.commit()
-
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'message': 'Задача выполнена, очки начислены'}),
-                        'isBase64Encoded': False
-                    }
-
-                elif method == 'DELETE':
-                    query_params = event.get('queryStringParameters', {}) or {}
-                    task_id = query_params.get('taskId')
-
-                    if not task_id:
-                        return {
-                            'statusCode': 400,
-                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Укажите ID задачи'}),
-                            'isBase64Encoded': False
-                        }
-
-                    cur.execute(
-                        """
-                        DELETE FROM t_p28902192_strikbal_rating_app.tasks
-                        WHERE id = %s
-                        """,
-                        (task_id,)
-                    )
-
-                    conn.commit()
-
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'message': 'Задача удалена'}),
-                        'isBase64Encoded': False
-                    }
-
-                return {
-                    'statusCode': 405,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Метод не разрешен'}),
-                    'isBase64Encoded': False
+@router.route('PUT', auth=True)
+def put_task(req: Request) -> dict:
+    '''Выполнение задачи или пакета задач {"taskIds": [...]} с начислением очков игрокам.
+
+    Повтор с тем же заголовком Idempotency-Key возвращает сохранённый ответ.
+    '''
+    is_batch = 'taskIds' in req.body
+    if is_batch:
+        task_ids = parse_task_ids(req.body['taskIds'])
+    else:
+        task_id = req.body.get('taskId')
+        if not task_id:
+            raise HttpError(400, 'Укажите ID задачи')
+        task_ids = parse_task_ids([task_id])
+
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            session = require_admin(cur, req.token)
+            replay = claim_key(cur, session['user_id'], req)
+            if replay:
+                return replay
+
+            completed = complete_tasks(cur, task_ids)
+            if completed:
+                bump_versions(cur, 'players', 'tasks')
+
+            if is_batch:
+                done = set(completed)
+                payload = {
+                    'completed': completed,
+                    'skipped': [task_id for task_id in task_ids if task_id not in done]
                 }
+            elif not completed:
+                raise HttpError(404, 'Задача не найдена или уже выполнена')
+            else:
+                payload = {'message': 'Задача выполнена, очки начислены'}
+            save_response(cur, session['user_id'], req, 200, payload)
+
+    return respond(200, payload)
 
-    except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Неверный формат данных'}),
-            'isBase64Encoded': False
-        }
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Ошибка сервера: {str(e)}'}),
-            'isBase64Encoded': False
-        }
\ No newline at end of file
+@router.route('DELETE', auth=True)
+def delete_task(req: Request) -> dict:
+    '''Удаление задачи'''
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            require_admin(cur, req.token)
+
+            task_id = req.query.get('taskId')
+            if not task_id:
+                raise HttpError(400, 'Укажите ID задачи')
+
+            cur.execute(
+                """
+                DELETE FROM t_p28902192_strikbal_rating_app.tasks
+                WHERE id = %s
+                """,
+                (task_id,)
+            )
+
+            bump_versions(cur, 'tasks')
+
+    return respond(200, {'message': 'Задача удалена'})
+
+@instrumented
+@compressed
+def handler(event: dict, context) -> dict:
+    '''API для управления дополнительными задачами'''
+    return router.dispatch(event, context)
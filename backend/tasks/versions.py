@@ -0,0 +1,46 @@
+import hashlib
+
+
+def bump_versions(cur, *names: str) -> None:
+    '''Увеличение версий данных; вызывается в транзакции, которая их изменила'''
+    cur.execute(
+        """
+        UPDATE t_p28902192_strikbal_rating_app.data_versions
+        SET version = version + 1, updated_at = NOW()
+        WHERE name = ANY(%s)
+        """,
+        (sorted(names),)
+    )
+
+
+def compute_etag(cur, names: tuple, variant: str = '') -> str:
+    '''Слабый ETag из версий данных и параметров запроса, без выполнения основного запроса'''
+    cur.execute(
+        """
+        SELECT name, version FROM t_p28902192_strikbal_rating_app.data_versions
+        WHERE name = ANY(%s)
+        ORDER BY name
+        """,
+        (list(names),)
+    )
+    versions = ','.join(f"{row['name']}:{row['version']}" for row in cur.fetchall())
+    digest = hashlib.sha1(f'{versions}|{variant}'.encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def request_variant(query_params: dict, *extra) -> str:
+    '''Часть ETag, зависящая от параметров запроса (токен не учитывается)'''
+    params = '&'.join(f'{k}={v}' for k, v in sorted(query_params.items()) if k != 'token')
+    return '|'.join([params, *map(str, extra)])
+
+
+def is_not_modified(headers: dict, etag: str) -> bool:
+    '''Проверка заголовка If-None-Match (заголовки в нижнем регистре)'''
+    value = headers.get('if-none-match', '')
+    if not value:
+        return False
+    candidates = [tag.strip() for tag in value.split(',')]
+    weak = etag[2:] if etag.startswith('W/') else etag
+    return '*' in candidates or any(
+        (tag[2:] if tag.startswith('W/') else tag) == weak for tag in candidates
+    )
@@ -0,0 +1,99 @@
+'''Замер сжатия ответов: размер и время gzip/brotli на типичных телах списков игр и рейтинга.
+
+Запуск: python benchmarks/compression_bench.py [--games 500] [--players 5000] [--repeat 20]
+Результат печатается в stdout в формате JSON.
+'''
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import sys
+import random
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_compression():
+    # compression.py импортирует соседний metrics.py, поэтому каталог функции нужен в sys.path
+    directory = os.path.join(ROOT, 'backend', 'games')
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    path = os.path.join(directory, 'compression.py')
+    spec = importlib.util.spec_from_file_location('compression', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def games_body(count: int) -> str:
+    games = []
+    for game_id in range(1, count + 1):
+        teams = []
+        for team_no, color in enumerate(('red', 'blue')):
+            players = [
+                {'id': random.randint(1, 50000), 'name': f'Игрок {random.randint(1, 50000)}',
+                 'points': random.randint(0, 5000)}
+                for _ in range(10)
+            ]
+            teams.append({'id': game_id * 2 + team_no, 'name': f'Команда {team_no + 1}',
+                          'color': color, 'players': players})
+        games.append({'id': game_id, 'name': f'Игра {game_id}', 'status': 'completed', 'finished': True,
+                      'winner_team_id': game_id * 2, 'created_at': '2026-05-01 12:00:00.000000', 'teams': teams})
+    return json.dumps({'games': games})
+
+
+def leaderboard_body(count: int) -> str:
+    players = [
+        {'id': i, 'name': f'Игрок {i}', 'email': f'player{i}@example.com',
+         'avatar': f'https://cdn.poehali.dev/projects/key/bucket/avatars/{random.getrandbits(128):032x}/128.webp',
+         'points': random.randint(0, 5000), 'wins': random.randint(0, 100), 'losses': random.randint(0, 100)}
+        for i in range(1, count + 1)
+    ]
+    return json.dumps({'players': players})
+
+
+def measure(compression, body: str, encoding: str, repeat: int) -> dict:
+    event = {'headers': {'Accept-Encoding': encoding}}
+    response = {'statusCode': 200, 'headers': {}, 'body': body, 'isBase64Encoded': False}
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = compression.compress_response(event, response)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    payload = result['body']
+    wire_bytes = len(base64.b64decode(payload)) if result['isBase64Encoded'] else len(payload.encode())
+    return {
+        'encoding': result['headers'].get('Content-Encoding', 'identity'),
+        'wire_bytes': wire_bytes,
+        'function_payload_bytes': len(payload.encode()),
+        'ratio': round(wire_bytes / len(body.encode()), 4),
+        'ms_p50': round(timings[len(timings) // 2] * 1000, 3),
+        'ms_max': round(timings[-1] * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    compression = load_compression()
+    bodies = {'games_list': games_body(args.games), 'leaderboard_admin': leaderboard_body(args.players)}
+
+    report = {'brotli_available': compression.brotli is not None, 'results': {}}
+    for name, body in bodies.items():
+        report['results'][name] = {
+            'raw_bytes': len(body.encode()),
+            'variants': [measure(compression, body, encoding, args.repeat) for encoding in ('identity', 'gzip', 'br')]
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
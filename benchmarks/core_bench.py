@@ -0,0 +1,113 @@
+'''Замер накладных расходов общего ядра на один вызов: Router.dispatch против ручного разбора события.
+
+Запуск: python benchmarks/core_bench.py [--iterations 200000]
+Результат печатается в stdout в формате JSON (микросекунды на вызов).
+'''
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_core():
+    # core.py импортирует соседний metrics.py, поэтому каталог функции нужен в sys.path
+    directory = os.path.join(ROOT, 'backend', 'games')
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    path = os.path.join(directory, 'core.py')
+    spec = importlib.util.spec_from_file_location('core', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def inline_handler(event: dict, context) -> dict:
+    '''Обработчик в прежнем стиле: разбор заголовков и литералы ответа прямо в коде'''
+    method = event.get('httpMethod', 'GET')
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Authorization'
+            },
+            'body': '',
+            'isBase64Encoded': False
+        }
+    headers = event.get('headers', {})
+    token = headers.get('X-Authorization') or headers.get('x-authorization') or ''
+    if not token:
+        return {
+            'statusCode': 401,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Требуется авторизация'}),
+            'isBase64Encoded': False
+        }
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'ok': True}),
+        'isBase64Encoded': False
+    }
+
+
+def make_router(core):
+    router = core.Router(allow_headers='Content-Type, X-Authorization')
+
+    @router.route('GET', auth=True)
+    def get_ok(req):
+        return core.respond(200, {'ok': True})
+
+    @router.route('POST', auth=True)
+    def post_ok(req):
+        return core.respond(200, {'ok': True})
+
+    return router
+
+
+def measure(fn, event: dict, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(event, None)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200000)
+    args = parser.parse_args()
+
+    core = load_core()
+    router = make_router(core)
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'Mozilla/5.0',
+        'Accept-Encoding': 'gzip, br',
+        'X-Forwarded-For': '10.0.0.1'
+    }
+    events = {
+        'options': {'httpMethod': 'OPTIONS', 'headers': headers},
+        'unauthorized': {'httpMethod': 'GET', 'headers': headers, 'queryStringParameters': {}},
+        'authorized': {'httpMethod': 'GET', 'headers': {**headers, 'X-Authorization': 'a' * 64},
+                       'queryStringParameters': {}}
+    }
+
+    result = {}
+    for name, event in events.items():
+        inline_us = measure(inline_handler, event, args.iterations)
+        router_us = measure(router.dispatch, event, args.iterations)
+        result[name] = {
+            'inline_us': round(inline_us, 3),
+            'router_us': round(router_us, 3),
+            'overhead_us': round(router_us - inline_us, 3)
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
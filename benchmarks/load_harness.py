@@ -0,0 +1,446 @@
+'''Нагрузочный прогон всех функций на локальной базе.
+
+Поднимает временный Postgres (initdb/pg_ctl из PATH или пакет pgserver), применяет
+db_migrations/, заполняет базу объёмами из параметров и вызывает handler(event, context)
+каждой функции напрямую с заданной параллельностью. По каждому действию считает
+p50/p95/p99 задержки, число SQL-запросов на вызов, время по фазам (из заголовка
+Server-Timing) и пропускную способность.
+
+Запуск:
+    python benchmarks/load_harness.py [--users 50000] [--games 200000] [--team-players 1000000]
+        [--sessions 500000] [--tasks 100000] [--concurrency 8] [--requests 500]
+        [--actions players.leaderboard,games.list] [--dsn postgresql://...] [--out result.json]
+
+--scale 0.01 уменьшает все объёмы для быстрой проверки. С --dsn используется уже
+запущенная база (схема t_p28902192_strikbal_rating_app будет пересоздана!).
+Для вызова функций нужны их зависимости (requirements.txt каждой функции).
+Результат печатается в stdout (или в --out) в формате JSON.
+'''
+import argparse
+import atexit
+import base64
+import glob
+import importlib
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'backend')
+SCHEMA = 't_p28902192_strikbal_rating_app'
+FUNCTIONS = ('games', 'login', 'players', 'register', 'tasks')
+BENCH_PASSWORD = 'bench-password'
+BENCH_TOKENS = 1000
+
+
+# --- Локальный Postgres ---------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_local_postgres() -> str:
+    '''Временный кластер; останавливается и удаляется при выходе'''
+    data_dir = tempfile.mkdtemp(prefix='strikbal-bench-')
+
+    if shutil.which('initdb') and shutil.which('pg_ctl'):
+        port = free_port()
+        subprocess.run(['initdb', '-D', data_dir, '-A', 'trust', '-U', 'postgres'],
+                       check=True, stdout=subprocess.DEVNULL)
+        options = f"-p {port} -k {data_dir} -c listen_addresses='' -c fsync=off"
+        subprocess.run(['pg_ctl', '-D', data_dir, '-o', options, '-w', 'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+        atexit.register(lambda: (
+            subprocess.run(['pg_ctl', '-D', data_dir, '-m', 'fast', 'stop'], stdout=subprocess.DEVNULL),
+            shutil.rmtree(data_dir, ignore_errors=True)
+        ))
+        return f'postgresql://postgres@/postgres?host={data_dir}&port={port}'
+
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit('Нужен Postgres: initdb/pg_ctl в PATH, пакет pgserver или параметр --dsn')
+    server = pgserver.get_server(data_dir, cleanup_mode='delete')
+    return server.get_uri()
+
+
+def apply_migrations(dsn: str) -> None:
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}')
+        cur.execute(f'SET search_path TO {SCHEMA}')
+        for path in sorted(glob.glob(os.path.join(ROOT, 'db_migrations', '*.sql'))):
+            with open(path, encoding='utf-8') as f:
+                cur.execute(f.read())
+    conn.close()
+
+
+# --- Наполнение -----------------------------------------------------------------------
+
+SEED_STEPS = (
+    ('users', """
+        INSERT INTO users (id, email, password_hash, name, avatar, is_admin)
+        SELECT g, 'bench' || g || '@bench.local', encode(sha256(%(password)s::bytea), 'hex'),
+               'Игрок ' || g, '', g = 1
+        FROM generate_series(1, %(users)s) g;
+        SELECT setval(pg_get_serial_sequence('users', 'id'), %(users)s);
+        INSERT INTO players (id, user_id, points, wins, losses)
+        SELECT g, g, 0, 0, 0 FROM generate_series(1, %(users)s) g;
+        SELECT setval(pg_get_serial_sequence('players', 'id'), %(users)s);
+    """),
+    ('games', """
+        INSERT INTO games (id, name, status, created_at)
+        SELECT g, 'Игра ' || g,
+               CASE WHEN g > %(games)s * 0.95 THEN 'active' ELSE 'completed' END,
+               NOW() - interval '3 years' * (1 - g::float / %(games)s)
+        FROM generate_series(1, %(games)s) g;
+        SELECT setval(pg_get_serial_sequence('games', 'id'), %(games)s);
+        INSERT INTO teams (id, game_id, name, color)
+        SELECT g * 2 - 1 + s, g, CASE s WHEN 0 THEN 'Красные' ELSE 'Синие' END,
+               CASE s WHEN 0 THEN '#EF4444' ELSE '#0EA5E9' END
+        FROM generate_series(1, %(games)s) g, generate_series(0, 1) s;
+        SELECT setval(pg_get_serial_sequence('teams', 'id'), %(games)s * 2);
+        UPDATE games SET winner_team_id = id * 2 - 1, completed_at = created_at WHERE status = 'completed';
+    """),
+    ('team_players', """
+        INSERT INTO team_players (team_id, player_id, created_at)
+        SELECT (n - 1) %% (%(games)s * 2) + 1, 1 + floor(random() * %(users)s)::int,
+               NOW() - interval '3 years'
+        FROM generate_series(1, %(team_players)s) n;
+    """),
+    ('point_events', """
+        INSERT INTO point_events
+            (player_id, reason, delta, wins_delta, losses_delta, points_after, game_id, created_at)
+        SELECT e.player_id, e.reason, e.delta, e.wins_delta, e.losses_delta,
+               SUM(e.delta) OVER (PARTITION BY e.player_id ORDER BY e.created_at, e.game_id),
+               e.game_id, e.created_at
+        FROM (
+            SELECT tp.player_id, g.id as game_id, g.created_at,
+                   CASE WHEN t.id = g.winner_team_id THEN 'game_win' ELSE 'game_loss' END as reason,
+                   CASE WHEN t.id = g.winner_team_id THEN 100 ELSE 0 END as delta,
+                   (t.id = g.winner_team_id)::int as wins_delta,
+                   (t.id <> g.winner_team_id)::int as losses_delta
+            FROM team_players tp
+            JOIN teams t ON t.id = tp.team_id
+            JOIN games g ON g.id = t.game_id
+            WHERE g.status = 'completed'
+        ) e;
+        UPDATE players p
+        SET points = s.points, wins = s.wins, losses = s.losses
+        FROM (
+            SELECT player_id, SUM(delta) as points, SUM(wins_delta) as wins, SUM(losses_delta) as losses
+            FROM point_events GROUP BY player_id
+        ) s
+        WHERE p.id = s.player_id;
+    """),
+    ('tasks', """
+        INSERT INTO tasks (name, points, player_id, completed, created_at)
+        SELECT 'Задание ' || n, 10 + (n %% 10) * 10, 1 + floor(random() * %(users)s)::int,
+               random() < 0.7, NOW() - interval '1 year' * random()
+        FROM generate_series(1, %(tasks)s) n;
+    """),
+    ('sessions', """
+        INSERT INTO sessions (user_id, token, expires_at)
+        SELECT g, 'bench-token-' || g, NOW() + interval '30 days'
+        FROM generate_series(1, LEAST(%(bench_tokens)s, %(users)s)) g;
+        INSERT INTO sessions (user_id, token, expires_at)
+        SELECT 1 + floor(random() * %(users)s)::int, md5(random()::text || n),
+               NOW() + interval '30 days' * (random() * 1.1 - 0.1)
+        FROM generate_series(1, GREATEST(%(sessions)s - %(bench_tokens)s, 0)) n;
+    """),
+    ('derived', 'SELECT rebuild_leaderboard()'),
+    # Карта видимости нужна для index-only scan, как на давно работающей базе
+    ('vacuum', 'VACUUM ANALYZE'),
+)
+
+
+def seed(dsn: str, volumes: dict, seed_value: float) -> dict:
+    '''Заполнение базы; триггеры отключены, производные таблицы пересчитываются в конце'''
+    timings = {}
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'SET search_path TO {SCHEMA}')
+        cur.execute("SET session_replication_role = 'replica'")
+        cur.execute('SELECT setseed(%s)', (seed_value,))
+        params = {**volumes, 'password': BENCH_PASSWORD, 'bench_tokens': BENCH_TOKENS}
+        for name, sql in SEED_STEPS:
+            started = time.perf_counter()
+            cur.execute(sql, params)
+            timings[name] = round(time.perf_counter() - started, 2)
+    conn.close()
+    return timings
+
+
+# --- Загрузка функций и подсчёт запросов ----------------------------------------------
+
+def parse_server_timing(value: str) -> dict:
+    '''Server-Timing -> {метрика: мс}; для db дополнительно число запросов'''
+    metrics = {}
+    for part in value.split(','):
+        name, *params = [item.strip() for item in part.split(';')]
+        for param in params:
+            key, _, raw = param.partition('=')
+            if key == 'dur':
+                metrics[name] = float(raw)
+            elif key == 'desc' and name == 'db':
+                metrics['queries'] = int(raw.strip('"').split()[0])
+    return metrics
+
+
+def load_handlers() -> dict:
+    '''Каждая функция импортируется со своими копиями общих модулей (db, core, auth, ...)'''
+    handlers = {}
+    for name in FUNCTIONS:
+        directory = os.path.join(BACKEND, name)
+        local = {f[:-3] for f in os.listdir(directory) if f.endswith('.py')}
+        for module in local:
+            sys.modules.pop(module, None)
+        sys.path.insert(0, directory)
+        try:
+            handlers[name] = importlib.import_module('index').handler
+        finally:
+            sys.path.remove(directory)
+            for module in local:
+                sys.modules.pop(module, None)
+    return handlers
+
+
+# --- Сценарии -------------------------------------------------------------------------
+
+def event(method: str, token: str = '', query: dict = None, body=None, headers: dict = None) -> dict:
+    all_headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip, br', **(headers or {})}
+    if token:
+        all_headers['X-Authorization'] = f'Bearer {token}'
+    result = {'httpMethod': method, 'headers': all_headers, 'queryStringParameters': query or {}}
+    if body is not None:
+        result['body'] = json.dumps(body)
+    return result
+
+
+class Scenarios:
+    '''Генераторы событий по действиям; изменяющие действия берут каждый объект один раз'''
+
+    def __init__(self, dsn: str, volumes: dict, rng: random.Random):
+        self.volumes = volumes
+        self.rng = rng
+        self.lock = threading.Lock()
+        conn = psycopg2.connect(dsn)
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT id FROM {SCHEMA}.games WHERE status = 'active' ORDER BY id")
+            self.active_games = [row[0] for row in cur.fetchall()]
+            cur.execute(f'SELECT id FROM {SCHEMA}.tasks WHERE completed = FALSE ORDER BY id')
+            self.open_tasks = [row[0] for row in cur.fetchall()]
+            # Курсоры страниц из середины списков: ключи сортировки случайных строк
+            cur.execute(f'''
+                SELECT p.points, u.name, u.id
+                FROM {SCHEMA}.players p JOIN {SCHEMA}.users u ON u.id = p.user_id
+                ORDER BY random() LIMIT 1000''')
+            self.leaderboard_keys = cur.fetchall()
+            cur.execute(f'SELECT created_at, id FROM {SCHEMA}.games ORDER BY random() LIMIT 1000')
+            self.game_keys = cur.fetchall()
+            cur.execute(f'SELECT completed, created_at, id FROM {SCHEMA}.tasks ORDER BY random() LIMIT 1000')
+            self.task_keys = cur.fetchall()
+        conn.close()
+        rng.shuffle(self.active_games)
+        rng.shuffle(self.open_tasks)
+
+    def user(self) -> int:
+        return self.rng.randint(2, min(BENCH_TOKENS, self.volumes['users']))
+
+    def token(self, user_id: int) -> str:
+        return f'bench-token-{user_id}'
+
+    def cursor(self, keys: list) -> str:
+        '''Курсор в формате core.encode_cursor'''
+        values = [v.isoformat() if hasattr(v, 'isoformat') else v for v in self.rng.choice(keys)]
+        raw = json.dumps(values, ensure_ascii=False).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def take(self, items: list):
+        with self.lock:
+            return items.pop() if items else None
+
+    def build(self, action: str) -> tuple:
+        admin = self.token(1)
+        user_id = self.user()
+        if action == 'players.leaderboard':
+            return 'players', event('GET', query={'limit': '50'})
+        if action == 'players.leaderboard_admin':
+            return 'players', event('GET', admin, {'limit': '50'})
+        if action == 'players.leaderboard_page':
+            return 'players', event('GET', query={'limit': '50', 'after': self.cursor(self.leaderboard_keys)})
+        if action == 'players.profile':
+            return 'players', event('GET', self.token(user_id), {'action': 'profile'})
+        if action == 'players.player':
+            return 'players', event('GET', query={'action': 'player', 'id': str(user_id)})
+        if action == 'players.player_games':
+            return 'players', event('GET', query={'action': 'player_games', 'id': str(user_id)})
+        if action == 'players.player_tasks':
+            return 'players', event('GET', query={'action': 'player_tasks', 'id': str(user_id)})
+        if action == 'players.timeline':
+            return 'players', event('GET', query={'action': 'timeline', 'id': str(user_id)})
+        if action == 'players.around':
+            position = self.rng.randint(1, self.volumes['users'])
+            return 'players', event('GET', query={'action': 'around', 'position': str(position)})
+        if action == 'games.list':
+            return 'games', event('GET', admin, {'limit': '50'})
+        if action == 'games.list_page':
+            return 'games', event('GET', admin, {'limit': '50', 'after': self.cursor(self.game_keys)})
+        if action == 'games.list_active':
+            return 'games', event('GET', admin, {'limit': '50', 'status': 'active'})
+        if action == 'tasks.mine':
+            return 'tasks', event('GET', self.token(user_id), {'mine': '1', 'completed': 'false'})
+        if action == 'tasks.list':
+            return 'tasks', event('GET', admin, {'limit': '50'})
+        if action == 'tasks.list_page':
+            return 'tasks', event('GET', admin, {'limit': '50', 'after': self.cursor(self.task_keys)})
+        if action == 'login.login':
+            return 'login', event('POST', body={'email': f'bench{user_id}@bench.local',
+                                               'password': BENCH_PASSWORD, 'deviceId': 'bench'})
+        if action == 'register.register':
+            suffix = f'{time.time_ns()}{self.rng.random()}'
+            return 'register', event('POST', body={'email': f'new{suffix}@bench.local',
+                                                  'password': BENCH_PASSWORD, 'name': 'Новичок'})
+        if action == 'tasks.complete':
+            task_id = self.take(self.open_tasks)
+            return 'tasks', event('PUT', admin, body={'taskId': task_id})
+        if action == 'games.finalize':
+            game_id = self.take(self.active_games)
+            return 'games', event('PUT', admin, body={'gameId': game_id, 'winnerTeamId': (game_id or 0) * 2 - 1})
+        raise SystemExit(f'Неизвестное действие: {action}')
+
+
+ACTIONS = (
+    'players.leaderboard', 'players.leaderboard_page', 'players.leaderboard_admin', 'players.profile',
+    'players.player', 'players.player_games', 'players.player_tasks', 'players.timeline', 'players.around',
+    'games.list', 'games.list_page', 'games.list_active', 'tasks.mine', 'tasks.list', 'tasks.list_page',
+    'login.login', 'register.register', 'tasks.complete', 'games.finalize'
+)
+
+
+# --- Прогон ---------------------------------------------------------------------------
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_action(handlers: dict, scenarios: Scenarios, action: str, requests: int, concurrency: int) -> dict:
+    # Прогрев: первый вызов открывает пул соединений и заполняет кэши модулей
+    function, warmup = scenarios.build(action)
+    handlers[function](warmup, None)
+
+    latencies = []
+    phases = {}
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(_):
+        function, ev = scenarios.build(action)
+        started = time.perf_counter()
+        response = handlers[function](ev, None)
+        elapsed = (time.perf_counter() - started) * 1000
+        timing = parse_server_timing(response['headers'].get('Server-Timing', ''))
+        with lock:
+            latencies.append(elapsed)
+            for name, value in timing.items():
+                phases[name] = phases.get(name, 0.0) + value
+            statuses[response['statusCode']] = statuses.get(response['statusCode'], 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': sum(count for status, count in statuses.items() if status >= 400),
+        'status_counts': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'max_ms': round(latencies[-1], 2),
+        'queries_per_request': round(phases.pop('queries', 0) / requests, 2),
+        'phases_mean_ms': {name: round(total / requests, 2) for name, total in sorted(phases.items())},
+        'throughput_rps': round(requests / wall, 1)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dsn')
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--games', type=int, default=200000)
+    parser.add_argument('--team-players', type=int, default=1000000)
+    parser.add_argument('--sessions', type=int, default=500000)
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--actions', default=','.join(ACTIONS))
+    parser.add_argument('--seed', type=float, default=0.42)
+    parser.add_argument('--out')
+    args = parser.parse_args()
+
+    volumes = {
+        name: max(int(getattr(args, name) * args.scale), 10)
+        for name in ('users', 'games', 'team_players', 'sessions', 'tasks')
+    }
+    volumes['users'] = max(volumes['users'], 2)
+
+    dsn = args.dsn or start_local_postgres()
+    apply_migrations(dsn)
+    seed_timings = seed(dsn, volumes, args.seed)
+
+    os.environ['DATABASE_URL'] = dsn
+    os.environ['DB_POOL_MAX'] = str(args.concurrency)
+    # S3 в замерах не участвует: без ключей клиент не создаётся, а любое обращение
+    # ушло бы на закрытый локальный порт, а не во внешний бакет
+    os.environ.pop('AWS_ACCESS_KEY_ID', None)
+    os.environ.pop('AWS_SECRET_ACCESS_KEY', None)
+    os.environ['S3_ENDPOINT'] = 'http://127.0.0.1:9'
+    # Замеры берутся из Server-Timing, JSON-лог каждого вызова здесь не нужен
+    os.environ['METRICS_SAMPLE_RATE'] = '0'
+    os.environ['METRICS_SLOW_MS'] = 'inf'
+    handlers = load_handlers()
+
+    scenarios = Scenarios(dsn, volumes, random.Random(args.seed))
+    results = {}
+    for action in [a.strip() for a in args.actions.split(',') if a.strip()]:
+        results[action] = run_action(handlers, scenarios, action, args.requests, args.concurrency)
+        print(f'{action}: p50 {results[action]["p50_ms"]} ms, '
+              f'{results[action]["throughput_rps"]} rps', file=sys.stderr)
+
+    report = {
+        'config': {'volumes': volumes, 'concurrency': args.concurrency, 'requests': args.requests,
+                   'seed': args.seed, 'python': sys.version.split()[0]},
+        'seed_seconds': seed_timings,
+        'results': results
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+'''Проверка планов всех SQL-запросов функций на большом наборе данных.
+
+Поднимает базу и заполняет её так же, как load_harness.py, вызывает каждое действие,
+перехватывает отправленные в базу запросы (с подставленными параметрами) и выполняет
+для каждого EXPLAIN (ANALYZE, BUFFERS) в откатываемой транзакции. Нарушения:
+    - Seq Scan по таблице, в которой не меньше --large-rows строк;
+    - Sort, через который проходит не меньше --large-rows строк;
+    - сканирование, отбросившее фильтром не меньше --filtered-rows строк
+      (условие не стало условием индекса).
+
+Запуск:
+    python benchmarks/query_plans.py [--scale 0.2] [--large-rows 10000] [--filtered-rows 1000] [--dsn ...] [--out plans.json]
+
+Отчёт печатается в stdout в формате JSON; при нарушениях (кроме ALLOWED) код выхода 1.
+'''
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_harness import (  # noqa: E402
+    ACTIONS, SCHEMA, Scenarios, apply_migrations, load_handlers, seed, start_local_postgres
+)
+
+# Служебные запросы пула и сессии: планов у них нет
+SKIPPED_PREFIXES = ('SET ', 'SELECT 1', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+# Известные нарушения, которые индексом не исправить: (действие, начало описания) -> причина
+ALLOWED = {}
+
+_captured = threading.local()
+
+
+def _capturing_cursor(base: type) -> type:
+    class CapturingCursor(base):
+        def execute(self, query, vars=None):
+            result = super().execute(query, vars)
+            statements = getattr(_captured, 'statements', None)
+            if statements is not None:
+                template = query.decode() if isinstance(query, bytes) else str(query)
+                statements.append((template, self.query.decode()))
+            return result
+    return CapturingCursor
+
+
+def install_capture() -> None:
+    '''Перехват запросов поверх фабрики соединений, которую передаёт db.py'''
+    original = psycopg2.connect
+    classes = {}
+
+    def connect(*args, **kwargs):
+        base_connection = kwargs.get('connection_factory') or psycopg2.extensions.connection
+
+        class CapturingConnection(base_connection):
+            def cursor(self, *c_args, **c_kwargs):
+                base = c_kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+                if base not in classes:
+                    classes[base] = _capturing_cursor(base)
+                c_kwargs['cursor_factory'] = classes[base]
+                return super().cursor(*c_args, **c_kwargs)
+
+        kwargs['connection_factory'] = CapturingConnection
+        return original(*args, **kwargs)
+    psycopg2.connect = connect
+
+
+def collect_statements(handlers: dict, scenarios: Scenarios, actions: list, calls: int) -> dict:
+    '''Действие -> {шаблон запроса: запрос с параметрами}; каждое действие вызывается calls раз'''
+    collected = {}
+    for action in actions:
+        statements = {}
+        for _ in range(calls):
+            _captured.statements = []
+            function, event = scenarios.build(action)
+            handlers[function](event, None)
+            for template, bound in _captured.statements:
+                if not template.lstrip().upper().startswith(SKIPPED_PREFIXES):
+                    statements.setdefault(' '.join(template.split()), bound)
+        _captured.statements = None
+        collected[action] = statements
+    return collected
+
+
+def table_sizes(cur) -> dict:
+    cur.execute(
+        """
+        SELECT c.relname, c.reltuples::bigint
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relkind = 'r'
+        """,
+        (SCHEMA,)
+    )
+    return dict(cur.fetchall())
+
+
+def explain(conn, sql: str) -> tuple:
+    '''План с ANALYZE в откатываемой транзакции; если запрос не выполнился - оценочный план'''
+    with conn.cursor() as cur:
+        try:
+            cur.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + sql)
+            return cur.fetchone()[0][0]['Plan'], True
+        except psycopg2.Error:
+            conn.rollback()
+            cur.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            return cur.fetchone()[0][0]['Plan'], False
+        finally:
+            conn.rollback()
+
+
+def walk(node: dict):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from walk(child)
+
+
+def violations(plan: dict, sizes: dict, large_rows: int, filtered_rows: int, analyzed: bool) -> list:
+    found = []
+    for node in walk(plan):
+        rows = node['Actual Rows'] * node.get('Actual Loops', 1) if analyzed else node['Plan Rows']
+        if node['Node Type'] == 'Seq Scan' and sizes.get(node.get('Relation Name'), 0) >= large_rows:
+            found.append(f"Seq Scan on {node['Relation Name']} ({sizes[node['Relation Name']]} rows)")
+        elif node['Node Type'] == 'Sort' and rows >= large_rows:
+            found.append(f"Sort of {rows} rows by {', '.join(node.get('Sort Key', []))}")
+        removed = node.get('Rows Removed by Filter', 0) * node.get('Actual Loops', 1)
+        if removed >= filtered_rows:
+            found.append(f"{node['Node Type']} on {node.get('Relation Name')} filtered out {removed} rows")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dsn')
+    parser.add_argument('--scale', type=float, default=0.2)
+    parser.add_argument('--large-rows', type=int, default=10000)
+    parser.add_argument('--filtered-rows', type=int, default=1000)
+    parser.add_argument('--calls', type=int, default=2)
+    parser.add_argument('--actions', default=','.join(ACTIONS))
+    parser.add_argument('--seed', type=float, default=0.42)
+    parser.add_argument('--out')
+    args = parser.parse_args()
+
+    volumes = {
+        name: max(int(default * args.scale), 10)
+        for name, default in (('users', 50000), ('games', 200000), ('team_players', 1000000),
+                              ('sessions', 500000), ('tasks', 100000))
+    }
+    dsn = args.dsn or start_local_postgres()
+    apply_migrations(dsn)
+    seed(dsn, volumes, args.seed)
+
+    os.environ['DATABASE_URL'] = dsn
+    os.environ['METRICS_SAMPLE_RATE'] = '0'
+    os.environ['METRICS_SLOW_MS'] = 'inf'
+    install_capture()
+    handlers = load_handlers()
+
+    scenarios = Scenarios(dsn, volumes, random.Random(args.seed))
+    actions = [a.strip() for a in args.actions.split(',') if a.strip()]
+    collected = collect_statements(handlers, scenarios, actions, args.calls)
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        sizes = table_sizes(cur)
+    conn.rollback()
+
+    report = {'volumes': volumes, 'large_rows': args.large_rows, 'filtered_rows': args.filtered_rows, 'actions': {}}
+    failed = 0
+    for action, statements in collected.items():
+        checked = []
+        for template, bound in statements.items():
+            plan, analyzed = explain(conn, bound)
+            problems = violations(plan, sizes, args.large_rows, args.filtered_rows, analyzed)
+            allowed = {
+                problem: reason
+                for problem in problems
+                for (allowed_action, prefix), reason in ALLOWED.items()
+                if action == allowed_action and problem.startswith(prefix)
+            }
+            problems = [problem for problem in problems if problem not in allowed]
+            failed += bool(problems)
+            checked.append({
+                'sql': template[:200],
+                'analyzed': analyzed,
+                'total_ms': plan.get('Actual Total Time'),
+                'shared_buffers': plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0),
+                'violations': problems,
+                'allowed': allowed
+            })
+        report['actions'][action] = checked
+    conn.close()
+    report['failed_statements'] = failed
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
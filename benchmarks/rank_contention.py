@@ -0,0 +1,175 @@
+'''Конкуренция параллельных изменений очков за корзины мест (player_rank_buckets).
+
+Поднимает базу так же, как load_harness.py, заполняет игроков и запускает --writers
+потоков, каждый из которых в своих транзакциях меняет очки игроков (как завершение игр
+и задач), иногда регистрирует новых игроков с новыми очками и держит транзакцию
+открытой ещё --hold-ms (остальная работа запроса до фиксации). После прогона места
+корзин сверяются с полным пересчётом по players.
+
+С --global-lock триггер заменяется версией из V0018 (глобальная блокировка и пересчёт
+всех мест) - для сравнения пропускной способности.
+
+Запуск:
+    python benchmarks/rank_contention.py [--players 20000] [--writers 8] [--transactions 2000]
+        [--hold-ms 5] [--global-lock] [--dsn postgresql://...]
+
+Отчёт печатается в stdout в формате JSON; при расхождении мест код выхода 1.
+'''
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_harness import ROOT, SCHEMA, apply_migrations, percentile, start_local_postgres  # noqa: E402
+
+# Изменения очков: поражение, победа в игре, задачи
+POINT_DELTAS = (-100, 50, 100, 200, 300)
+NEW_PLAYER_SHARE = 0.02
+
+MISMATCHES = f"""
+    SELECT COUNT(*)
+    FROM {SCHEMA}.player_rank_buckets b
+    FULL JOIN (
+        SELECT points, COUNT(*) as players,
+               (1 + SUM(COUNT(*)) OVER (ORDER BY points DESC) - COUNT(*))::int as rank
+        FROM {SCHEMA}.players
+        GROUP BY points
+    ) t ON t.points = b.points
+    WHERE b.points IS NULL
+       OR COALESCE(t.players, 0) <> b.player_count
+       OR (t.points IS NOT NULL AND t.rank IS DISTINCT FROM b.rank)
+"""
+
+
+def seed(dsn: str, players: int, seed_value: float) -> None:
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'SET search_path TO {SCHEMA}')
+        cur.execute("SET session_replication_role = 'replica'")
+        cur.execute('SELECT setseed(%s)', (seed_value,))
+        cur.execute(
+            """
+            INSERT INTO users (id, email, password_hash, name, avatar)
+            SELECT g, 'rank' || g || '@bench.local', '', 'Игрок ' || g, '' FROM generate_series(1, %(players)s) g;
+            SELECT setval(pg_get_serial_sequence('users', 'id'), %(players)s);
+            INSERT INTO players (id, user_id, points, wins, losses)
+            SELECT g, g, floor(random() * 200)::int * 50, 0, 0 FROM generate_series(1, %(players)s) g;
+            SELECT setval(pg_get_serial_sequence('players', 'id'), %(players)s);
+            """,
+            {'players': players}
+        )
+        cur.execute("SET session_replication_role = 'origin'")
+        cur.execute('SELECT rebuild_leaderboard()')
+        cur.execute('VACUUM ANALYZE')
+    conn.close()
+
+
+def install_global_lock(dsn: str) -> None:
+    '''Функция триггера в редакции V0018'''
+    with open(os.path.join(ROOT, 'db_migrations', 'V0018__create_leaderboard.sql'), encoding='utf-8') as f:
+        migration = f.read()
+    start = migration.index(f'CREATE OR REPLACE FUNCTION {SCHEMA}.sync_player_rank_buckets()')
+    end = migration.index('$$ LANGUAGE plpgsql;', start) + len('$$ LANGUAGE plpgsql;')
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(migration[start:end])
+    conn.close()
+
+
+def writer(dsn: str, players: int, transactions: int, hold: float, rng: random.Random,
+           latencies: list, errors: list) -> None:
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute(f'SET search_path TO {SCHEMA}')
+    conn.commit()
+    for _ in range(transactions):
+        started = time.perf_counter()
+        try:
+            with conn, conn.cursor() as cur:
+                if rng.random() < NEW_PLAYER_SHARE:
+                    cur.execute(
+                        "INSERT INTO users (email, password_hash, name) VALUES (%s, '', 'Новый') RETURNING id",
+                        (f'rank-new-{time.time_ns()}-{rng.random()}@bench.local',)
+                    )
+                    cur.execute(
+                        'INSERT INTO players (user_id, points) VALUES (%s, %s)',
+                        (cur.fetchone()[0], rng.randrange(0, 20000))
+                    )
+                else:
+                    cur.execute(
+                        'UPDATE players SET points = GREATEST(points + %s, 0) WHERE id = %s',
+                        (rng.choice(POINT_DELTAS), rng.randint(1, players))
+                    )
+                if hold:
+                    cur.execute('SELECT pg_sleep(%s)', (hold,))
+        except psycopg2.Error as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dsn')
+    parser.add_argument('--players', type=int, default=20000)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--transactions', type=int, default=2000)
+    parser.add_argument('--hold-ms', type=float, default=5)
+    parser.add_argument('--global-lock', action='store_true')
+    parser.add_argument('--seed', type=float, default=0.42)
+    args = parser.parse_args()
+
+    dsn = args.dsn or start_local_postgres()
+    apply_migrations(dsn)
+    seed(dsn, args.players, args.seed)
+    if args.global_lock:
+        install_global_lock(dsn)
+
+    latencies, errors = [], []
+    per_writer = max(args.transactions // args.writers, 1)
+    threads = [
+        threading.Thread(target=writer, args=(dsn, args.players, per_writer, args.hold_ms / 1000,
+                                              random.Random(args.seed + i), latencies, errors))
+        for i in range(args.writers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute(MISMATCHES)
+        mismatches = cur.fetchone()[0]
+    conn.close()
+
+    latencies.sort()
+    report = {
+        'config': {'players': args.players, 'writers': args.writers, 'transactions': per_writer * args.writers,
+                   'hold_ms': args.hold_ms, 'global_lock': args.global_lock},
+        'seconds': round(elapsed, 2),
+        'throughput_tps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'errors': {name: errors.count(name) for name in sorted(set(errors))},
+        'rank_mismatches': mismatches
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
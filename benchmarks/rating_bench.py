@@ -0,0 +1,72 @@
+'''Замер пересчёта рейтинга Эло на синтетической истории игр.
+
+Запуск: python benchmarks/rating_bench.py [--games 500000] [--players 2000] [--team-size 5]
+Число командо-игр = 2 * games. Результат печатается в stdout в формате JSON.
+'''
+import argparse
+import importlib.util
+import json
+import os
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_rating():
+    path = os.path.join(ROOT, 'backend', 'games', 'rating.py')
+    spec = importlib.util.spec_from_file_location('rating', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_history(games: int, players: int, team_size: int, seed: int) -> tuple:
+    '''Игры в хронологическом порядке: у каждой две команды из случайных игроков без повторов'''
+    rng = np.random.default_rng(seed)
+    per_game = team_size * 2
+    # Игроки без повторов внутри игры: случайное начало и возрастающие
+    # смещения, сумма которых меньше числа игроков
+    start = rng.integers(players, size=(games, 1))
+    offsets = np.cumsum(rng.integers(1, players // per_game + 1, size=(games, per_game)), axis=1)
+    roster = (start + offsets) % players
+    entry_game = np.repeat(np.arange(games), per_game)
+    entry_side = np.tile(np.repeat([0, 1], team_size), games)
+    return entry_game, entry_side, roster.reshape(-1).astype(np.int64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=500000)
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--team-size', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rating = load_rating()
+    entry_game, entry_side, entry_player = synthetic_history(args.games, args.players, args.team_size, args.seed)
+
+    started = time.perf_counter()
+    levels = rating.schedule_levels(entry_game, entry_player, args.players)
+    scheduled = time.perf_counter()
+
+    ratings = np.full(args.players, rating.INITIAL_RATING)
+    rating.replay(entry_game, entry_side, entry_player, ratings)
+    finished = time.perf_counter()
+
+    print(json.dumps({
+        'games': args.games,
+        'team_games': args.games * 2,
+        'entries': len(entry_game),
+        'levels': int(levels.max()) + 1,
+        'schedule_seconds': round(scheduled - started, 3),
+        'replay_seconds': round(finished - started, 3),
+        'rating_mean': round(float(ratings.mean()), 3),
+        'rating_min': round(float(ratings.min()), 1),
+        'rating_max': round(float(ratings.max()), 1)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+-- Профиль игрока для каждого пользователя, у которого его ещё нет
+INSERT INTO t_p28902192_strikbal_rating_app.players (user_id, points, wins, losses)
+SELECT u.id, 0, 0, 0
+FROM t_p28902192_strikbal_rating_app.users u
+WHERE NOT EXISTS (
+    SELECT 1 FROM t_p28902192_strikbal_rating_app.players p WHERE p.user_id = u.id
+);
+
+UPDATE t_p28902192_strikbal_rating_app.players
+SET points = 0
+WHERE points IS NULL;
+
+ALTER TABLE t_p28902192_strikbal_rating_app.players
+    ALTER COLUMN points SET NOT NULL;
+
+-- Индекс для постраничной выдачи рейтинга (keyset по очкам)
+CREATE INDEX IF NOT EXISTS idx_players_points ON t_p28902192_strikbal_rating_app.players(points DESC, user_id);
@@ -0,0 +1,58 @@
+-- Гистограмма очков для быстрого расчёта места в рейтинге:
+-- место игрока = 1 + сумма player_count по корзинам с большим числом очков
+CREATE TABLE IF NOT EXISTS t_p28902192_strikbal_rating_app.player_rank_buckets (
+    points INTEGER PRIMARY KEY,
+    player_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.sync_player_rank_buckets()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Корзины обновляются в порядке возрастания очков, чтобы параллельные
+    -- транзакции брали блокировки в одном порядке
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets AS b (points, player_count)
+        SELECT points, COUNT(*) FROM new_rows GROUP BY points ORDER BY points
+        ON CONFLICT (points) DO UPDATE SET player_count = b.player_count + EXCLUDED.player_count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets AS b (points, player_count)
+        SELECT points, -COUNT(*) FROM old_rows GROUP BY points ORDER BY points
+        ON CONFLICT (points) DO UPDATE SET player_count = b.player_count + EXCLUDED.player_count;
+    ELSE
+        INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets AS b (points, player_count)
+        SELECT points, SUM(delta) FROM (
+            SELECT points, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT points, -1 AS delta FROM old_rows
+        ) d
+        GROUP BY points
+        HAVING SUM(delta) <> 0
+        ORDER BY points
+        ON CONFLICT (points) DO UPDATE SET player_count = b.player_count + EXCLUDED.player_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_players_rank_buckets_insert ON t_p28902192_strikbal_rating_app.players;
+CREATE TRIGGER trg_players_rank_buckets_insert
+    AFTER INSERT ON t_p28902192_strikbal_rating_app.players
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.sync_player_rank_buckets();
+
+DROP TRIGGER IF EXISTS trg_players_rank_buckets_update ON t_p28902192_strikbal_rating_app.players;
+CREATE TRIGGER trg_players_rank_buckets_update
+    AFTER UPDATE ON t_p28902192_strikbal_rating_app.players
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.sync_player_rank_buckets();
+
+DROP TRIGGER IF EXISTS trg_players_rank_buckets_delete ON t_p28902192_strikbal_rating_app.players;
+CREATE TRIGGER trg_players_rank_buckets_delete
+    AFTER DELETE ON t_p28902192_strikbal_rating_app.players
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.sync_player_rank_buckets();
+
+-- Начальное заполнение
+DELETE FROM t_p28902192_strikbal_rating_app.player_rank_buckets;
+INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets (points, player_count)
+SELECT points, COUNT(*) FROM t_p28902192_strikbal_rating_app.players GROUP BY points;
@@ -0,0 +1,3 @@
+-- Индексы для постраничного списка игр (новые сверху, с фильтром по статусу)
+CREATE INDEX IF NOT EXISTS idx_games_created_at ON t_p28902192_strikbal_rating_app.games(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_games_status_created_at ON t_p28902192_strikbal_rating_app.games(status, created_at DESC, id DESC);
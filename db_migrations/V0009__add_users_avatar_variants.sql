@@ -0,0 +1,3 @@
+-- Ссылки на миниатюры аватара разных размеров: {"64": url, "128": url, "256": url}
+ALTER TABLE t_p28902192_strikbal_rating_app.users
+    ADD COLUMN IF NOT EXISTS avatar_variants JSONB;
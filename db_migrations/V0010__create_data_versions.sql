@@ -0,0 +1,13 @@
+-- Счётчики версий данных для условных GET-запросов (ETag / If-None-Match).
+-- Увеличиваются в той же транзакции, что и изменение данных
+CREATE TABLE IF NOT EXISTS t_p28902192_strikbal_rating_app.data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p28902192_strikbal_rating_app.data_versions (name) VALUES
+    ('players'),
+    ('games'),
+    ('tasks')
+ON CONFLICT (name) DO NOTHING;
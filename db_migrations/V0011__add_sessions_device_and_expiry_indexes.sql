@@ -0,0 +1,20 @@
+-- Сессии привязываются к устройству: повторный вход с того же устройства
+-- обновляет существующую строку вместо создания новой
+ALTER TABLE t_p28902192_strikbal_rating_app.sessions ADD COLUMN IF NOT EXISTS device_id VARCHAR(100);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_user_device
+    ON t_p28902192_strikbal_rating_app.sessions(user_id, device_id)
+    WHERE device_id IS NOT NULL;
+
+-- Проверка токена (token = ? AND expires_at > NOW()) читается только из индекса
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_token_expires
+    ON t_p28902192_strikbal_rating_app.sessions(token) INCLUDE (expires_at, user_id);
+
+-- Дублирует индекс ограничения UNIQUE(token) и новый покрывающий индекс
+DROP INDEX IF EXISTS t_p28902192_strikbal_rating_app.idx_sessions_token;
+
+-- Для пакетной очистки истёкших сессий
+CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON t_p28902192_strikbal_rating_app.sessions(expires_at);
+
+-- Удаление уже истёкших сессий
+DELETE FROM t_p28902192_strikbal_rating_app.sessions WHERE expires_at <= NOW();
@@ -0,0 +1,8 @@
+-- Индексы для истории игрока: участие в играх (index-only по player_id -> team_id)
+-- и выполненные задачи в порядке (created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_team_players_player_team ON t_p28902192_strikbal_rating_app.team_players(player_id, team_id);
+DROP INDEX IF EXISTS t_p28902192_strikbal_rating_app.idx_team_players_player_id;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_player_completed_created
+    ON t_p28902192_strikbal_rating_app.tasks(player_id, created_at DESC, id DESC)
+    WHERE completed = true;
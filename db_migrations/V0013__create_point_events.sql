@@ -0,0 +1,49 @@
+-- Журнал изменений очков: каждая запись - изменение очков/побед/поражений игрока
+-- с причиной. Записи только добавляются; players.points/wins/losses
+-- поддерживаются триггером как сумма журнала
+CREATE TABLE IF NOT EXISTS t_p28902192_strikbal_rating_app.point_events (
+    id BIGSERIAL PRIMARY KEY,
+    player_id INTEGER NOT NULL REFERENCES t_p28902192_strikbal_rating_app.players(id),
+    reason VARCHAR(20) NOT NULL,
+    delta INTEGER NOT NULL DEFAULT 0,
+    wins_delta SMALLINT NOT NULL DEFAULT 0,
+    losses_delta SMALLINT NOT NULL DEFAULT 0,
+    points_after INTEGER NOT NULL,
+    game_id INTEGER REFERENCES t_p28902192_strikbal_rating_app.games(id) ON DELETE SET NULL,
+    task_id INTEGER REFERENCES t_p28902192_strikbal_rating_app.tasks(id) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_point_events_player_created
+    ON t_p28902192_strikbal_rating_app.point_events(player_id, created_at, id);
+
+-- Начальный остаток: текущие значения игроков, накопленные до появления журнала
+INSERT INTO t_p28902192_strikbal_rating_app.point_events
+    (player_id, reason, delta, wins_delta, losses_delta, points_after)
+SELECT id, 'opening', points, wins, losses, points
+FROM t_p28902192_strikbal_rating_app.players
+WHERE points <> 0 OR wins <> 0 OR losses <> 0;
+
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.apply_point_events()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE t_p28902192_strikbal_rating_app.players p
+    SET points = p.points + e.delta,
+        wins = p.wins + e.wins_delta,
+        losses = p.losses + e.losses_delta,
+        updated_at = NOW()
+    FROM (
+        SELECT player_id, SUM(delta) AS delta, SUM(wins_delta) AS wins_delta, SUM(losses_delta) AS losses_delta
+        FROM new_events
+        GROUP BY player_id
+    ) e
+    WHERE p.id = e.player_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_point_events_apply ON t_p28902192_strikbal_rating_app.point_events;
+CREATE TRIGGER trg_point_events_apply
+    AFTER INSERT ON t_p28902192_strikbal_rating_app.point_events
+    REFERENCING NEW TABLE AS new_events
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.apply_point_events();
@@ -0,0 +1,3 @@
+-- Рейтинг Эло игрока: пересчитывается по истории завершённых игр
+-- (полный пересчёт) и обновляется при завершении каждой игры
+ALTER TABLE t_p28902192_strikbal_rating_app.players ADD COLUMN IF NOT EXISTS rating DOUBLE PRECISION NOT NULL DEFAULT 1500;
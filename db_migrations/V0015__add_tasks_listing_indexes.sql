@@ -0,0 +1,13 @@
+-- Индексы под порядок списка задач (невыполненные сначала, новые сверху):
+-- по всем задачам и по задачам игрока, с очками и названием для index-only чтения
+CREATE INDEX IF NOT EXISTS idx_tasks_completed_created
+    ON t_p28902192_strikbal_rating_app.tasks(completed, created_at DESC, id DESC);
+
+-- Частичный индекс по выполненным задачам и индекс по player_id
+-- покрываются новым индексом по игроку
+DROP INDEX IF EXISTS t_p28902192_strikbal_rating_app.idx_tasks_player_completed_created;
+DROP INDEX IF EXISTS t_p28902192_strikbal_rating_app.idx_tasks_player_id;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_player_completed_created
+    ON t_p28902192_strikbal_rating_app.tasks(player_id, completed, created_at DESC, id DESC)
+    INCLUDE (points, name);
@@ -0,0 +1,14 @@
+-- Ключи идемпотентности (заголовок Idempotency-Key) для изменяющих запросов
+-- администраторов: повтор запроса с тем же ключом возвращает сохранённый ответ
+CREATE TABLE IF NOT EXISTS t_p28902192_strikbal_rating_app.idempotency_keys (
+    user_id INTEGER NOT NULL REFERENCES t_p28902192_strikbal_rating_app.users(id),
+    key VARCHAR(100) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    status_code SMALLINT,
+    response JSONB,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON t_p28902192_strikbal_rating_app.idempotency_keys(expires_at);
@@ -0,0 +1,6 @@
+-- Составы команд в списке игр собираются в порядке team_players.id:
+-- индекс (team_id, id) с player_id читается index-only и уже отсортирован
+CREATE INDEX IF NOT EXISTS idx_team_players_team_roster
+    ON t_p28902192_strikbal_rating_app.team_players(team_id, id) INCLUDE (player_id);
+
+DROP INDEX IF EXISTS t_p28902192_strikbal_rating_app.idx_team_players_team_id;
@@ -0,0 +1,158 @@
+-- Материализованный рейтинг: строка на игрока со всем, что отдаёт список рейтинга.
+-- Поддерживается триггерами в тех же транзакциях, что меняют players и users;
+-- место берётся из player_rank_buckets.rank, который пересчитывается вместе с корзинами
+CREATE TABLE IF NOT EXISTS t_p28902192_strikbal_rating_app.leaderboard (
+    player_id INTEGER PRIMARY KEY REFERENCES t_p28902192_strikbal_rating_app.players(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    avatar VARCHAR(500),
+    points INTEGER NOT NULL,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    rating DOUBLE PRECISION NOT NULL DEFAULT 1500
+);
+
+-- Порядок рейтинга (очки DESC, имя, id) целиком в индексе: страница и окно вокруг
+-- игрока читаются диапазоном без сортировки и без фильтрации внутри корзины очков
+CREATE INDEX IF NOT EXISTS idx_leaderboard_order
+    ON t_p28902192_strikbal_rating_app.leaderboard(points DESC, name, user_id)
+    INCLUDE (avatar, wins, losses, rating);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leaderboard_user_id
+    ON t_p28902192_strikbal_rating_app.leaderboard(user_id);
+
+-- Место для корзины очков: 1 + число игроков в корзинах с большим числом очков
+ALTER TABLE t_p28902192_strikbal_rating_app.player_rank_buckets ADD COLUMN IF NOT EXISTS rank INTEGER;
+
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.sync_player_rank_buckets()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Обновления без изменения очков (рейтинг Эло, победы) корзины не трогают
+    IF TG_OP = 'UPDATE' THEN
+        IF NOT EXISTS (
+            SELECT 1 FROM new_rows n JOIN old_rows o ON o.id = n.id WHERE n.points IS DISTINCT FROM o.points
+        ) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    -- Места пересчитываются по всем корзинам, поэтому изменения очков сериализуются:
+    -- после блокировки запросы видят корзины, зафиксированные предыдущей транзакцией
+    PERFORM pg_advisory_xact_lock(hashtext('t_p28902192_strikbal_rating_app.player_rank_buckets'));
+
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets AS b (points, player_count)
+        SELECT points, COUNT(*) FROM new_rows GROUP BY points ORDER BY points
+        ON CONFLICT (points) DO UPDATE SET player_count = b.player_count + EXCLUDED.player_count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets AS b (points, player_count)
+        SELECT points, -COUNT(*) FROM old_rows GROUP BY points ORDER BY points
+        ON CONFLICT (points) DO UPDATE SET player_count = b.player_count + EXCLUDED.player_count;
+    ELSE
+        INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets AS b (points, player_count)
+        SELECT points, SUM(delta) FROM (
+            SELECT points, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT points, -1 AS delta FROM old_rows
+        ) d
+        GROUP BY points
+        HAVING SUM(delta) <> 0
+        ORDER BY points
+        ON CONFLICT (points) DO UPDATE SET player_count = b.player_count + EXCLUDED.player_count;
+    END IF;
+
+    -- Меняются только места корзин между старыми и новыми очками
+    UPDATE t_p28902192_strikbal_rating_app.player_rank_buckets b
+    SET rank = r.rank
+    FROM (
+        SELECT points, (1 + SUM(player_count) OVER (ORDER BY points DESC) - player_count)::int as rank
+        FROM t_p28902192_strikbal_rating_app.player_rank_buckets
+    ) r
+    WHERE b.points = r.points AND b.rank IS DISTINCT FROM r.rank;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.sync_leaderboard()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO t_p28902192_strikbal_rating_app.leaderboard AS l
+        (player_id, user_id, name, avatar, points, wins, losses, rating)
+        SELECT n.id, n.user_id, u.name, u.avatar, n.points, COALESCE(n.wins, 0), COALESCE(n.losses, 0), n.rating
+        FROM new_rows n
+        JOIN t_p28902192_strikbal_rating_app.users u ON u.id = n.user_id
+        ORDER BY n.id
+        ON CONFLICT (player_id) DO UPDATE
+        SET user_id = EXCLUDED.user_id, name = EXCLUDED.name, avatar = EXCLUDED.avatar,
+            points = EXCLUDED.points, wins = EXCLUDED.wins, losses = EXCLUDED.losses, rating = EXCLUDED.rating;
+    ELSE
+        UPDATE t_p28902192_strikbal_rating_app.leaderboard l
+        SET points = n.points, wins = COALESCE(n.wins, 0), losses = COALESCE(n.losses, 0), rating = n.rating
+        FROM new_rows n
+        WHERE l.player_id = n.id
+          AND (l.points, l.wins, l.losses, l.rating)
+              IS DISTINCT FROM (n.points, COALESCE(n.wins, 0), COALESCE(n.losses, 0), n.rating);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.sync_leaderboard_users()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE t_p28902192_strikbal_rating_app.leaderboard l
+    SET name = n.name, avatar = n.avatar
+    FROM new_rows n
+    WHERE l.user_id = n.id AND (l.name, l.avatar) IS DISTINCT FROM (n.name, n.avatar);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Строки удалённых игроков удаляет ON DELETE CASCADE
+DROP TRIGGER IF EXISTS trg_players_leaderboard_insert ON t_p28902192_strikbal_rating_app.players;
+CREATE TRIGGER trg_players_leaderboard_insert
+    AFTER INSERT ON t_p28902192_strikbal_rating_app.players
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.sync_leaderboard();
+
+DROP TRIGGER IF EXISTS trg_players_leaderboard_update ON t_p28902192_strikbal_rating_app.players;
+CREATE TRIGGER trg_players_leaderboard_update
+    AFTER UPDATE ON t_p28902192_strikbal_rating_app.players
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.sync_leaderboard();
+
+DROP TRIGGER IF EXISTS trg_users_leaderboard_update ON t_p28902192_strikbal_rating_app.users;
+CREATE TRIGGER trg_users_leaderboard_update
+    AFTER UPDATE ON t_p28902192_strikbal_rating_app.users
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.sync_leaderboard_users();
+
+-- Полная пересборка корзин, мест и рейтинга из players и users: для восстановления
+-- после ручных правок и загрузок в обход триггеров. Возвращает число строк рейтинга
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.rebuild_leaderboard()
+RETURNS INTEGER AS $$
+DECLARE
+    rebuilt INTEGER;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('t_p28902192_strikbal_rating_app.player_rank_buckets'));
+
+    DELETE FROM t_p28902192_strikbal_rating_app.player_rank_buckets;
+    INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets (points, player_count, rank)
+    SELECT points, COUNT(*), (1 + SUM(COUNT(*)) OVER (ORDER BY points DESC) - COUNT(*))::int
+    FROM t_p28902192_strikbal_rating_app.players
+    GROUP BY points;
+
+    DELETE FROM t_p28902192_strikbal_rating_app.leaderboard;
+    INSERT INTO t_p28902192_strikbal_rating_app.leaderboard
+    (player_id, user_id, name, avatar, points, wins, losses, rating)
+    SELECT p.id, p.user_id, u.name, u.avatar, p.points, COALESCE(p.wins, 0), COALESCE(p.losses, 0), p.rating
+    FROM t_p28902192_strikbal_rating_app.players p
+    JOIN t_p28902192_strikbal_rating_app.users u ON u.id = p.user_id;
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Начальное заполнение
+SELECT t_p28902192_strikbal_rating_app.rebuild_leaderboard();
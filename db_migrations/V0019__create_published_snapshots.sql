@@ -0,0 +1,14 @@
+-- Опубликованные в S3 снимки публичных документов (рейтинг, активные игры).
+-- version - версия, на которую указывает указатель в бакете; previous_version - предыдущая,
+-- её документ ещё хранится для клиентов, успевших прочитать старый указатель
+CREATE TABLE IF NOT EXISTS t_p28902192_strikbal_rating_app.published_snapshots (
+    name VARCHAR(50) PRIMARY KEY,
+    version VARCHAR(100),
+    previous_version VARCHAR(100),
+    published_at TIMESTAMP
+);
+
+INSERT INTO t_p28902192_strikbal_rating_app.published_snapshots (name) VALUES
+    ('leaderboard'),
+    ('active_games')
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,9 @@
+-- Снимки публикует отдельная функция по таймеру: claimed_until - аренда публикации
+-- (вместо блокировки строки на время обращений к S3), checked_at - последняя проверка,
+-- которую указатель в бакете отдаёт клиентам как признак живых снимков
+ALTER TABLE t_p28902192_strikbal_rating_app.published_snapshots
+    ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS checked_at TIMESTAMPTZ;
+
+ALTER TABLE t_p28902192_strikbal_rating_app.published_snapshots
+    ALTER COLUMN published_at TYPE TIMESTAMPTZ;
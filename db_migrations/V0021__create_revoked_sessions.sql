@@ -0,0 +1,57 @@
+-- Журнал отзыва сессий для кэшей токенов в функциях games, players и tasks.
+-- Пишется триггерами: выход (в том числе из всех сессий), ротация и вытеснение
+-- сессии, смена прав администратора. Функции читают новые строки по id и сбрасывают
+-- свои кэши; строки старше TTL кэша удаляет очистка в login
+CREATE TABLE IF NOT EXISTS t_p28902192_strikbal_rating_app.revoked_sessions (
+    id BIGSERIAL PRIMARY KEY,
+    token VARCHAR(500),
+    user_id INTEGER,
+    revoked_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_sessions_revoked_at
+    ON t_p28902192_strikbal_rating_app.revoked_sessions(revoked_at);
+
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.revoke_sessions()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Истёкшие токены из кэша и так вытеснены: TTL кэша ограничен expires_at
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO t_p28902192_strikbal_rating_app.revoked_sessions (token)
+        SELECT o.token FROM old_rows o WHERE o.expires_at > NOW();
+    ELSE
+        INSERT INTO t_p28902192_strikbal_rating_app.revoked_sessions (token)
+        SELECT o.token FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE n.token IS DISTINCT FROM o.token AND o.expires_at > NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.revoke_user_sessions()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO t_p28902192_strikbal_rating_app.revoked_sessions (user_id)
+    SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+    WHERE n.is_admin IS DISTINCT FROM o.is_admin;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sessions_revoke_delete ON t_p28902192_strikbal_rating_app.sessions;
+CREATE TRIGGER trg_sessions_revoke_delete
+    AFTER DELETE ON t_p28902192_strikbal_rating_app.sessions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.revoke_sessions();
+
+DROP TRIGGER IF EXISTS trg_sessions_revoke_update ON t_p28902192_strikbal_rating_app.sessions;
+CREATE TRIGGER trg_sessions_revoke_update
+    AFTER UPDATE ON t_p28902192_strikbal_rating_app.sessions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.revoke_sessions();
+
+DROP TRIGGER IF EXISTS trg_users_revoke_admin ON t_p28902192_strikbal_rating_app.users;
+CREATE TRIGGER trg_users_revoke_admin
+    AFTER UPDATE ON t_p28902192_strikbal_rating_app.users
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p28902192_strikbal_rating_app.revoke_user_sessions();
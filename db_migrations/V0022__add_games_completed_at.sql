@@ -0,0 +1,13 @@
+-- Время завершения игры: пересчёт рейтинга Эло проигрывает игры в том же порядке,
+-- в каком их применяло завершение (а не в порядке создания)
+ALTER TABLE t_p28902192_strikbal_rating_app.games ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP;
+
+-- Для уже завершённых игр точного времени нет: берётся время создания,
+-- то есть прежний порядок пересчёта
+UPDATE t_p28902192_strikbal_rating_app.games
+SET completed_at = created_at
+WHERE status = 'completed' AND completed_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_games_completed_at
+    ON t_p28902192_strikbal_rating_app.games(completed_at, id)
+    WHERE status = 'completed';
@@ -0,0 +1,142 @@
+-- Места корзин очков без глобальной сериализации и без пересчёта всех корзин.
+-- Место корзины = 1 + число игроков в корзинах с большим числом очков, поэтому
+-- изменение очков сдвигает места только у корзин ниже изменённых очков:
+-- при переходе игрока из old в new (new > old) место +1 получают корзины с очками
+-- в [old, new), остальные не меняются. Сдвиги складываются, поэтому транзакции,
+-- меняющие существующие корзины, идут параллельно под разделяемой блокировкой;
+-- строки корзин диапазона блокируются по возрастанию очков, без взаимоблокировок.
+-- Эксклюзивная блокировка нужна только при создании новой корзины (её место
+-- считается суммой по корзинам выше) и при полной пересборке
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.sync_player_rank_buckets()
+RETURNS TRIGGER AS $$
+DECLARE
+    delta_points INTEGER[];
+    delta_counts INTEGER[];
+    lowest INTEGER;
+    highest INTEGER;
+    creates_buckets BOOLEAN;
+BEGIN
+    -- Изменения числа игроков по очкам; обновления без изменения очков корзины не трогают
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(points ORDER BY points), array_agg(delta ORDER BY points)
+        INTO delta_points, delta_counts
+        FROM (SELECT points, COUNT(*)::int as delta FROM new_rows GROUP BY points) d;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(points ORDER BY points), array_agg(delta ORDER BY points)
+        INTO delta_points, delta_counts
+        FROM (SELECT points, -COUNT(*)::int as delta FROM old_rows GROUP BY points) d;
+    ELSE
+        SELECT array_agg(points ORDER BY points), array_agg(delta ORDER BY points)
+        INTO delta_points, delta_counts
+        FROM (
+            SELECT points, SUM(delta)::int as delta FROM (
+                SELECT n.points, 1 AS delta FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.points IS DISTINCT FROM o.points
+                UNION ALL
+                SELECT o.points, -1 AS delta FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.points IS DISTINCT FROM o.points
+            ) moves
+            GROUP BY points
+            HAVING SUM(delta) <> 0
+        ) d;
+    END IF;
+
+    IF delta_points IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- Корзины не удаляются (и при пересборке), поэтому проверка по снимку надёжна
+    SELECT EXISTS (
+        SELECT 1 FROM unnest(delta_points, delta_counts) d(points, delta)
+        WHERE d.delta > 0 AND NOT EXISTS (
+            SELECT 1 FROM t_p28902192_strikbal_rating_app.player_rank_buckets b WHERE b.points = d.points
+        )
+    ) INTO creates_buckets;
+
+    IF creates_buckets THEN
+        PERFORM pg_advisory_xact_lock(hashtext('t_p28902192_strikbal_rating_app.player_rank_buckets'));
+    ELSE
+        PERFORM pg_advisory_xact_lock_shared(hashtext('t_p28902192_strikbal_rating_app.player_rank_buckets'));
+    END IF;
+
+    -- Сдвигаются корзины ниже самых больших изменённых очков; если число игроков
+    -- не изменилось (переходы между корзинами), то только начиная с самых малых
+    highest := delta_points[array_length(delta_points, 1)];
+    IF (SELECT SUM(delta) FROM unnest(delta_counts) delta) = 0 THEN
+        lowest := delta_points[1];
+    END IF;
+
+    PERFORM 1 FROM t_p28902192_strikbal_rating_app.player_rank_buckets
+    WHERE points <= highest AND (lowest IS NULL OR points >= lowest)
+    ORDER BY points
+    FOR UPDATE;
+
+    INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets AS b (points, player_count)
+    SELECT points, delta FROM unnest(delta_points, delta_counts) d(points, delta)
+    ORDER BY points
+    ON CONFLICT (points) DO UPDATE SET player_count = b.player_count + EXCLUDED.player_count;
+
+    -- Сдвиг места корзины - сумма изменений в корзинах с большим числом очков
+    UPDATE t_p28902192_strikbal_rating_app.player_rank_buckets b
+    SET rank = b.rank + s.shift
+    FROM (
+        SELECT c.points, SUM(d.delta)::int as shift
+        FROM t_p28902192_strikbal_rating_app.player_rank_buckets c
+        JOIN unnest(delta_points, delta_counts) d(points, delta) ON d.points > c.points
+        WHERE c.points < highest AND (lowest IS NULL OR c.points >= lowest)
+        GROUP BY c.points
+    ) s
+    WHERE b.points = s.points AND s.shift <> 0 AND b.rank IS NOT NULL;
+
+    IF creates_buckets THEN
+        UPDATE t_p28902192_strikbal_rating_app.player_rank_buckets b
+        SET rank = (1 + COALESCE((
+            SELECT SUM(a.player_count)
+            FROM t_p28902192_strikbal_rating_app.player_rank_buckets a
+            WHERE a.points > b.points
+        ), 0))::int
+        WHERE b.points = ANY(delta_points) AND b.rank IS NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Пересборка больше не удаляет корзины: опустевшие остаются с нулём игроков
+CREATE OR REPLACE FUNCTION t_p28902192_strikbal_rating_app.rebuild_leaderboard()
+RETURNS INTEGER AS $$
+DECLARE
+    rebuilt INTEGER;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('t_p28902192_strikbal_rating_app.player_rank_buckets'));
+
+    UPDATE t_p28902192_strikbal_rating_app.player_rank_buckets b
+    SET player_count = 0
+    WHERE b.player_count <> 0 AND NOT EXISTS (
+        SELECT 1 FROM t_p28902192_strikbal_rating_app.players p WHERE p.points = b.points
+    );
+
+    INSERT INTO t_p28902192_strikbal_rating_app.player_rank_buckets AS b (points, player_count)
+    SELECT points, COUNT(*) FROM t_p28902192_strikbal_rating_app.players
+    GROUP BY points
+    ORDER BY points
+    ON CONFLICT (points) DO UPDATE SET player_count = EXCLUDED.player_count
+    WHERE b.player_count IS DISTINCT FROM EXCLUDED.player_count;
+
+    UPDATE t_p28902192_strikbal_rating_app.player_rank_buckets b
+    SET rank = r.rank
+    FROM (
+        SELECT points, (1 + SUM(player_count) OVER (ORDER BY points DESC) - player_count)::int as rank
+        FROM t_p28902192_strikbal_rating_app.player_rank_buckets
+    ) r
+    WHERE b.points = r.points AND b.rank IS DISTINCT FROM r.rank;
+
+    DELETE FROM t_p28902192_strikbal_rating_app.leaderboard;
+    INSERT INTO t_p28902192_strikbal_rating_app.leaderboard
+    (player_id, user_id, name, avatar, points, wins, losses, rating)
+    SELECT p.id, p.user_id, u.name, u.avatar, p.points, COALESCE(p.wins, 0), COALESCE(p.losses, 0), p.rating
+    FROM t_p28902192_strikbal_rating_app.players p
+    JOIN t_p28902192_strikbal_rating_app.users u ON u.id = p.user_id;
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,7 @@
+-- UNIQUE(token) держал собственный индекс рядом с уникальным покрывающим
+-- idx_sessions_token_expires из V0011: каждая вставка и ротация сессии обновляла
+-- два уникальных индекса по токену. Ограничение переносится на покрывающий индекс
+-- (он переименовывается в sessions_token_key), старый индекс удаляется вместе с ограничением
+ALTER TABLE t_p28902192_strikbal_rating_app.sessions
+    DROP CONSTRAINT IF EXISTS sessions_token_key,
+    ADD CONSTRAINT sessions_token_key UNIQUE USING INDEX idx_sessions_token_expires;
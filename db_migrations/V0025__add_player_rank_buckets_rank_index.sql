@@ -0,0 +1,5 @@
+-- Поиск корзины по позиции в рейтинге (WHERE rank <= N ORDER BY rank DESC LIMIT 1):
+-- у непустых корзин места различны и убывают вместе с очками, пустые в поиске не участвуют
+CREATE INDEX IF NOT EXISTS idx_player_rank_buckets_rank
+    ON t_p28902192_strikbal_rating_app.player_rank_buckets(rank)
+    WHERE player_count > 0;
@@ -0,0 +1,4 @@
+-- Рейтинг и места с V0018 читаются из leaderboard и player_rank_buckets: индекс по
+-- players.points (V0006) не используется ни одним запросом, но обновляется при каждом
+-- начислении очков
+DROP INDEX IF EXISTS t_p28902192_strikbal_rating_app.idx_players_points;
@@ -3,6 +3,7 @@ import { toast } from 'sonner';
 import GameCreation from './admin/GameCreation';
 import GamesList from './admin/GamesList';
 import TasksSection from './admin/TasksSection';
+import { readAfterWriteHeaders } from '@/lib/readAfterWrite';
 
 type Player = {
   id: number;
@@ -14,13 +15,19 @@ type Player = {
   losses: number;
 };
 
+const GAMES_URL = 'https://functions.poehali.dev/5d6c5d79-2e2f-4d81-9cba-09e58c1435d2';
+const ACTIVE_GAMES_LIMIT = 200;
+const FINISHED_GAMES_PAGE_SIZE = 20;
+
 type AdminEventsTabProps = {
   authToken: string;
 };
 
 const AdminEventsTab = ({ authToken }: AdminEventsTabProps) => {
   const [players, setPlayers] = useState<Player[]>([]);
-  const [games, setGames] = useState<any[]>([]);
+  const [activeGames, setActiveGames] = useState<any[]>([]);
+  const [finishedGames, setFinishedGames] = useState<any[]>([]);
+  const [finishedCursor, setFinishedCursor] = useState<string | null>(null);
   const [tasks, setTasks] = useState<any[]>([]);
 
   useEffect(() => {
@@ -34,6 +41,7 @@ const AdminEventsTab = ({ authToken }: AdminEventsTabProps) => {
       const url = `https://functions.poehali.dev/6013caed-cf4a-4a7f-8f68-0cc2d40ca477${authToken ? `?token=${authToken}` : ''}`;
       const response = await fetch(url, {
         method: 'GET',
+        headers: readAfterWriteHeaders(),
       });
       
       if (!response.ok) {
@@ -51,22 +59,51 @@ const AdminEventsTab = ({ authToken }: AdminEventsTabProps) => {
     }
   };
 
+  const fetchGames = async (params: string) => {
+    const response = await fetch(`${GAMES_URL}?${params}${authToken ? `&token=${authToken}` : ''}`, {
+      method: 'GET',
+      headers: readAfterWriteHeaders(),
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));
+      toast.error(`Ошибка: ${errorData.error || response.status}`);
+      return null;
+    }
+
+    return (await response.json()) as { games: any[]; nextCursor: string | null };
+  };
+
+  // Активные игры целиком, завершённые - постранично от новых к старым
   const loadGames = async () => {
     try {
-      const url = `https://functions.poehali.dev/5d6c5d79-2e2f-4d81-9cba-09e58c1435d2${authToken ? `?token=${authToken}` : ''}`;
-      const response = await fetch(url, {
-        method: 'GET',
-      });
-      
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));
-        toast.error(`Ошибка: ${errorData.error || response.status}`);
-        return;
+      const [active, finished] = await Promise.all([
+        fetchGames(`status=active&limit=${ACTIVE_GAMES_LIMIT}`),
+        fetchGames(`status=completed&limit=${FINISHED_GAMES_PAGE_SIZE}`),
+      ]);
+      if (active) {
+        setActiveGames(active.games);
       }
-      
-      const data = await response.json();
-      if (data.games) {
-        setGames(data.games);
+      if (finished) {
+        setFinishedGames(finished.games);
+        setFinishedCursor(finished.nextCursor);
+      }
+    } catch (error) {
+      toast.error('Ошибка загрузки игр');
+    }
+  };
+
+  const loadMoreFinishedGames = async () => {
+    if (!finishedCursor) {
+      return;
+    }
+    try {
+      const page = await fetchGames(
+        `status=completed&limit=${FINISHED_GAMES_PAGE_SIZE}&after=${encodeURIComponent(finishedCursor)}`
+      );
+      if (page) {
+        setFinishedGames((prev) => [...prev, ...page.games]);
+        setFinishedCursor(page.nextCursor);
       }
     } catch (error) {
       toast.error('Ошибка загрузки игр');
@@ -78,6 +115,7 @@ const AdminEventsTab = ({ authToken }: AdminEventsTabProps) => {
       const url = `https://functions.poehali.dev/f3163ce6-2de5-435f-989d-d7026066ddb1${authToken ? `?token=${authToken}` : ''}`;
       const response = await fetch(url, {
         method: 'GET',
+        headers: readAfterWriteHeaders(),
       });
       
       if (!response.ok) {
@@ -118,9 +156,11 @@ const AdminEventsTab = ({ authToken }: AdminEventsTabProps) => {
       />
       
       <GamesList 
-        games={games} 
+        games={[...activeGames, ...finishedGames]} 
         authToken={authToken} 
         onGameFinished={handleGameFinished} 
+        hasMoreFinished={finishedCursor !== null}
+        onLoadMoreFinished={loadMoreFinishedGames}
       />
       
       <TasksSection 
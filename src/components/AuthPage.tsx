@@ -6,6 +6,16 @@ import { Label } from '@/components/ui/label';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import Icon from '@/components/ui/icon';
 import { toast } from 'sonner';
+import { rememberWrite } from '@/lib/readAfterWrite';
+
+const getDeviceId = () => {
+  let deviceId = localStorage.getItem('device_id');
+  if (!deviceId) {
+    deviceId = crypto.randomUUID();
+    localStorage.setItem('device_id', deviceId);
+  }
+  return deviceId;
+};
 
 type AuthPageProps = {
   onLogin: (token: string, user: any) => void;
@@ -27,8 +37,9 @@ const AuthPage = ({ onLogin }: AuthPageProps) => {
       const response = await fetch('https://functions.poehali.dev/b05d5b98-3bbb-43f8-92aa-03bc3c2e32ef', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ email: loginEmail, password: loginPassword }),
+        body: JSON.stringify({ email: loginEmail, password: loginPassword, deviceId: getDeviceId() }),
       });
+      rememberWrite(response);
 
       const data = await response.json();
 
@@ -62,6 +73,7 @@ const AuthPage = ({ onLogin }: AuthPageProps) => {
           name: registerName,
         }),
       });
+      rememberWrite(response);
 
       const data = await response.json();
 
@@ -4,14 +4,17 @@ import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar';
 import { Badge } from '@/components/ui/badge';
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
 import Icon from '@/components/ui/icon';
+import { Button } from '@/components/ui/button';
 import { Player, getRankIcon, getRankTitle } from './types';
 import PlayerProfileView from './PlayerProfileView';
 
 type LeaderboardTabProps = {
   players: Player[];
+  hasMore?: boolean;
+  onLoadMore?: () => void;
 };
 
-const LeaderboardTab = ({ players }: LeaderboardTabProps) => {
+const LeaderboardTab = ({ players, hasMore, onLoadMore }: LeaderboardTabProps) => {
   const sortedPlayers = [...players].sort((a, b) => b.points - a.points);
   const [selectedPlayerId, setSelectedPlayerId] = useState<string | null>(null);
 
@@ -130,6 +133,13 @@ const LeaderboardTab = ({ players }: LeaderboardTabProps) => {
             ))}
           </TableBody>
         </Table>
+        {hasMore && onLoadMore && (
+          <div className="flex justify-center mt-4">
+            <Button variant="outline" onClick={onLoadMore} className="text-xs md:text-base">
+              Показать ещё
+            </Button>
+          </div>
+        )}
       </CardContent>
     </Card>
   );
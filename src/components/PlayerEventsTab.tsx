@@ -5,6 +5,11 @@ import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar';
 import { Separator } from '@/components/ui/separator';
 import Icon from '@/components/ui/icon';
 import { toast } from 'sonner';
+import { readAfterWriteHeaders } from '@/lib/readAfterWrite';
+import { fetchSnapshot } from '@/lib/snapshots';
+
+// Активных игр немного: одна страница максимального размера API
+const ACTIVE_GAMES_LIMIT = 200;
 
 type PlayerEventsTabProps = {
   authToken: string;
@@ -23,19 +28,23 @@ const PlayerEventsTab = ({ authToken, currentUserId }: PlayerEventsTabProps) =>
 
   const loadGames = async () => {
     try {
-      const response = await fetch('https://functions.poehali.dev/5d6c5d79-2e2f-4d81-9cba-09e58c1435d2', {
-        method: 'GET',
-        headers: {
-          'X-Authorization': `Bearer ${authToken}`,
-          'Content-Type': 'application/json',
-        },
-      });
+      let data = await fetchSnapshot<{ games: any[] }>('active_games');
+      if (!data) {
+        const response = await fetch(`https://functions.poehali.dev/5d6c5d79-2e2f-4d81-9cba-09e58c1435d2?status=active&limit=${ACTIVE_GAMES_LIMIT}`, {
+          method: 'GET',
+          headers: {
+            ...readAfterWriteHeaders(),
+            'X-Authorization': `Bearer ${authToken}`,
+            'Content-Type': 'application/json',
+          },
+        });
 
-      if (!response.ok) {
-        return;
-      }
+        if (!response.ok) {
+          return;
+        }
 
-      const data = await response.json();
+        data = (await response.json()) as { games: any[] };
+      }
       if (data.games) {
         const myGames = data.games.filter((game: any) => 
           game.status === 'active' && 
@@ -52,9 +61,10 @@ const PlayerEventsTab = ({ authToken, currentUserId }: PlayerEventsTabProps) =>
 
   const loadTasks = async () => {
     try {
-      const response = await fetch('https://functions.poehali.dev/f3163ce6-2de5-435f-989d-d7026066ddb1', {
+      const response = await fetch('https://functions.poehali.dev/f3163ce6-2de5-435f-989d-d7026066ddb1?mine=1&completed=false', {
         method: 'GET',
         headers: {
+          ...readAfterWriteHeaders(),
           'X-Authorization': `Bearer ${authToken}`,
           'Content-Type': 'application/json',
         },
@@ -66,10 +76,7 @@ const PlayerEventsTab = ({ authToken, currentUserId }: PlayerEventsTabProps) =>
 
       const data = await response.json();
       if (data.tasks) {
-        const myTasks = data.tasks.filter((task: any) => 
-          task.player_id === currentUserId && !task.completed
-        );
-        setTasks(myTasks);
+        setTasks(data.tasks);
       }
     } catch (error) {
       console.error('Ошибка загрузки задач:', error);
@@ -6,6 +6,7 @@ import { Button } from '@/components/ui/button';
 import { Separator } from '@/components/ui/separator';
 import Icon from '@/components/ui/icon';
 import { getRankIcon, getRankTitle } from './types';
+import { readAfterWriteHeaders } from '@/lib/readAfterWrite';
 
 type PlayerProfileData = {
   id: string;
@@ -30,6 +31,10 @@ type PlayerProfileData = {
     team_color: string;
     won: boolean;
   }>;
+  games_count: number;
+  games_cursor: string | null;
+  completed_tasks_count: number;
+  completed_tasks_cursor: string | null;
 };
 
 type PlayerProfileViewProps = {
@@ -47,6 +52,7 @@ const PlayerProfileView = ({ playerId, onClose }: PlayerProfileViewProps) => {
         const url = `https://functions.poehali.dev/6013caed-cf4a-4a7f-8f68-0cc2d40ca477?action=player&id=${playerId}`;
         const response = await fetch(url, {
           method: 'GET',
+          headers: readAfterWriteHeaders(),
         });
 
         if (response.ok) {
@@ -63,6 +69,26 @@ const PlayerProfileView = ({ playerId, onClose }: PlayerProfileViewProps) => {
     fetchPlayerProfile();
   }, [playerId]);
 
+  const loadMoreHistory = async (kind: 'games' | 'tasks') => {
+    if (!profileData) return;
+    const cursor = kind === 'games' ? profileData.games_cursor : profileData.completed_tasks_cursor;
+    if (!cursor) return;
+
+    try {
+      const action = kind === 'games' ? 'player_games' : 'player_tasks';
+      const url = `https://functions.poehali.dev/6013caed-cf4a-4a7f-8f68-0cc2d40ca477?action=${action}&id=${playerId}&after=${encodeURIComponent(cursor)}`;
+      const response = await fetch(url, { headers: readAfterWriteHeaders() });
+      if (!response.ok) return;
+
+      const data = await response.json();
+      setProfileData((prev) => prev && (kind === 'games'
+        ? { ...prev, games_history: [...prev.games_history, ...data.games], games_cursor: data.nextCursor }
+        : { ...prev, completed_tasks: [...prev.completed_tasks, ...data.tasks], completed_tasks_cursor: data.nextCursor }));
+    } catch (error) {
+      console.error('Ошибка загрузки истории:', error);
+    }
+  };
+
   if (loading) {
     return (
       <Card>
@@ -245,6 +271,11 @@ const PlayerProfileView = ({ playerId, onClose }: PlayerProfileViewProps) => {
                   </Card>
                 ))}
               </div>
+              {profileData.games_cursor && (
+                <Button variant="outline" className="w-full" onClick={() => loadMoreHistory('games')}>
+                  Показать ещё
+                </Button>
+              )}
             </div>
             <Separator />
           </>
@@ -279,6 +310,11 @@ const PlayerProfileView = ({ playerId, onClose }: PlayerProfileViewProps) => {
                   </Card>
                 ))}
               </div>
+              {profileData.completed_tasks_cursor && (
+                <Button variant="outline" className="w-full" onClick={() => loadMoreHistory('tasks')}>
+                  Показать ещё
+                </Button>
+              )}
             </div>
           </>
         )}
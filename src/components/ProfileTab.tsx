@@ -8,6 +8,7 @@ import { Input } from '@/components/ui/input';
 import { Separator } from '@/components/ui/separator';
 import Icon from '@/components/ui/icon';
 import { Player, getRankIcon, getRankTitle } from './types';
+import { readAfterWriteHeaders, rememberWrite } from '@/lib/readAfterWrite';
 
 type ProfileTabProps = {
   currentPlayer: Player;
@@ -37,6 +38,10 @@ type ProfileData = {
     team_color: string;
     won: boolean;
   }>;
+  games_count: number;
+  games_cursor: string | null;
+  completed_tasks_count: number;
+  completed_tasks_cursor: string | null;
 };
 
 const ProfileTab = ({ currentPlayer }: ProfileTabProps) => {
@@ -59,6 +64,7 @@ const ProfileTab = ({ currentPlayer }: ProfileTabProps) => {
       const url = `https://functions.poehali.dev/6013caed-cf4a-4a7f-8f68-0cc2d40ca477?action=profile${token ? `&token=${token}` : ''}`;
       const response = await fetch(url, {
         method: 'GET',
+        headers: readAfterWriteHeaders(),
       });
 
       if (response.ok) {
@@ -73,6 +79,26 @@ const ProfileTab = ({ currentPlayer }: ProfileTabProps) => {
     }
   };
 
+  const loadMoreHistory = async (kind: 'games' | 'tasks') => {
+    if (!profileData) return;
+    const cursor = kind === 'games' ? profileData.games_cursor : profileData.completed_tasks_cursor;
+    if (!cursor) return;
+
+    try {
+      const action = kind === 'games' ? 'player_games' : 'player_tasks';
+      const url = `https://functions.poehali.dev/6013caed-cf4a-4a7f-8f68-0cc2d40ca477?action=${action}&id=${profileData.id}&after=${encodeURIComponent(cursor)}`;
+      const response = await fetch(url, { headers: readAfterWriteHeaders() });
+      if (!response.ok) return;
+
+      const data = await response.json();
+      setProfileData((prev) => prev && (kind === 'games'
+        ? { ...prev, games_history: [...prev.games_history, ...data.games], games_cursor: data.nextCursor }
+        : { ...prev, completed_tasks: [...prev.completed_tasks, ...data.tasks], completed_tasks_cursor: data.nextCursor }));
+    } catch (error) {
+      console.error('Ошибка загрузки истории:', error);
+    }
+  };
+
   useEffect(() => {
     fetchProfile();
   }, []);
@@ -113,6 +139,7 @@ const ProfileTab = ({ currentPlayer }: ProfileTabProps) => {
             avatar_base64: base64,
           }),
         });
+        rememberWrite(response);
 
         console.log('Ответ сервера:', response.status);
 
@@ -362,6 +389,11 @@ const ProfileTab = ({ currentPlayer }: ProfileTabProps) => {
                   </Card>
                 ))}
               </div>
+              {profileData.games_cursor && (
+                <Button variant="outline" className="w-full" onClick={() => loadMoreHistory('games')}>
+                  Показать ещё
+                </Button>
+              )}
             </div>
             <Separator />
           </>
@@ -396,6 +428,11 @@ const ProfileTab = ({ currentPlayer }: ProfileTabProps) => {
                   </Card>
                 ))}
               </div>
+              {profileData.completed_tasks_cursor && (
+                <Button variant="outline" className="w-full" onClick={() => loadMoreHistory('tasks')}>
+                  Показать ещё
+                </Button>
+              )}
             </div>
             <Separator />
           </>
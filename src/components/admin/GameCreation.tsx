@@ -8,6 +8,7 @@ import { Separator } from '@/components/ui/separator';
 import { Checkbox } from '@/components/ui/checkbox';
 import Icon from '@/components/ui/icon';
 import { toast } from 'sonner';
+import { rememberWrite } from '@/lib/readAfterWrite';
 
 type Player = {
   id: number;
@@ -101,6 +102,7 @@ const GameCreation = ({ players, authToken, onGameCreated }: GameCreationProps)
         },
         body: JSON.stringify({ name: newGameName, teams }),
       });
+      rememberWrite(response);
 
       if (response.ok) {
         toast.success('Игра создана');
@@ -6,14 +6,17 @@ import { Separator } from '@/components/ui/separator';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import Icon from '@/components/ui/icon';
 import { toast } from 'sonner';
+import { rememberWrite } from '@/lib/readAfterWrite';
 
 type GamesListProps = {
   games: any[];
   authToken: string;
   onGameFinished: () => void;
+  hasMoreFinished?: boolean;
+  onLoadMoreFinished?: () => void;
 };
 
-const GamesList = ({ games, authToken, onGameFinished }: GamesListProps) => {
+const GamesList = ({ games, authToken, onGameFinished, hasMoreFinished, onLoadMoreFinished }: GamesListProps) => {
   const [loading, setLoading] = useState(false);
   const [deletingGameId, setDeletingGameId] = useState<number | null>(null);
 
@@ -25,9 +28,11 @@ const GamesList = ({ games, authToken, onGameFinished }: GamesListProps) => {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': `finish-game-${gameId}`,
         },
         body: JSON.stringify({ gameId, winnerTeamId }),
       });
+      rememberWrite(response);
 
       if (response.ok) {
         toast.success('Игра завершена! Очки распределены');
@@ -54,6 +59,7 @@ const GamesList = ({ games, authToken, onGameFinished }: GamesListProps) => {
       const response = await fetch(url, {
         method: 'DELETE',
       });
+      rememberWrite(response);
 
       if (response.ok) {
         toast.success('Игра удалена');
@@ -223,6 +229,13 @@ const GamesList = ({ games, authToken, onGameFinished }: GamesListProps) => {
                   </Card>
                 );
               })}
+              {hasMoreFinished && onLoadMoreFinished && (
+                <div className="flex justify-center">
+                  <Button variant="outline" onClick={onLoadMoreFinished}>
+                    Показать ещё
+                  </Button>
+                </div>
+              )}
             </div>
           </>
         )}
@@ -8,6 +8,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@
 import { Separator } from '@/components/ui/separator';
 import Icon from '@/components/ui/icon';
 import { toast } from 'sonner';
+import { rememberWrite } from '@/lib/readAfterWrite';
 
 type Player = {
   id: number;
@@ -53,6 +54,7 @@ const TasksSection = ({ tasks, players, authToken, onTaskCreated }: TasksSection
           playerId: parseInt(selectedPlayerId),
         }),
       });
+      rememberWrite(response);
 
       if (response.ok) {
         toast.success('Задача создана');
@@ -79,9 +81,11 @@ const TasksSection = ({ tasks, players, authToken, onTaskCreated }: TasksSection
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': `complete-task-${taskId}`,
         },
         body: JSON.stringify({ taskId }),
       });
+      rememberWrite(response);
 
       if (response.ok) {
         toast.success('Задача выполнена, очки начислены');
@@ -108,6 +112,7 @@ const TasksSection = ({ tasks, players, authToken, onTaskCreated }: TasksSection
       const response = await fetch(url, {
         method: 'DELETE',
       });
+      rememberWrite(response);
 
       if (response.ok) {
         toast.success('Задача удалена');
@@ -0,0 +1,18 @@
+const HEADER = 'X-Read-After-Write';
+const STORAGE_KEY = 'read_after_write';
+
+// Ответ на запись содержит метку: пока она действует, чтения идут с основной базы, а не с реплики
+export function rememberWrite(response: Response) {
+  const until = response.headers.get(HEADER);
+  if (until) {
+    localStorage.setItem(STORAGE_KEY, until);
+  }
+}
+
+export function readAfterWriteHeaders(): Record<string, string> {
+  const until = localStorage.getItem(STORAGE_KEY);
+  if (!until || Number(until) * 1000 <= Date.now()) {
+    return {};
+  }
+  return { [HEADER]: until };
+}
@@ -0,0 +1,39 @@
+import { readAfterWriteHeaders } from '@/lib/readAfterWrite';
+
+const SNAPSHOTS_URL = import.meta.env.VITE_SNAPSHOTS_URL;
+// Функция публикации обновляет checkedAt не реже раза в пару минут; более старый указатель
+// значит, что публикация остановилась и снимок может отставать от данных
+const MAX_POINTER_AGE_MS = 10 * 60 * 1000;
+
+type SnapshotPointer = {
+  version: string;
+  key: string;
+  publishedAt: string;
+  checkedAt: string;
+};
+
+// Публичные снимки (рейтинг, активные игры) лежат в бакете за CDN: сначала читается
+// указатель на последнюю версию, затем неизменяемый документ этой версии.
+// null - снимки не настроены, недоступны, устарели или только что была своя запись: тогда данные берутся из API
+export async function fetchSnapshot<T>(name: 'leaderboard' | 'active_games'): Promise<T | null> {
+  if (!SNAPSHOTS_URL || Object.keys(readAfterWriteHeaders()).length > 0) {
+    return null;
+  }
+  try {
+    const pointerResponse = await fetch(`${SNAPSHOTS_URL}/snapshots/${name}.json`, { cache: 'no-cache' });
+    if (!pointerResponse.ok) {
+      return null;
+    }
+    const pointer: SnapshotPointer = await pointerResponse.json();
+    if (!(Date.now() - Date.parse(pointer.checkedAt) <= MAX_POINTER_AGE_MS)) {
+      return null;
+    }
+    const response = await fetch(`${SNAPSHOTS_URL}/${pointer.key}`);
+    if (!response.ok) {
+      return null;
+    }
+    return await response.json();
+  } catch {
+    return null;
+  }
+}
@@ -11,6 +11,10 @@ import ProfileTab from '@/components/ProfileTab';
 import AuthPage from '@/components/AuthPage';
 import AdminEventsTab from '@/components/AdminEventsTab';
 import PlayerEventsTab from '@/components/PlayerEventsTab';
+import { readAfterWriteHeaders } from '@/lib/readAfterWrite';
+import { fetchSnapshot } from '@/lib/snapshots';
+
+const LEADERBOARD_PAGE_SIZE = 50;
 
 const Index = () => {
   const [isAuthenticated, setIsAuthenticated] = useState(false);
@@ -19,6 +23,7 @@ const Index = () => {
   const [isAdmin, setIsAdmin] = useState(false);
   const [activeTab, setActiveTab] = useState('leaderboard');
   const [players, setPlayers] = useState<Player[]>([]);
+  const [playersCursor, setPlayersCursor] = useState<string | null>(null);
   const [games, setGames] = useState<Game[]>([]);
   const [tasks, setTasks] = useState<Task[]>([]);
   const [currentPlayer, setCurrentPlayer] = useState<Player | null>(null);
@@ -54,22 +59,27 @@ const Index = () => {
     }
   }, []);
 
-  const loadPlayers = async (token?: string) => {
+  const loadPlayers = async (token?: string, after?: string) => {
     try {
       console.log('Загрузка игроков...');
-      const response = await fetch('https://functions.poehali.dev/6013caed-cf4a-4a7f-8f68-0cc2d40ca477', {
-        method: 'GET',
-      });
-      
-      console.log('Ответ получен:', response.status);
-      
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));
-        console.error('Backend error:', response.status, errorData);
-        return;
+      let data = after ? null : await fetchSnapshot<{ players: any[]; nextCursor?: string | null }>('leaderboard');
+      if (!data) {
+        const params = `limit=${LEADERBOARD_PAGE_SIZE}${after ? `&after=${encodeURIComponent(after)}` : ''}`;
+        const response = await fetch(`https://functions.poehali.dev/6013caed-cf4a-4a7f-8f68-0cc2d40ca477?${params}`, {
+          method: 'GET',
+          headers: readAfterWriteHeaders(),
+        });
+
+        console.log('Ответ получен:', response.status);
+
+        if (!response.ok) {
+          const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));
+          console.error('Backend error:', response.status, errorData);
+          return;
+        }
+
+        data = (await response.json()) as { players: any[]; nextCursor?: string | null };
       }
-      
-      const data = await response.json();
       console.log('Данные получены:', data);
       if (data.players) {
         const formattedPlayers: Player[] = data.players.map((p: any) => ({
@@ -80,7 +90,8 @@ const Index = () => {
           wins: p.wins,
           losses: p.losses,
         }));
-        setPlayers(formattedPlayers);
+        setPlayers(prevPlayers => (after ? [...prevPlayers, ...formattedPlayers] : formattedPlayers));
+        setPlayersCursor(data.nextCursor ?? null);
       }
     } catch (error) {
       console.error('Ошибка загрузки игроков:', error);
@@ -106,6 +117,12 @@ const Index = () => {
   };
 
   const handleLogout = () => {
+    if (authToken) {
+      fetch('https://functions.poehali.dev/b05d5b98-3bbb-43f8-92aa-03bc3c2e32ef?action=logout', {
+        method: 'POST',
+        headers: { 'X-Authorization': authToken },
+      }).catch(() => {});
+    }
     localStorage.removeItem('auth_token');
     localStorage.removeItem('user');
     setAuthToken(null);
@@ -282,7 +299,11 @@ const Index = () => {
           </TabsList>
 
           <TabsContent value="leaderboard" className="space-y-6">
-            <LeaderboardTab players={players} />
+            <LeaderboardTab
+              players={players}
+              hasMore={playersCursor !== null}
+              onLoadMore={() => playersCursor && loadPlayers(authToken ?? undefined, playersCursor)}
+            />
           </TabsContent>
 
           <TabsContent value="events" className="space-y-6">
@@ -1 +1,6 @@
 /// <reference types="vite/client" />
+
+interface ImportMetaEnv {
+  // Адрес бакета за CDN со снимками рейтинга и активных игр, например https://cdn.poehali.dev/projects/<key>/bucket
+  readonly VITE_SNAPSHOTS_URL?: string;
+}
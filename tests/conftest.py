@@ -0,0 +1,138 @@
+'''Общие фикстуры: временный Postgres (как в benchmarks/load_harness.py) и вызов функций backend/.
+
+Кластер поднимается один раз на прогон; каждому набору тестов - своя база с миграциями.
+Готовый сервер можно передать через TEST_DATABASE_URL (нужны права на CREATE DATABASE).
+
+Запуск:
+    python -m pytest tests
+'''
+import base64
+import gzip
+import importlib
+import itertools
+import json
+import os
+import sys
+
+import brotli
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from load_harness import BACKEND, FUNCTIONS, SCHEMA, apply_migrations, event, start_local_postgres  # noqa: E402
+
+# Журнал вызовов и S3 в тестах не нужны
+os.environ['METRICS_SAMPLE_RATE'] = '0'
+os.environ['METRICS_SLOW_MS'] = 'inf'
+os.environ.pop('AWS_ACCESS_KEY_ID', None)
+os.environ.pop('AWS_SECRET_ACCESS_KEY', None)
+os.environ['S3_ENDPOINT'] = 'http://127.0.0.1:9'
+
+PASSWORD = 'test-password'
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def cluster() -> str:
+    return os.environ.get('TEST_DATABASE_URL') or start_local_postgres()
+
+
+def create_database(cluster: str, name: str) -> str:
+    '''Пустая база name с применёнными миграциями; search_path указывает на схему приложения'''
+    conn = psycopg2.connect(cluster)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS {name}')
+        cur.execute(f'CREATE DATABASE {name}')
+    conn.close()
+    dsn = psycopg2.extensions.make_dsn(cluster, dbname=name, options=f'-csearch_path={SCHEMA}')
+    apply_migrations(dsn)
+    return dsn
+
+
+class Functions:
+    '''Функции backend/, каждая со своими копиями общих модулей (db, core, auth, ...)'''
+
+    def __init__(self):
+        self.modules = {}
+        for name in FUNCTIONS:
+            directory = os.path.join(BACKEND, name)
+            local = {f[:-3] for f in os.listdir(directory) if f.endswith('.py')}
+            for module in local:
+                sys.modules.pop(module, None)
+            sys.path.insert(0, directory)
+            try:
+                importlib.import_module('index')
+                self.modules[name] = {module: sys.modules[module] for module in local if module in sys.modules}
+            finally:
+                sys.path.remove(directory)
+                for module in local:
+                    sys.modules.pop(module, None)
+
+    def call(self, function: str, method: str, token: str = '', query: dict = None, body=None,
+             headers: dict = None) -> tuple:
+        '''(статус, разобранное тело, заголовки ответа)'''
+        response = self.modules[function]['index'].handler(event(method, token, query, body, headers), None)
+        raw = response.get('body') or ''
+        if response.get('isBase64Encoded'):
+            data = base64.b64decode(raw)
+            encoding = response['headers'].get('Content-Encoding')
+            raw = (brotli.decompress(data) if encoding == 'br' else gzip.decompress(data)).decode()
+        return response['statusCode'], json.loads(raw) if raw else None, response['headers']
+
+    def register(self, name: str = 'Игрок') -> dict:
+        '''Новый пользователь: {'userId', 'playerId', 'token'}'''
+        email = f'user{next(_emails)}@test.local'
+        status, body, _ = self.call('register', 'POST', body={'email': email, 'password': PASSWORD, 'name': name})
+        assert status == 201, body
+        return {'userId': body['user']['id'], 'playerId': body['user']['playerId'], 'email': email,
+                'token': self.login(email)}
+
+    def login(self, email: str, **extra) -> str:
+        status, body, _ = self.call('login', 'POST', body={'email': email, 'password': PASSWORD, **extra})
+        assert status == 200, body
+        return body['token']
+
+
+@pytest.fixture(scope='session')
+def dsn(cluster) -> str:
+    '''База поведенческих тестов; функции подключаются к ней через DATABASE_URL'''
+    dsn = create_database(cluster, 'strikbal_test')
+    previous = os.environ.get('DATABASE_URL')
+    os.environ['DATABASE_URL'] = dsn
+    yield dsn
+    if previous is None:
+        os.environ.pop('DATABASE_URL', None)
+    else:
+        os.environ['DATABASE_URL'] = previous
+
+
+@pytest.fixture(scope='session')
+def functions(dsn) -> Functions:
+    return Functions()
+
+
+@pytest.fixture
+def db(dsn):
+    '''Соединение для проверок и подготовки данных (autocommit)'''
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        yield cur
+    conn.close()
+
+
+@pytest.fixture(scope='session')
+def admin(functions, dsn) -> dict:
+    user = functions.register('Администратор')
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute('UPDATE users SET is_admin = TRUE WHERE id = %s', (user['userId'],))
+    conn.close()
+    user['token'] = functions.login(user['email'])
+    return user
@@ -0,0 +1,287 @@
+'''Поведение функций на живой базе: идемпотентность, keyset-курсоры, журнал очков,
+отзыв сессий и пересчёт рейтинга Эло'''
+import threading
+import time
+
+import psycopg2
+import pytest
+from psycopg2.extras import RealDictCursor
+
+from rank_contention import MISMATCHES
+
+
+def create_games(functions, admin, db, rosters: list) -> list:
+    '''Игры из [(победители, проигравшие)]: [(ID игры, команда победителей, команда проигравших)]'''
+    games = [
+        {'name': f'Игра {i}', 'teams': [
+            {'name': 'Красные', 'color': '#EF4444', 'players': winners},
+            {'name': 'Синие', 'color': '#0EA5E9', 'players': losers}
+        ]}
+        for i, (winners, losers) in enumerate(rosters)
+    ]
+    status, body, _ = functions.call('games', 'POST', admin['token'], body={'games': games})
+    assert status == 201, body
+    created = []
+    for game in body['games']:
+        db.execute('SELECT id FROM teams WHERE game_id = %s ORDER BY id', (game['id'],))
+        winner_team_id, loser_team_id = [row[0] for row in db.fetchall()]
+        created.append((game['id'], winner_team_id, loser_team_id))
+    return created
+
+
+def player_points(db, player_ids: list) -> dict:
+    db.execute('SELECT id, points FROM players WHERE id = ANY(%s)', (player_ids,))
+    return dict(db.fetchall())
+
+
+def read_pages(functions, function: str, token: str, key: str, query: dict) -> list:
+    '''Все страницы списка по nextCursor'''
+    items, after = [], None
+    while True:
+        status, body, _ = functions.call(function, 'GET', token, {**query, **({'after': after} if after else {})})
+        assert status == 200, body
+        items.extend(body[key])
+        after = body['nextCursor']
+        if not after:
+            return items
+
+
+def test_finalize_replays_same_key_and_rejects_other_body(functions, admin, db):
+    players = [functions.register()['playerId'] for _ in range(4)]
+    (game_id, winner_team_id, loser_team_id), = create_games(functions, admin, db, [(players[:2], players[2:])])
+    headers = {'Idempotency-Key': f'finish-game-{game_id}'}
+    body = {'gameId': game_id, 'winnerTeamId': winner_team_id}
+
+    status, first, first_headers = functions.call('games', 'PUT', admin['token'], body=body, headers=headers)
+    assert status == 200, first
+    assert 'Idempotent-Replayed' not in first_headers
+    points = player_points(db, players)
+
+    status, again, again_headers = functions.call('games', 'PUT', admin['token'], body=body, headers=headers)
+    assert status == 200
+    assert again == first
+    assert again_headers['Idempotent-Replayed'] == 'true'
+    assert player_points(db, players) == points
+
+    status, other, _ = functions.call('games', 'PUT', admin['token'], headers=headers,
+                                      body={'gameId': game_id, 'winnerTeamId': loser_team_id})
+    assert status == 422, other
+    assert player_points(db, players) == points
+
+
+def test_task_replay_does_not_award_twice(functions, admin, db):
+    player_id = functions.register()['playerId']
+    status, created, _ = functions.call('tasks', 'POST', admin['token'],
+                                        body={'name': 'Разведка', 'points': 70, 'playerId': player_id})
+    assert status == 201, created
+    headers = {'Idempotency-Key': f'task-{created["task"]["id"]}'}
+
+    for _ in range(2):
+        status, body, _ = functions.call('tasks', 'PUT', admin['token'], headers=headers,
+                                         body={'taskId': created['task']['id']})
+        assert status == 200, body
+    assert player_points(db, [player_id]) == {player_id: 70}
+
+
+def test_unknown_players_are_rejected(functions, admin):
+    player_id = functions.register()['playerId']
+    status, body, _ = functions.call('games', 'POST', admin['token'], body={'name': 'Игра', 'teams': [
+        {'name': 'Красные', 'color': '#EF4444', 'players': [player_id]},
+        {'name': 'Синие', 'color': '#0EA5E9', 'players': [999999, 999998]}
+    ]})
+    assert status == 400
+    assert body['error'] == 'Игроки не найдены: 999998, 999999'
+
+
+def test_games_pages_cover_list_once(functions, admin, db):
+    players = [functions.register()['playerId'] for _ in range(2)]
+    # Игры одного запроса получают одинаковое created_at: порядок внутри решает id
+    create_games(functions, admin, db, [([players[0]], [players[1]])] * 7)
+
+    status, full, _ = functions.call('games', 'GET', admin['token'], {'limit': '500'})
+    assert status == 200
+    paged = read_pages(functions, 'games', admin['token'], 'games', {'limit': '3'})
+    assert [game['id'] for game in paged] == [game['id'] for game in full['games']]
+    assert len({game['id'] for game in paged}) == len(paged)
+
+
+def test_tasks_pages_cover_list_once(functions, admin):
+    player_id = functions.register()['playerId']
+    for i in range(7):
+        status, body, _ = functions.call('tasks', 'POST', admin['token'],
+                                         body={'name': f'Задача {i}', 'points': 10, 'playerId': player_id})
+        assert status == 201, body
+
+    status, full, _ = functions.call('tasks', 'GET', admin['token'], {'limit': '500'})
+    assert status == 200
+    paged = read_pages(functions, 'tasks', admin['token'], 'tasks', {'limit': '3'})
+    assert [task['id'] for task in paged] == [task['id'] for task in full['tasks']]
+    assert len({task['id'] for task in paged}) == len(paged)
+
+
+def test_leaderboard_pages_cover_list_once(functions, admin, db):
+    # Несколько игроков с одинаковыми очками: курсор проходит внутри корзины по имени и id
+    for name in ('Борис', 'Анна', 'Анна'):
+        functions.register(name)
+
+    status, full, _ = functions.call('players', 'GET', admin['token'], {'limit': '500'})
+    assert status == 200
+    paged = read_pages(functions, 'players', '', 'players', {'limit': '2'})
+    assert [player['id'] for player in paged] == [player['id'] for player in full['players']]
+    assert len({player['id'] for player in paged}) == len(paged)
+
+    points = [player['points'] for player in paged]
+    assert points == sorted(points, reverse=True)
+    for player in paged:
+        assert player['rank'] == 1 + sum(p > player['points'] for p in points)
+
+
+def test_around_rejects_bad_neighbour_count(functions):
+    status, body, _ = functions.call('players', 'GET', query={'action': 'around', 'position': '1', 'k': 'x'})
+    assert status == 400
+    assert body['error'] == 'Неверный параметр k'
+
+
+def test_logout_revokes_cached_token(functions, admin):
+    token = functions.login(admin['email'])
+    player_id = functions.register()['playerId']
+    task = {'name': 'Патруль', 'points': 10, 'playerId': player_id}
+
+    # Запись и чтение кладут сессию в кэш токенов функции tasks
+    assert functions.call('tasks', 'POST', token, body=task)[0] == 201
+    assert functions.call('tasks', 'GET', token, {'limit': '1'})[0] == 200
+
+    status, body, _ = functions.call('login', 'POST', token, {'action': 'logout'}, body={})
+    assert status == 200, body
+
+    assert functions.call('tasks', 'POST', token, body=task)[0] == 403
+
+
+def test_revocations_committed_out_of_order_are_applied(functions, dsn):
+    user = functions.register()
+    first, second = user['token'], functions.login(user['email'])
+    auth = functions.modules['tasks']['auth']
+    for token in (first, second):
+        assert functions.call('tasks', 'GET', token, {'mine': '1'})[0] == 200
+
+    # Строка журнала для first получает меньший id, но фиксируется позже
+    slow = psycopg2.connect(dsn)
+    with slow.cursor() as cur:
+        cur.execute('DELETE FROM sessions WHERE token = %s', (first,))
+    fast = psycopg2.connect(dsn)
+    fast.autocommit = True
+    with fast.cursor() as cur:
+        cur.execute('DELETE FROM sessions WHERE token = %s', (second,))
+    fast.close()
+
+    auth._last_revocation_poll = 0.0
+    assert functions.call('tasks', 'GET', second, {'mine': '1'})[0] == 401
+    assert functions.call('tasks', 'GET', first, {'mine': '1'})[0] == 200
+
+    slow.commit()
+    slow.close()
+    auth._last_revocation_poll = 0.0
+    assert functions.call('tasks', 'GET', first, {'mine': '1'})[0] == 401
+
+
+def test_replay_matches_incremental_ratings(functions, admin, db):
+    players = [functions.register()['playerId'] for _ in range(6)]
+    rosters = [
+        (players[:3], players[3:]),
+        ([players[0], players[3]], [players[1], players[4]]),
+        ([players[5]], [players[2]]),
+        (players[3:], players[:3]),
+        ([players[1], players[2]], [players[0], players[5]]),
+    ]
+    games = create_games(functions, admin, db, rosters)
+
+    # Завершение не по порядку ID, в том числе пакетом
+    order = [games[3], games[0], games[4]]
+    for game_id, winner_team_id, _ in order:
+        status, body, _ = functions.call('games', 'PUT', admin['token'],
+                                         body={'gameId': game_id, 'winnerTeamId': winner_team_id})
+        assert status == 200, body
+    status, body, _ = functions.call('games', 'PUT', admin['token'], body={'results': [
+        {'gameId': game_id, 'winnerTeamId': winner_team_id} for game_id, winner_team_id, _ in (games[2], games[1])
+    ]})
+    assert status == 200, body
+
+    db.execute('SELECT id, rating FROM players ORDER BY id')
+    incremental = dict(db.fetchall())
+
+    status, stats, _ = functions.call('games', 'POST', admin['token'], {'action': 'replay_ratings'})
+    assert status == 200, stats
+    db.execute('SELECT id, rating FROM players ORDER BY id')
+    replayed = dict(db.fetchall())
+
+    assert replayed.keys() == incremental.keys()
+    for player_id, rating in incremental.items():
+        assert replayed[player_id] == pytest.approx(rating, abs=1e-6), player_id
+    assert len({round(replayed[pid], 6) for pid in players}) > 1
+
+
+def test_replay_waits_for_concurrent_finalization(functions, admin, db, dsn):
+    players = [functions.register()['playerId'] for _ in range(2)]
+    (game_id, winner_team_id, _), = create_games(functions, admin, db, [([players[0]], [players[1]])])
+    index = functions.modules['games']['index']
+
+    # Завершение в открытой транзакции: рейтинг участников уже изменён, но не зафиксирован
+    finalizer = psycopg2.connect(dsn)
+    with finalizer.cursor(cursor_factory=RealDictCursor) as cur:
+        outcome, = index.finalize_games(cur, [{'gameId': game_id, 'winnerTeamId': winner_team_id}])
+    assert outcome['status'] == 'completed'
+
+    replayed = {}
+    thread = threading.Thread(target=lambda: replayed.update(
+        status=functions.call('games', 'POST', admin['token'], {'action': 'replay_ratings'})[0]
+    ))
+    thread.start()
+    time.sleep(0.5)
+    assert thread.is_alive()
+
+    finalizer.commit()
+    finalizer.close()
+    thread.join(10)
+    assert replayed['status'] == 200
+
+    # Пересчёт начался после фиксации завершения и учёл игру (равные рейтинги: половина K)
+    rating = functions.modules['games']['rating']
+    delta = rating.K_FACTOR / 2
+    db.execute('SELECT id, rating FROM players WHERE id = ANY(%s)', (players,))
+    ratings = dict(db.fetchall())
+    assert ratings[players[0]] == pytest.approx(rating.INITIAL_RATING + delta)
+    assert ratings[players[1]] == pytest.approx(rating.INITIAL_RATING - delta)
+
+
+def test_ledger_and_derived_tables_match_players(db):
+    '''Выполняется последним: проверяет состояние после всех записей модуля'''
+    db.execute(
+        """
+        SELECT COUNT(*) FROM players p
+        LEFT JOIN (
+            SELECT player_id, SUM(delta) as points, SUM(wins_delta) as wins, SUM(losses_delta) as losses
+            FROM point_events GROUP BY player_id
+        ) e ON e.player_id = p.id
+        WHERE p.points <> COALESCE(e.points, 0)
+           OR COALESCE(p.wins, 0) <> COALESCE(e.wins, 0)
+           OR COALESCE(p.losses, 0) <> COALESCE(e.losses, 0)
+        """
+    )
+    assert db.fetchone()[0] == 0
+
+    db.execute(
+        """
+        SELECT COUNT(*) FROM players p
+        JOIN users u ON u.id = p.user_id
+        FULL JOIN leaderboard l ON l.player_id = p.id
+        WHERE p.id IS NULL OR l.player_id IS NULL
+           OR (l.user_id, l.name, l.points, l.wins, l.losses, l.rating)
+              IS DISTINCT FROM (p.user_id, u.name, p.points, COALESCE(p.wins, 0), COALESCE(p.losses, 0), p.rating)
+        """
+    )
+    assert db.fetchone()[0] == 0
+
+    db.execute("SELECT COUNT(*) FROM point_events WHERE reason LIKE 'game_%%'")
+    assert db.fetchone()[0] > 0
+    db.execute(MISMATCHES)
+    assert db.fetchone()[0] == 0
@@ -0,0 +1,115 @@
+'''Планы SQL-запросов функций на наполненной базе (проверки benchmarks/query_plans.py)'''
+import os
+import random
+
+import psycopg2
+import pytest
+
+import query_plans
+from conftest import create_database
+from load_harness import ACTIONS, Scenarios, event, load_handlers, seed
+
+# Пороги - как по умолчанию в query_plans.py
+SCALE = 0.1
+LARGE_ROWS = 10000
+FILTERED_ROWS = 1000
+# Игроки с попарно разными очками: корзин мест больше, чем FILTERED_ROWS
+DISTINCT_POINT_PLAYERS = 5000
+
+VOLUMES = {
+    name: int(default * SCALE)
+    for name, default in (('users', 50000), ('games', 200000), ('team_players', 1000000),
+                          ('sessions', 500000), ('tasks', 100000))
+}
+
+
+@pytest.fixture(scope='module')
+def plans_db(cluster):
+    dsn = create_database(cluster, 'strikbal_plans')
+    seed(dsn, VOLUMES, 0.42)
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO users (email, password_hash, name, avatar)
+            SELECT 'distinct' || g || '@test.local', '', 'Разные очки ' || g, ''
+            FROM generate_series(1, %(players)s) g;
+            INSERT INTO players (user_id, points, wins, losses)
+            SELECT id, 100000 + id, 0, 0 FROM users WHERE email LIKE 'distinct%%@test.local';
+            """,
+            {'players': DISTINCT_POINT_PLAYERS}
+        )
+        cur.execute('VACUUM ANALYZE')
+    conn.close()
+
+    previous = os.environ.get('DATABASE_URL')
+    original_connect = psycopg2.connect
+    os.environ['DATABASE_URL'] = dsn
+    query_plans.install_capture()
+    try:
+        yield dsn, load_handlers()
+    finally:
+        psycopg2.connect = original_connect
+        if previous is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = previous
+
+
+def check_plans(dsn: str, action: str, statements: dict) -> dict:
+    '''Шаблон запроса -> нарушения (кроме query_plans.ALLOWED)'''
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        sizes = query_plans.table_sizes(cur)
+    conn.rollback()
+    found = {}
+    for template, bound in statements.items():
+        plan, analyzed = query_plans.explain(conn, bound)
+        problems = [
+            problem for problem in query_plans.violations(plan, sizes, LARGE_ROWS, FILTERED_ROWS, analyzed)
+            if not any(action == allowed_action and problem.startswith(prefix)
+                       for allowed_action, prefix in query_plans.ALLOWED)
+        ]
+        if problems:
+            found[template[:200]] = problems
+    conn.close()
+    return found
+
+
+@pytest.mark.parametrize('action', ACTIONS)
+def test_action_plans(plans_db, action):
+    dsn, handlers = plans_db
+    scenarios = Scenarios(dsn, VOLUMES, random.Random(action))
+    collected = query_plans.collect_statements(handlers, scenarios, [action], calls=2)
+    assert collected[action]
+    assert check_plans(dsn, action, collected[action]) == {}
+
+
+@pytest.mark.parametrize('position', ['first', 'last'])
+def test_around_position_lookup_plan(plans_db, position):
+    '''Поиск корзины по месту не должен перебирать корзины (find_player_at_position)'''
+    dsn, handlers = plans_db
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute('SELECT COUNT(*) FROM player_rank_buckets WHERE player_count > 0')
+        buckets = cur.fetchone()[0]
+        cur.execute('SELECT COUNT(*) FROM players')
+        players = cur.fetchone()[0]
+    conn.close()
+    assert buckets > DISTINCT_POINT_PLAYERS
+
+    number = 1 if position == 'first' else players
+    query_plans._captured.statements = []
+    try:
+        response = handlers['players'](event('GET', query={'action': 'around', 'position': str(number)}), None)
+        statements = {
+            ' '.join(template.split()): bound
+            for template, bound in query_plans._captured.statements
+            if not template.lstrip().upper().startswith(query_plans.SKIPPED_PREFIXES)
+        }
+    finally:
+        query_plans._captured.statements = None
+    assert response['statusCode'] == 200
+    assert any('player_rank_buckets' in template for template in statements)
+    assert check_plans(dsn, 'players.around', statements) == {}
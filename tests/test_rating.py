@@ -0,0 +1,61 @@
+'''Векторный пересчёт Эло (backend/games/rating.py) против прямого цикла по играм'''
+import numpy as np
+import pytest
+
+from rating_bench import load_rating, synthetic_history
+
+rating = load_rating()
+
+
+def naive_replay(games: list, ratings: dict) -> dict:
+    '''Игры [(победители, проигравшие)] по одной в хронологическом порядке'''
+    ratings = dict(ratings)
+    for winners, losers in games:
+        winners, losers = set(winners), set(losers)
+        if not winners or not losers:
+            continue
+        for player_id in winners | losers:
+            ratings.setdefault(player_id, rating.INITIAL_RATING)
+        winners_mean = sum(ratings[pid] for pid in winners) / len(winners)
+        losers_mean = sum(ratings[pid] for pid in losers) / len(losers)
+        expected_win = 1.0 / (1.0 + 10.0 ** ((losers_mean - winners_mean) / rating.ELO_SCALE))
+        delta = rating.K_FACTOR * (1.0 - expected_win)
+        for player_id in winners:
+            ratings[player_id] += delta
+        for player_id in losers:
+            ratings[player_id] -= delta
+    return ratings
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_replay_matches_naive_loop(seed):
+    players, team_size = 60, 3
+    entry_game, entry_side, entry_player = synthetic_history(2000, players, team_size, seed)
+    games = [
+        (entry_player[start:start + team_size].tolist(), entry_player[start + team_size:start + 2 * team_size].tolist())
+        for start in range(0, len(entry_game), team_size * 2)
+    ]
+
+    ratings = np.full(players, rating.INITIAL_RATING)
+    rating.replay(entry_game, entry_side, entry_player, ratings)
+
+    expected = naive_replay(games, {pid: rating.INITIAL_RATING for pid in range(players)})
+    np.testing.assert_allclose(ratings, [expected[pid] for pid in range(players)], rtol=0, atol=1e-9)
+
+
+def test_rate_games_matches_naive_loop():
+    rng = np.random.default_rng(7)
+    ids = list(range(100, 140))
+    start = {pid: float(rng.uniform(1200, 1800)) for pid in ids}
+    games = []
+    for _ in range(300):
+        sizes = rng.integers(0, 5, size=2)
+        members = rng.choice(ids, size=sizes.sum(), replace=False).tolist()
+        games.append((members[:sizes[0]], members[sizes[0]:]))
+    # Повтор игрока в составе и односторонние игры
+    games += [([ids[0], ids[0], ids[1]], [ids[2]]), ([ids[3]], [])]
+
+    result = rating.rate_games(start, games)
+    expected = naive_replay(games, start)
+    for player_id, value in result.items():
+        assert value == pytest.approx(expected[player_id], rel=0, abs=1e-9), player_id